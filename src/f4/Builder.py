@@ -2,11 +2,96 @@ from .Utilities import *
 global joblib
 joblib = __import__('joblib', globals(), locals())
 
+#####################################################
+# Classes
+#####################################################
+
+class ColumnInfo:
+    """
+    This class stores the max size and the number of int, float, and string values for a range of columns.
+    The values are stored in arrays so they can be updated in bulk for many values at a time.
+    """
+    def __init__(self, start_column_index, end_column_index):
+        self.start_column_index = start_column_index
+        self.end_column_index = end_column_index
+
+        num_cols = end_column_index - start_column_index
+        self.sizes = np.zeros(num_cols, dtype=np.int64)
+        self.num_i = np.zeros(num_cols, dtype=np.int64)
+        self.num_f = np.zeros(num_cols, dtype=np.int64)
+        self.num_s = np.zeros(num_cols, dtype=np.int64)
+
+    def add_rows(self, rows):
+        if len(rows) == 0:
+            return
+
+        # Transpose so we can evaluate all the values for a given column at once.
+        columns = list(zip(*rows))
+        num_values = len(columns[0])
+
+        chunk_sizes = np.fromiter((max(map(len, column)) for column in columns), dtype=np.int64, count=len(columns))
+        np.maximum(self.sizes[:len(columns)], chunk_sizes, out=self.sizes[:len(columns)])
+
+        for offset, column in enumerate(columns):
+            # Once a column is known to contain strings, its type cannot change, so we skip further checks.
+            if self.num_s[offset] > 0:
+                self.num_s[offset] += num_values
+                continue
+
+            num_i = sum(map(isint, column))
+            self.num_i[offset] += num_i
+
+            if num_i == num_values:
+                continue
+
+            # Values that are ints are also considered to be floats.
+            num_f = sum(map(isfloat, column))
+            self.num_f[offset] += num_f - num_i
+            self.num_s[offset] += num_values - num_f
+
+    def merge(self, other):
+        np.maximum(self.sizes, other.sizes, out=self.sizes)
+        self.num_i += other.num_i
+        self.num_f += other.num_f
+        self.num_s += other.num_s
+
+    def get_inferred_types(self):
+        return [infer_column_type(i, f, s) for i, f, s in zip(self.num_i, self.num_f, self.num_s)]
+
+    def serialize(self):
+        return serialize([self.start_column_index, self.end_column_index, self.sizes.tobytes(), self.num_i.tobytes(), self.num_f.tobytes(), self.num_s.tobytes()])
+
+    @staticmethod
+    def deserialize(msg):
+        start_column_index, end_column_index, sizes, num_i, num_f, num_s = deserialize(msg)
+
+        column_info = ColumnInfo(start_column_index, end_column_index)
+        column_info.sizes = np.frombuffer(sizes, dtype=np.int64).copy()
+        column_info.num_i = np.frombuffer(num_i, dtype=np.int64).copy()
+        column_info.num_f = np.frombuffer(num_f, dtype=np.int64).copy()
+        column_info.num_s = np.frombuffer(num_s, dtype=np.int64).copy()
+
+        return column_info
+
 #####################################################
 # Public function(s)
 #####################################################
 
-def convert_delimited_file(delimited_file_path, f4_file_path, index_columns=[], delimiter="\t", comment_prefix="#", compression_type=None, num_parallel=1, tmp_dir_path=None, verbose=False):
+def convert_delimited_file(delimited_file_path, f4_file_path, index_columns=[], delimiter="\t", comment_prefix="#", compression_type=None, num_parallel=1, parallelize_by="columns", single_pass=False, num_sample_rows=None, tmp_dir_path=None, tmp_codec="zstd", verbose=False):
+    """
+    Convert a delimited file to f4 format.
+
+    Args:
+        tmp_dir_path (str): A directory for temporary files. If None is specified, a new temporary directory is created and removed afterward.
+        tmp_codec (str): How the temporary files are stored: zstd (compressed) or raw (uncompressed). This applies to the metadata, the column
+            information, the per-chunk data files (and spool files) that are written before the chunks are combined, and the sorted runs used
+            to build indexes. Only the combined data file, the compressed data, and the final index data are always stored raw, because they
+            are written at fixed positions and copied directly into the output file, so they need as much disk space as the output file.
+            With zstd, the per-chunk data files are combined by a single process; they are combined in parallel only when tmp_codec is raw
+            and num_parallel > 1. Seeks within zstd files (such as when column coordinates are looked up while building indexes) are
+            emulated by decompressing from the start, so raw can be faster for files with many columns. Temporary files are read with
+            ordinary file reads, not memory mapping.
+    """
     print_message(f"Converting from {delimited_file_path} to {f4_file_path}.", verbose)
 
     if type(delimiter) != str:
@@ -26,6 +111,24 @@ def convert_delimited_file(delimited_file_path, f4_file_path, index_columns=[],
         if comment_prefix == "":
             comment_prefix = None
 
+    if parallelize_by not in ("columns", "rows"):
+        raise Exception("Invalid parallelize_by value. Must be columns or rows.")
+
+    if parallelize_by == "rows" and (delimited_file_path.endswith(".gz") or delimited_file_path.endswith(".zstd")):
+        raise Exception("Parallelizing by rows is only supported for uncompressed input files.")
+
+    if compression_type not in (None, "zstd", "zstd_block", "zstd_dict", "zstd_column_groups"):
+        raise Exception("Invalid compression_type value. Must be None, zstd, zstd_block, zstd_dict, or zstd_column_groups.")
+
+    if num_sample_rows is not None:
+        if type(num_sample_rows) != int or num_sample_rows < 1:
+            raise Exception("The num_sample_rows value must be a positive integer.")
+
+        if parallelize_by == "rows" or single_pass:
+            raise Exception("Sampling rows to infer column info is only supported when parallelizing by columns without single_pass.")
+
+    validate_tmp_codec(tmp_codec)
+
     # Set constants
     file_read_chunk_size = 100000
     out_items_chunk_size = 10000
@@ -58,35 +161,67 @@ def convert_delimited_file(delimited_file_path, f4_file_path, index_columns=[],
                 print_message(f"Saving checkpoint information to {checkpoint_file_path}.")
                 write_str_to_file(checkpoint_file_path, serialize(checkpoint_info), False)
 
-    # Parse column info into a database for each chunk.
-    joblib.Parallel(n_jobs=num_parallel)(joblib.delayed(parse_column_info)(delimited_file_path, f4_file_path, comment_prefix, delimiter, file_read_chunk_size, chunk_number, chunk_indices[0], chunk_indices[1], tmp_dir_path2, out_items_chunk_size, use_checkpoints, verbose) for chunk_number, chunk_indices in enumerate(column_chunk_indices))
+    if parallelize_by == "rows":
+        # Split the input file into byte ranges that start and end at line boundaries.
+        row_ranges = generate_row_ranges(delimited_file_path, comment_prefix, num_parallel)
+
+        # Parse column info for each row range and then merge it across the ranges.
+        joblib.Parallel(n_jobs=num_parallel)(joblib.delayed(parse_row_range_column_info)(delimited_file_path, f4_file_path, delimiter, file_read_chunk_size, range_number, range_start_end[0], range_start_end[1], num_cols, tmp_dir_path2, tmp_codec, out_items_chunk_size, use_checkpoints, verbose) for range_number, range_start_end in enumerate(row_ranges))
+        combine_row_range_column_info(delimited_file_path, f4_file_path, comment_prefix, delimiter, file_read_chunk_size, row_ranges, num_cols, tmp_dir_path2, tmp_codec, out_items_chunk_size, use_checkpoints, verbose)
 
-    # Save and format data to a temp file for each column chunk.
-    joblib.Parallel(n_jobs=num_parallel)(joblib.delayed(save_formatted_data)(delimited_file_path, f4_file_path, comment_prefix, delimiter, file_read_chunk_size, chunk_number, chunk_indices[0], chunk_indices[1], tmp_dir_path2, out_items_chunk_size, use_checkpoints, verbose) for chunk_number, chunk_indices in enumerate(column_chunk_indices))
+        # Save and format data to a temp file for each row range.
+        joblib.Parallel(n_jobs=num_parallel)(joblib.delayed(save_formatted_data_for_row_range)(delimited_file_path, f4_file_path, delimiter, file_read_chunk_size, range_number, range_start_end[0], range_start_end[1], num_cols, tmp_dir_path2, tmp_codec, out_items_chunk_size, use_checkpoints, verbose) for range_number, range_start_end in enumerate(row_ranges))
+
+        # All columns are in a single chunk when parallelizing by rows.
+        column_chunk_indices = [[0, num_cols]]
+    elif single_pass:
+        # Tokenize the input file once, collecting column info and spooling the values for each chunk.
+        parse_and_spool_column_chunks(delimited_file_path, f4_file_path, comment_prefix, delimiter, file_read_chunk_size, column_chunk_indices, tmp_dir_path2, tmp_codec, out_items_chunk_size, use_checkpoints, verbose)
+
+        # Format the spooled values to a temp file for each column chunk.
+        joblib.Parallel(n_jobs=num_parallel)(joblib.delayed(save_formatted_data_from_spool)(delimited_file_path, f4_file_path, delimiter, file_read_chunk_size, chunk_number, chunk_indices[0], chunk_indices[1], tmp_dir_path2, tmp_codec, out_items_chunk_size, use_checkpoints, verbose) for chunk_number, chunk_indices in enumerate(column_chunk_indices))
+    elif num_sample_rows:
+        # Find the start of randomly selected lines to sample (in addition to the first lines of the file).
+        sample_line_positions = generate_sample_line_positions(delimited_file_path, comment_prefix, num_sample_rows)
+
+        # Infer column info from a sample of rows into a database for each chunk.
+        joblib.Parallel(n_jobs=num_parallel)(joblib.delayed(parse_sampled_column_info)(delimited_file_path, f4_file_path, comment_prefix, delimiter, file_read_chunk_size, chunk_number, chunk_indices[0], chunk_indices[1], num_sample_rows, sample_line_positions, tmp_dir_path2, out_items_chunk_size, use_checkpoints, verbose) for chunk_number, chunk_indices in enumerate(column_chunk_indices))
+
+        # Save and format data to a temp file for each column chunk. Chunks with values that do not fit the sampled column info are redone.
+        joblib.Parallel(n_jobs=num_parallel)(joblib.delayed(save_formatted_data_using_sampled_info)(delimited_file_path, f4_file_path, comment_prefix, delimiter, file_read_chunk_size, chunk_number, chunk_indices[0], chunk_indices[1], tmp_dir_path2, tmp_codec, out_items_chunk_size, use_checkpoints, verbose) for chunk_number, chunk_indices in enumerate(column_chunk_indices))
+    else:
+        # Parse column info into a database for each chunk.
+        joblib.Parallel(n_jobs=num_parallel)(joblib.delayed(parse_column_info)(delimited_file_path, f4_file_path, comment_prefix, delimiter, file_read_chunk_size, chunk_number, chunk_indices[0], chunk_indices[1], tmp_dir_path2, out_items_chunk_size, use_checkpoints, verbose) for chunk_number, chunk_indices in enumerate(column_chunk_indices))
+
+        # Save and format data to a temp file for each column chunk.
+        joblib.Parallel(n_jobs=num_parallel)(joblib.delayed(save_formatted_data)(delimited_file_path, f4_file_path, comment_prefix, delimiter, file_read_chunk_size, chunk_number, chunk_indices[0], chunk_indices[1], tmp_dir_path2, tmp_codec, out_items_chunk_size, use_checkpoints, verbose) for chunk_number, chunk_indices in enumerate(column_chunk_indices))
 
     # Combine column databases across the chunks.
     combine_column_databases(delimited_file_path, f4_file_path, column_chunk_indices, tmp_dir_path2, use_checkpoints, verbose)
 
     # Create meta files for all columns.
-    save_column_name_info(delimited_file_path, f4_file_path, out_items_chunk_size, tmp_dir_path2, use_checkpoints, verbose)
-    save_column_types(delimited_file_path, f4_file_path, out_items_chunk_size, tmp_dir_path2, use_checkpoints, verbose)
-    save_column_coordinates(delimited_file_path, f4_file_path, out_items_chunk_size, tmp_dir_path2, use_checkpoints, verbose)
+    save_column_name_info(delimited_file_path, f4_file_path, out_items_chunk_size, tmp_dir_path2, tmp_codec, use_checkpoints, verbose)
+    save_column_types(delimited_file_path, f4_file_path, out_items_chunk_size, tmp_dir_path2, tmp_codec, use_checkpoints, verbose)
+    save_column_coordinates(delimited_file_path, f4_file_path, out_items_chunk_size, tmp_dir_path2, tmp_codec, use_checkpoints, verbose)
 
-    # Merge the saved/formatted data across the column chunks.
-    combine_data_for_column_chunks(delimited_file_path, f4_file_path, column_chunk_indices, tmp_dir_path2, use_checkpoints, verbose)
+    if parallelize_by == "rows":
+        # Merge the saved/formatted data across the row ranges.
+        combine_data_for_row_ranges(delimited_file_path, f4_file_path, row_ranges, tmp_dir_path2, tmp_codec, use_checkpoints, verbose)
+    else:
+        # Merge the saved/formatted data across the column chunks.
+        combine_data_for_column_chunks(delimited_file_path, f4_file_path, column_chunk_indices, tmp_dir_path2, tmp_codec, num_parallel, use_checkpoints, verbose)
 
-    num_rows = int(read_str_from_file(f"{tmp_dir_path2}num_rows"))
-    line_length_total = int(read_str_from_file(f"{tmp_dir_path2}line_length_total"))
+    num_rows = int(read_str_from_file(f"{tmp_dir_path2}num_rows", tmp_codec=tmp_codec))
+    line_length_total = int(read_str_from_file(f"{tmp_dir_path2}line_length_total", tmp_codec=tmp_codec))
 
     if num_rows == 0:
         raise Exception(f"A header row but no data rows were detected in {delimited_file_path}.")
 
     if index_columns:
-        build_indexes(f4_file_path, tmp_dir_path2, index_columns, num_rows, line_length_total, num_parallel, get_columns_database_file_path(tmp_dir_path2), use_checkpoints, verbose)
+        build_indexes(f4_file_path, tmp_dir_path2, tmp_codec, index_columns, num_rows, line_length_total, num_parallel, get_columns_database_file_path(tmp_dir_path2), use_checkpoints, verbose)
 
-    #TODO: Parallelize this by row chunks.
     if compression_type:
-        compress_data(delimited_file_path, f4_file_path, tmp_dir_path2, compression_type, num_rows, line_length_total, use_checkpoints, verbose)
+        compress_data(delimited_file_path, f4_file_path, tmp_dir_path2, tmp_codec, compression_type, num_rows, line_length_total, num_parallel, use_checkpoints, verbose)
     # else:
     #     # The combined file will be compressed, so we need to decompress it.
     #     rename(get_data_path(tmp_dir_path2, "data"), get_data_path(tmp_dir_path2, "datacmpr"))
@@ -101,7 +236,7 @@ def convert_delimited_file(delimited_file_path, f4_file_path, index_columns=[],
     #                     break
     #
     #                 data_file.write(content)
-    combine_into_single_file(delimited_file_path, f4_file_path, tmp_dir_path2, file_read_chunk_size, verbose)
+    combine_into_single_file(delimited_file_path, f4_file_path, tmp_dir_path2, tmp_codec, file_read_chunk_size, verbose)
 
     remove_tmp_file(get_columns_database_file_path(tmp_dir_path2))
 
@@ -118,6 +253,217 @@ def convert_delimited_file(delimited_file_path, f4_file_path, index_columns=[],
 
     print_message(f"Done converting {delimited_file_path} to {f4_file_path}.", verbose)
 
+def append_delimited_file(f4_file_path, delimited_file_path, delimiter="\t", comment_prefix="#", num_parallel=1, tmp_dir_path=None, tmp_codec="zstd", verbose=False):
+    print_message(f"Appending {delimited_file_path} to {f4_file_path}.", verbose)
+
+    if type(delimiter) != str:
+        raise Exception("The delimiter value must be a string.")
+
+    if delimiter not in ("\t"):
+        raise Exception("Invalid delimiter. Must be \t.")
+
+    delimiter = delimiter.encode()
+
+    if comment_prefix:
+        if type(comment_prefix) != str:
+            raise Exception("The comment_prefix value must be a string.")
+
+        comment_prefix = comment_prefix.encode()
+
+    validate_tmp_codec(tmp_codec)
+
+    # Set constants
+    file_read_chunk_size = 100000
+    out_items_chunk_size = 10000
+
+    # Retrieve the metadata from the existing file.
+    file_info = read_file_info(f4_file_path)
+
+    if "cmpr" in file_info["file_map_dict"]:
+        raise Exception("Appending is only supported for files that are not compressed.")
+
+    old_column_names = file_info["column_names"]
+    old_num_rows = file_info["num_rows"]
+
+    num_cols, max_column_name_length = preview_column_names(delimited_file_path, f4_file_path, comment_prefix, delimiter, file_read_chunk_size, verbose)
+
+    if num_cols != len(old_column_names):
+        raise Exception(f"The number of columns in {delimited_file_path} does not match the number of columns in {f4_file_path}.")
+
+    num_cols_per_chunk = ceil(num_cols / num_parallel)
+    column_chunk_indices = generate_column_chunk_ranges(num_cols, num_cols_per_chunk, num_parallel)
+
+    # Checkpoints are not used because the existing file is replaced at the end.
+    tmp_dir_path2 = prepare_tmp_dir(tmp_dir_path)[0]
+
+    # Parse column info for the new rows into a database for each chunk.
+    joblib.Parallel(n_jobs=num_parallel)(joblib.delayed(parse_column_info)(delimited_file_path, f4_file_path, comment_prefix, delimiter, file_read_chunk_size, chunk_number, chunk_indices[0], chunk_indices[1], tmp_dir_path2, out_items_chunk_size, False, verbose) for chunk_number, chunk_indices in enumerate(column_chunk_indices))
+
+    # The existing column sizes and types are kept unless the new values require wider columns or more general types.
+    for chunk_number in range(len(column_chunk_indices)):
+        merge_existing_column_info(delimited_file_path, f4_file_path, chunk_number, tmp_dir_path2, old_column_names, file_info["column_types"], file_info["column_coords"])
+
+    # Save and format the new rows to a temp file for each column chunk.
+    joblib.Parallel(n_jobs=num_parallel)(joblib.delayed(save_formatted_data)(delimited_file_path, f4_file_path, comment_prefix, delimiter, file_read_chunk_size, chunk_number, chunk_indices[0], chunk_indices[1], tmp_dir_path2, tmp_codec, out_items_chunk_size, False, verbose) for chunk_number, chunk_indices in enumerate(column_chunk_indices))
+
+    combine_column_databases(delimited_file_path, f4_file_path, column_chunk_indices, tmp_dir_path2, False, verbose)
+
+    save_column_name_info(delimited_file_path, f4_file_path, out_items_chunk_size, tmp_dir_path2, tmp_codec, False, verbose)
+    save_column_types(delimited_file_path, f4_file_path, out_items_chunk_size, tmp_dir_path2, tmp_codec, False, verbose)
+    save_column_coordinates(delimited_file_path, f4_file_path, out_items_chunk_size, tmp_dir_path2, tmp_codec, False, verbose)
+
+    combine_data_for_column_chunks(delimited_file_path, f4_file_path, column_chunk_indices, tmp_dir_path2, tmp_codec, num_parallel, False, verbose)
+
+    num_new_rows = int(read_str_from_file(f"{tmp_dir_path2}num_rows", tmp_codec=tmp_codec))
+    line_length_total = int(read_str_from_file(f"{tmp_dir_path2}line_length_total", tmp_codec=tmp_codec))
+
+    if num_new_rows == 0:
+        raise Exception(f"A header row but no data rows were detected in {delimited_file_path}.")
+
+    num_rows = old_num_rows + num_new_rows
+
+    # The existing rows are placed before the new rows. They are padded again only if columns have become wider.
+    prepend_existing_rows(f4_file_path, file_info, num_new_rows, tmp_dir_path2, tmp_codec, file_read_chunk_size, verbose)
+
+    if file_info["index_info_dict"]:
+        file_info["row_offset"] = 0
+        merge_existing_indexes(f4_file_path, [file_info], file_info["index_info_dict"], num_rows, line_length_total, num_parallel, tmp_dir_path2, tmp_codec, verbose, old_num_rows)
+
+    # The updated file is written next to the existing file and then replaces it.
+    combine_into_single_file(delimited_file_path, f"{f4_file_path}.tmp", tmp_dir_path2, tmp_codec, file_read_chunk_size, verbose)
+    rename(f"{f4_file_path}.tmp", f4_file_path)
+
+    remove_tmp_file(get_columns_database_file_path(tmp_dir_path2))
+    remove_tmp_file(f"{tmp_dir_path2}num_rows")
+    remove_tmp_file(f"{tmp_dir_path2}line_length_total")
+
+    # Only remove the temp directory if we created it.
+    if not tmp_dir_path:
+        rmtree(tmp_dir_path2)
+
+    print_message(f"Done appending {delimited_file_path} to {f4_file_path}.", verbose)
+
+def build_index(f4_file_path, index_column, tmp_dir_path=None, tmp_codec="zstd", verbose=False):
+    """
+    Add an index to an existing f4 file that is not compressed. The index is written at the end of the file,
+    and then the file map is updated, so the rest of the file is not rewritten. The larger file map may not fit
+    in its current space, in which case a small metadata component is copied to the end of the file and its old
+    location is overwritten. Close any F4Reader for the file before building an index; the module-level query
+    functions open the file again automatically.
+
+    Args:
+        index_column (str): The name of the column to index. Add "_endswith" to the name to support EndsWithFilter.
+    """
+    print_message(f"Building an index for {index_column} in {f4_file_path}.", verbose)
+
+    validate_tmp_codec(tmp_codec)
+
+    index_columns, reverse_status_dict, key = get_index_key(index_column)
+
+    with open(f4_file_path, "rb") as f4_file:
+        file_map_dict = read_file_map(f4_file)
+
+        if "cmpr" in file_map_dict:
+            raise Exception("Building an index is only supported for files that are not compressed.")
+
+        index_info_dict = deserialize(read_file_component(f4_file, file_map_dict, "i")) if "i" in file_map_dict else {}
+
+        if key in index_info_dict:
+            raise Exception(f"An index already exists for {index_column} in {f4_file_path}.")
+
+        index_column_info = get_file_index_column_info(f4_file_path, f4_file, file_map_dict, index_columns, reverse_status_dict)
+        line_length = parse_column_coords(read_file_component(f4_file, file_map_dict, "cc"), fast_int(read_file_component(f4_file, file_map_dict, "ccml")))[-1]
+
+    num_rows = (file_map_dict[""][1] - file_map_dict[""][0]) // line_length
+    tmp_dir_path2 = prepare_tmp_dir(tmp_dir_path)[0]
+
+    # Only the bytes for the indexed columns are read from the data.
+    num_runs = save_index_runs(f4_file_path, tmp_dir_path2, tmp_codec, [index_column_info], num_rows, line_length, 1000000, verbose, data_file_path=f4_file_path, data_start=file_map_dict[""][0])
+    merge_index_runs(f4_file_path, tmp_dir_path2, tmp_codec, 0, index_columns, index_column_info, num_rows, num_runs, verbose)
+
+    # The new index is added at the end of the file.
+    index_number = len(index_info_dict)
+    index_info_dict[key] = index_number
+
+    with open(f4_file_path, "r+b") as f4_file:
+        f4_file_descriptor = f4_file.fileno()
+        position = path.getsize(f4_file_path)
+
+        index_data_size = get_temp_file_original_size(f"{tmp_dir_path2}i0")
+        copy_file_to_position(f"{tmp_dir_path2}i0", f4_file_descriptor, position, index_data_size, 100000)
+        file_map_dict[f"i{index_number}"] = [position, position + index_data_size]
+        position += index_data_size
+
+        for extension in ["cc", "ccml"]:
+            component = read_str_from_file(f"{tmp_dir_path2}i0{extension}", tmp_codec=tmp_codec)
+            write_to_position(f4_file_descriptor, component, position)
+            file_map_dict[f"i{index_number}{extension}"] = [position, position + len(component)]
+            position += len(component)
+
+        index_info = serialize(index_info_dict)
+        write_to_position(f4_file_descriptor, index_info, position)
+        file_map_dict["i"] = [position, position + len(index_info)]
+
+        write_file_map(f4_file_path, f4_file_descriptor, file_map_dict)
+
+    for file_path in glob(f"{tmp_dir_path2}i0*"):
+        remove_tmp_file(file_path)
+
+    # Only remove the temp directory if we created it.
+    if not tmp_dir_path:
+        rmtree(tmp_dir_path2)
+
+    print_message(f"Done building an index for {index_column} in {f4_file_path}.", verbose)
+
+def drop_index(f4_file_path, index_column, verbose=False):
+    """
+    Remove an index from an f4 file. Only the file map and the dictionary of indexes are updated, so the
+    file does not become smaller: the space used by the index is not reclaimed (and building the index again
+    uses new space). Converting the file again removes the unused space. An F4Reader that was already open
+    can still use the index.
+
+    Args:
+        index_column (str): The name of the indexed column, as it was specified when the index was built.
+    """
+    print_message(f"Dropping the index for {index_column} in {f4_file_path}.", verbose)
+
+    key = get_index_key(index_column)[2]
+
+    with open(f4_file_path, "rb") as f4_file:
+        file_map_dict = read_file_map(f4_file)
+        index_info_dict = deserialize(read_file_component(f4_file, file_map_dict, "i")) if "i" in file_map_dict else {}
+
+    if key not in index_info_dict:
+        raise Exception(f"No index exists for {index_column} in {f4_file_path}.")
+
+    index_number = index_info_dict.pop(key)
+    del file_map_dict["i"]
+
+    for extension in ["", "cc", "ccml"]:
+        del file_map_dict[f"i{index_number}{extension}"]
+
+    # The remaining indexes are renumbered so the numbers stay consecutive. Only the file map changes.
+    for other_key, other_index_number in sorted(index_info_dict.items(), key=lambda x: x[1]):
+        if other_index_number > index_number:
+            index_info_dict[other_key] = other_index_number - 1
+
+            for extension in ["", "cc", "ccml"]:
+                file_map_dict[f"i{other_index_number - 1}{extension}"] = file_map_dict.pop(f"i{other_index_number}{extension}")
+
+    with open(f4_file_path, "r+b") as f4_file:
+        f4_file_descriptor = f4_file.fileno()
+
+        # The new dictionary of indexes is written at the end of the file so it does not overwrite anything the current file map refers to.
+        if len(index_info_dict) > 0:
+            position = path.getsize(f4_file_path)
+            index_info = serialize(index_info_dict)
+            write_to_position(f4_file_descriptor, index_info, position)
+            file_map_dict["i"] = [position, position + len(index_info)]
+
+        write_file_map(f4_file_path, f4_file_descriptor, file_map_dict)
+
+    print_message(f"Done dropping the index for {index_column} in {f4_file_path}.", verbose)
+
 #####################################################
 # Non-public function(s)
 #####################################################
@@ -236,18 +582,7 @@ def parse_column_info(delimited_file_path, f4_file_path, comment_prefix, delimit
 
     print_message(f"Parsing column names, sizes, and types when converting {delimited_file_path} to {f4_file_path} for columns {start_column_index} - {end_column_index - 1}.", verbose)
 
-    columns_file_path = get_columns_database_file_path(tmp_dir_path, chunk_number)
-    conn = connect_sql(columns_file_path)
-    cursor = conn.cursor()
-    cursor.execute('BEGIN TRANSACTION')
-
-    create_column_database(cursor)
-    populate_database_with_column_names(delimited_file_path, comment_prefix, delimiter, file_read_chunk_size, start_column_index, end_column_index, out_items_chunk_size, cursor)
-
-    sql_update = '''UPDATE columns
-                    SET size = MAX(size, ?), num_i = num_i + ?, num_f = num_f + ?, num_s = num_s + ?
-                    WHERE column_index = ?'''
-
+    column_info = ColumnInfo(start_column_index, end_column_index)
     num_rows = 0
 
     # We will find the max size for each column and count how many there are of each type.
@@ -255,48 +590,32 @@ def parse_column_info(delimited_file_path, f4_file_path, comment_prefix, delimit
         skip_comments(in_file, comment_prefix)
         skip_line(in_file) # Header line
 
-        # Loop through the file for the specified columns and update the dictionaries.
-        save_tuples = []
+        # Loop through the file for the specified columns and update the column info in batches of rows.
+        num_rows_per_batch = max(1, out_items_chunk_size // (end_column_index - start_column_index))
+        rows = []
         for column_index, value in iterate_delimited_file_column_indices(in_file, delimiter, file_read_chunk_size, start_column_index, end_column_index):
             if column_index == start_column_index:
-                num_rows += 1
+                if len(rows) == num_rows_per_batch:
+                    column_info.add_rows(rows)
+                    rows = []
 
+                num_rows += 1
                 print_message(f"Parsing column names, sizes, and types when converting {delimited_file_path} to {f4_file_path} for columns {start_column_index} - {end_column_index - 1}.", verbose, num_rows)
 
-            if start_column_index <= column_index < end_column_index:
-                this_size = len(value)
-                i, f, s = infer_type(value)
+                rows.append([])
 
-                save_tuples.append((this_size, i, f, s, column_index,))
+            rows[-1].append(value)
 
-            if len(save_tuples) == out_items_chunk_size:
-                cursor.executemany(sql_update, save_tuples)
-                save_tuples = []
+        column_info.add_rows(rows)
 
-        if len(save_tuples) > 0:
-            cursor.executemany(sql_update, save_tuples)
-
-    # Infer the type based on the counts we have.
-    sql_infer_type = '''UPDATE columns
-                        SET inferred_type = CASE
-                          WHEN num_s > 0 THEN "s"
-                          WHEN num_f > 0 THEN "f"
-                          ELSE "i"
-                        END
-                        WHERE column_index = ?'''
-
-    cursor.executemany(sql_infer_type, ((column_index,) for column_index in range(start_column_index, end_column_index)))
-
-    conn.commit()
-    cursor.close()
-    conn.close()
+    save_column_info_database(delimited_file_path, comment_prefix, delimiter, file_read_chunk_size, chunk_number, column_info, tmp_dir_path, out_items_chunk_size)
 
     record_checkpoint_reached(use_checkpoints, tmp_dir_path, chunk_number)
 
     print_message(f"Done parsing column names, sizes, and types when converting {delimited_file_path} to {f4_file_path} for columns {start_column_index} - {end_column_index - 1}.", verbose)
 
 # This function is executed in parallel.
-def save_formatted_data(delimited_file_path, f4_file_path, comment_prefix, delimiter, file_read_chunk_size, chunk_number, start_column_index, end_column_index, tmp_dir_path, out_items_chunk_size, use_checkpoints, verbose):
+def save_formatted_data(delimited_file_path, f4_file_path, comment_prefix, delimiter, file_read_chunk_size, chunk_number, start_column_index, end_column_index, tmp_dir_path, tmp_codec, out_items_chunk_size, use_checkpoints, verbose):
     if has_checkpoint_been_reached_previously(use_checkpoints, tmp_dir_path, chunk_number, verbose):
         return
 
@@ -311,45 +630,425 @@ def save_formatted_data(delimited_file_path, f4_file_path, comment_prefix, delim
                       WHERE column_index BETWEEN ? AND ?''', (start_column_index, end_column_index,))
     line_length = cursor.fetchone()["size"]
 
-    write_str_to_file(get_data_path(tmp_dir_path, "ll", chunk_number), str(line_length).encode(), False)
+    write_str_to_file(get_data_path(tmp_dir_path, "ll", chunk_number), str(line_length).encode(), False, tmp_codec=tmp_codec)
+
+    num_columns_to_parse = end_column_index - start_column_index
+    data_value_count = 0
+
+    with get_delimited_file_handle(delimited_file_path) as in_file:
+        skip_comments(in_file, comment_prefix)
+        skip_line(in_file)  # Header line
+
+        # Save data.
+        with open_temp_file_to_compress(get_data_path(tmp_dir_path, "data", chunk_number), tmp_codec=tmp_codec) as data_file:
+            out_list = []
+
+            column_size_cache = {}
+            if num_columns_to_parse <= 1000:
+                cursor.close()
+                cursor = conn.cursor()
+                cursor.execute('''SELECT size
+                                  FROM columns''')
+
+                for column_index in range(start_column_index, end_column_index):
+                    column_size_cache[column_index] = cursor.fetchone()["size"]
+
+            for column_index, value in iterate_delimited_file_column_indices(in_file, delimiter, file_read_chunk_size, start_column_index, end_column_index):
+                if len(column_size_cache) == 0:
+                    if column_index == start_column_index:
+                        cursor.close()
+                        cursor = conn.cursor()
+                        cursor.execute('''SELECT size
+                                          FROM columns''')
+
+                    column_size = cursor.fetchone()["size"]
+                else:
+                    column_size = column_size_cache[column_index]
+
+                out_list.append(format_string_as_fixed_width(value, column_size))
+
+                data_value_count += 1
+                print_message(f"Saving formatted data for when converting {delimited_file_path} to {f4_file_path} for columns {start_column_index} - {end_column_index - 1}.", verbose, data_value_count / num_columns_to_parse)
+
+                if len(out_list) == out_items_chunk_size:
+                    data_file.write(b"".join(out_list))
+                    out_list = []
+
+            if len(out_list) > 0:
+                data_file.write(b"".join(out_list))
+
+    cursor.close()
+    conn.close()
+
+    record_checkpoint_reached(use_checkpoints, tmp_dir_path, chunk_number)
+
+    print_message(f"Done saving formatted data when converting {delimited_file_path} to {f4_file_path} for columns {start_column_index} - {end_column_index - 1}.", verbose)
+
+def parse_and_spool_column_chunks(delimited_file_path, f4_file_path, comment_prefix, delimiter, file_read_chunk_size, column_chunk_indices, tmp_dir_path, tmp_codec, out_items_chunk_size, use_checkpoints, verbose):
+    if has_checkpoint_been_reached_previously(use_checkpoints, tmp_dir_path, 0, verbose):
+        return
+
+    print_message(f"Parsing column names, sizes, and types and spooling values in a single pass when converting {delimited_file_path} to {f4_file_path}.", verbose)
+
+    num_cols = column_chunk_indices[-1][1]
+    column_info = ColumnInfo(0, num_cols)
+    num_rows_per_batch = max(1, out_items_chunk_size // num_cols)
+    rows = []
+
+    spool_files = [open_temp_file_to_compress(get_data_path(tmp_dir_path, "spool", chunk_number), tmp_codec=tmp_codec) for chunk_number in range(len(column_chunk_indices))]
+    spool_lists = [[] for chunk_number in range(len(column_chunk_indices))]
+
+    num_rows = 0
+
+    with get_delimited_file_handle(delimited_file_path) as in_file:
+        skip_comments(in_file, comment_prefix)
+        skip_line(in_file) # Header line
+
+        for line in iterate_delimited_file_lines(in_file, file_read_chunk_size):
+            num_rows += 1
+            print_message(f"Parsing column names, sizes, and types and spooling values in a single pass when converting {delimited_file_path} to {f4_file_path}.", verbose, num_rows)
+
+            line_items = [item.strip(b" ") for item in line.split(delimiter)[:num_cols]]
+            rows.append(line_items)
+
+            for chunk_number, chunk_indices in enumerate(column_chunk_indices):
+                spool_lists[chunk_number].append(delimiter.join(line_items[chunk_indices[0]:chunk_indices[1]]))
+
+            if num_rows % out_items_chunk_size == 0:
+                for chunk_number, spool_file in enumerate(spool_files):
+                    spool_file.write(b"\n".join(spool_lists[chunk_number]) + b"\n")
+                    spool_lists[chunk_number] = []
+
+            if len(rows) == num_rows_per_batch:
+                column_info.add_rows(rows)
+                rows = []
+
+    column_info.add_rows(rows)
+
+    for chunk_number, spool_file in enumerate(spool_files):
+        if len(spool_lists[chunk_number]) > 0:
+            spool_file.write(b"\n".join(spool_lists[chunk_number]) + b"\n")
+
+        spool_file.close()
+
+    # Save the column info for each chunk so the remaining steps are the same as when the file is parsed per chunk.
+    for chunk_number, chunk_indices in enumerate(column_chunk_indices):
+        save_column_info_database(delimited_file_path, comment_prefix, delimiter, file_read_chunk_size, chunk_number, column_info, tmp_dir_path, out_items_chunk_size, chunk_indices[0], chunk_indices[1])
+
+    record_checkpoint_reached(use_checkpoints, tmp_dir_path, 0)
+
+    print_message(f"Done parsing column names, sizes, and types and spooling values in a single pass when converting {delimited_file_path} to {f4_file_path}.", verbose)
+
+# This function is executed in parallel.
+def save_formatted_data_from_spool(delimited_file_path, f4_file_path, delimiter, file_read_chunk_size, chunk_number, start_column_index, end_column_index, tmp_dir_path, tmp_codec, out_items_chunk_size, use_checkpoints, verbose):
+    if has_checkpoint_been_reached_previously(use_checkpoints, tmp_dir_path, chunk_number, verbose):
+        return
+
+    print_message(f"Saving formatted data from spooled values when converting {delimited_file_path} to {f4_file_path} for columns {start_column_index} - {end_column_index - 1}.", verbose)
+
+    conn = connect_sql(get_columns_database_file_path(tmp_dir_path, chunk_number))
+    column_sizes = [row["size"] for row in query_sql(conn, '''SELECT size
+                                                            FROM columns
+                                                            ORDER BY column_index''')]
+    conn.close()
+
+    write_str_to_file(get_data_path(tmp_dir_path, "ll", chunk_number), str(sum(column_sizes)).encode(), False, tmp_codec=tmp_codec)
+
+    spool_file_path = get_data_path(tmp_dir_path, "spool", chunk_number)
+    num_rows = 0
+
+    with open_temp_file_compressed(spool_file_path, tmp_codec=tmp_codec) as spool_file:
+        with open_temp_file_to_compress(get_data_path(tmp_dir_path, "data", chunk_number), tmp_codec=tmp_codec) as data_file:
+            out_list = []
+
+            for line in iterate_delimited_file_lines(spool_file, file_read_chunk_size):
+                out_list.append(b"".join([format_string_as_fixed_width(value, size) for value, size in zip(line.split(delimiter), column_sizes)]))
+
+                num_rows += 1
+                print_message(f"Saving formatted data from spooled values when converting {delimited_file_path} to {f4_file_path} for columns {start_column_index} - {end_column_index - 1}.", verbose, num_rows)
+
+                if len(out_list) == out_items_chunk_size:
+                    data_file.write(b"".join(out_list))
+                    out_list = []
+
+            if len(out_list) > 0:
+                data_file.write(b"".join(out_list))
+
+    remove_tmp_file(spool_file_path)
+
+    record_checkpoint_reached(use_checkpoints, tmp_dir_path, chunk_number)
+
+    print_message(f"Done saving formatted data from spooled values when converting {delimited_file_path} to {f4_file_path} for columns {start_column_index} - {end_column_index - 1}.", verbose)
+
+def generate_sample_line_positions(delimited_file_path, comment_prefix, num_sample_rows):
+    # We can only seek to random positions in uncompressed files.
+    if delimited_file_path.endswith(".gz") or delimited_file_path.endswith(".zstd"):
+        return []
+
+    with open(delimited_file_path, "rb") as in_file:
+        skip_comments(in_file, comment_prefix)
+        skip_line(in_file) # Header line
+
+        data_start = in_file.tell()
+        data_end = path.getsize(delimited_file_path)
+        stride = (data_end - data_start) / num_sample_rows
+
+        # A fixed seed ensures that the same lines are sampled for every column chunk.
+        random_generator = Random(0)
+        positions = set()
+
+        for sample_number in range(num_sample_rows):
+            position = data_start + int((sample_number + random_generator.random()) * stride)
+
+            # Move to the start of the next line.
+            if position > data_start:
+                in_file.seek(position - 1)
+                in_file.readline()
+                position = in_file.tell()
+
+            if position < data_end:
+                positions.add(position)
+
+    return sorted(positions)
+
+# This function is executed in parallel.
+def parse_sampled_column_info(delimited_file_path, f4_file_path, comment_prefix, delimiter, file_read_chunk_size, chunk_number, start_column_index, end_column_index, num_sample_rows, sample_line_positions, tmp_dir_path, out_items_chunk_size, use_checkpoints, verbose):
+    if has_checkpoint_been_reached_previously(use_checkpoints, tmp_dir_path, chunk_number, verbose):
+        return
+
+    print_message(f"Parsing column names, sizes, and types from sampled rows when converting {delimited_file_path} to {f4_file_path} for columns {start_column_index} - {end_column_index - 1}.", verbose)
+
+    column_info = ColumnInfo(start_column_index, end_column_index)
+    rows = []
+
+    with get_delimited_file_handle(delimited_file_path) as in_file:
+        skip_comments(in_file, comment_prefix)
+        skip_line(in_file) # Header line
+
+        # Sample the first rows in the file.
+        for line in iterate_delimited_file_lines(in_file, file_read_chunk_size):
+            rows.append([item.strip(b" ") for item in line.split(delimiter)[start_column_index:end_column_index]])
+
+            if len(rows) == num_sample_rows:
+                break
+
+        # Sample the rows at the randomly selected positions.
+        for position in sample_line_positions:
+            in_file.seek(position)
+            rows.append([item.strip(b" ") for item in in_file.readline().rstrip(b"\n").split(delimiter)[start_column_index:end_column_index]])
+
+    column_info.add_rows(rows)
+
+    save_column_info_database(delimited_file_path, comment_prefix, delimiter, file_read_chunk_size, chunk_number, column_info, tmp_dir_path, out_items_chunk_size)
+
+    record_checkpoint_reached(use_checkpoints, tmp_dir_path, chunk_number)
+
+    print_message(f"Done parsing column names, sizes, and types from sampled rows when converting {delimited_file_path} to {f4_file_path} for columns {start_column_index} - {end_column_index - 1}.", verbose)
+
+# This function is executed in parallel.
+def save_formatted_data_using_sampled_info(delimited_file_path, f4_file_path, comment_prefix, delimiter, file_read_chunk_size, chunk_number, start_column_index, end_column_index, tmp_dir_path, tmp_codec, out_items_chunk_size, use_checkpoints, verbose):
+    if has_checkpoint_been_reached_previously(use_checkpoints, tmp_dir_path, chunk_number, verbose):
+        return
+
+    print_message(f"Saving formatted data using sampled column info when converting {delimited_file_path} to {f4_file_path} for columns {start_column_index} - {end_column_index - 1}.", verbose)
+
+    conn = connect_sql(get_columns_database_file_path(tmp_dir_path, chunk_number))
+    sampled_sizes = np.array([row["size"] for row in query_sql(conn, '''SELECT size
+                                                                     FROM columns
+                                                                     ORDER BY column_index''')], dtype=np.int64)
+    conn.close()
+
+    column_sizes = sampled_sizes.tolist()
+    write_str_to_file(get_data_path(tmp_dir_path, "ll", chunk_number), str(sum(column_sizes)).encode(), False, tmp_codec=tmp_codec)
+
+    # While formatting the data, we also collect column info for all rows. If a value is
+    # wider than its sampled size, we stop writing and format this chunk again afterward.
+    column_info = ColumnInfo(start_column_index, end_column_index)
+    num_rows_per_batch = max(1, out_items_chunk_size // (end_column_index - start_column_index))
+    num_rows = 0
+    overflowed = False
+
+    with get_delimited_file_handle(delimited_file_path) as in_file:
+        skip_comments(in_file, comment_prefix)
+        skip_line(in_file) # Header line
+
+        with open_temp_file_to_compress(get_data_path(tmp_dir_path, "data", chunk_number), tmp_codec=tmp_codec) as data_file:
+            rows = []
+
+            for column_index, value in iterate_delimited_file_column_indices(in_file, delimiter, file_read_chunk_size, start_column_index, end_column_index):
+                if column_index == start_column_index:
+                    if len(rows) == num_rows_per_batch:
+                        overflowed = save_sampled_rows(rows, column_sizes, sampled_sizes, column_info, data_file, overflowed)
+                        rows = []
+
+                    num_rows += 1
+                    print_message(f"Saving formatted data using sampled column info when converting {delimited_file_path} to {f4_file_path} for columns {start_column_index} - {end_column_index - 1}.", verbose, num_rows)
+
+                    rows.append([])
+
+                rows[-1].append(value)
+
+            overflowed = save_sampled_rows(rows, column_sizes, sampled_sizes, column_info, data_file, overflowed)
+
+    # The database is updated with column info from all the rows because types may have changed.
+    remove_tmp_file(get_columns_database_file_path(tmp_dir_path, chunk_number))
+    save_column_info_database(delimited_file_path, comment_prefix, delimiter, file_read_chunk_size, chunk_number, column_info, tmp_dir_path, out_items_chunk_size)
+
+    if overflowed:
+        print_message(f"Values were wider than the sampled column sizes, so formatting data again when converting {delimited_file_path} to {f4_file_path} for columns {start_column_index} - {end_column_index - 1}.", verbose)
+        save_formatted_data(delimited_file_path, f4_file_path, comment_prefix, delimiter, file_read_chunk_size, chunk_number, start_column_index, end_column_index, tmp_dir_path, tmp_codec, out_items_chunk_size, False, verbose)
+
+    record_checkpoint_reached(use_checkpoints, tmp_dir_path, chunk_number)
+
+    print_message(f"Done saving formatted data using sampled column info when converting {delimited_file_path} to {f4_file_path} for columns {start_column_index} - {end_column_index - 1}.", verbose)
+
+def save_sampled_rows(rows, column_sizes, sampled_sizes, column_info, data_file, overflowed):
+    column_info.add_rows(rows)
+
+    if overflowed or np.any(column_info.sizes > sampled_sizes):
+        return True
+
+    data_file.write(b"".join([b"".join([format_string_as_fixed_width(value, size) for value, size in zip(row, column_sizes)]) for row in rows]))
+
+    return False
+
+def save_column_info_database(delimited_file_path, comment_prefix, delimiter, file_read_chunk_size, chunk_number, column_info, tmp_dir_path, out_items_chunk_size, start_column_index=None, end_column_index=None):
+    # By default, we save all the columns in column_info. A subset can be saved instead.
+    if start_column_index is None:
+        start_column_index = column_info.start_column_index
+        end_column_index = column_info.end_column_index
+
+    conn = connect_sql(get_columns_database_file_path(tmp_dir_path, chunk_number))
+    cursor = conn.cursor()
+    cursor.execute('BEGIN TRANSACTION')
+
+    create_column_database(cursor)
+    populate_database_with_column_names(delimited_file_path, comment_prefix, delimiter, file_read_chunk_size, start_column_index, end_column_index, out_items_chunk_size, cursor)
+
+    sql_update = '''UPDATE columns
+                    SET size = ?, num_i = ?, num_f = ?, num_s = ?, inferred_type = ?
+                    WHERE column_index = ?'''
+
+    start_offset = start_column_index - column_info.start_column_index
+    end_offset = end_column_index - column_info.start_column_index
+
+    sizes = column_info.sizes[start_offset:end_offset].tolist()
+    num_i = column_info.num_i[start_offset:end_offset].tolist()
+    num_f = column_info.num_f[start_offset:end_offset].tolist()
+    num_s = column_info.num_s[start_offset:end_offset].tolist()
+
+    cursor.executemany(sql_update, ((sizes[i], num_i[i], num_f[i], num_s[i], infer_column_type(num_i[i], num_f[i], num_s[i]), start_column_index + i) for i in range(end_column_index - start_column_index)))
+
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+def generate_row_ranges(delimited_file_path, comment_prefix, num_parallel):
+    with open(delimited_file_path, "rb") as in_file:
+        skip_comments(in_file, comment_prefix)
+        skip_line(in_file) # Header line
+
+        data_start = in_file.tell()
+        data_end = path.getsize(delimited_file_path)
+        approximate_range_size = ceil((data_end - data_start) / num_parallel)
+
+        boundaries = [data_start]
+
+        for range_number in range(1, num_parallel):
+            position = data_start + range_number * approximate_range_size
+
+            if position >= data_end:
+                break
+
+            # Move the boundary to the start of the next line.
+            in_file.seek(position - 1)
+            in_file.readline()
+            position = in_file.tell()
+
+            if boundaries[-1] < position < data_end:
+                boundaries.append(position)
+
+        boundaries.append(data_end)
+
+    return [[boundaries[i], boundaries[i + 1]] for i in range(len(boundaries) - 1)]
+
+# This function is executed in parallel.
+def parse_row_range_column_info(delimited_file_path, f4_file_path, delimiter, file_read_chunk_size, range_number, range_start, range_end, num_cols, tmp_dir_path, tmp_codec, out_items_chunk_size, use_checkpoints, verbose):
+    if has_checkpoint_been_reached_previously(use_checkpoints, tmp_dir_path, range_number, verbose):
+        return
+
+    print_message(f"Parsing column sizes and types when converting {delimited_file_path} to {f4_file_path} for bytes {range_start} - {range_end - 1}.", verbose)
+
+    column_info = ColumnInfo(0, num_cols)
+    num_rows_per_batch = max(1, out_items_chunk_size // num_cols)
+    rows = []
+    num_rows = 0
+
+    with open(delimited_file_path, "rb") as in_file:
+        in_file.seek(range_start)
+
+        for line in iterate_delimited_file_lines(in_file, file_read_chunk_size, range_end - range_start):
+            num_rows += 1
+            print_message(f"Parsing column sizes and types when converting {delimited_file_path} to {f4_file_path} for bytes {range_start} - {range_end - 1}.", verbose, num_rows)
+
+            line_items = [item.strip(b" ") for item in line.split(delimiter)[:num_cols]]
+            rows.append(line_items)
+
+            if len(rows) == num_rows_per_batch:
+                column_info.add_rows(rows)
+                rows = []
+
+    column_info.add_rows(rows)
+
+    write_str_to_file(get_data_path(tmp_dir_path, "rangeinfo", range_number), column_info.serialize(), False, tmp_codec=tmp_codec)
+
+    record_checkpoint_reached(use_checkpoints, tmp_dir_path, range_number)
+
+def combine_row_range_column_info(delimited_file_path, f4_file_path, comment_prefix, delimiter, file_read_chunk_size, row_ranges, num_cols, tmp_dir_path, tmp_codec, out_items_chunk_size, use_checkpoints, verbose):
+    if has_checkpoint_been_reached_previously(use_checkpoints, tmp_dir_path, 0, verbose):
+        return
+
+    print_message(f"Combining column sizes and types across row ranges when converting {delimited_file_path} to {f4_file_path}.", verbose)
+
+    column_info = ColumnInfo(0, num_cols)
+
+    for range_number in range(len(row_ranges)):
+        column_info.merge(ColumnInfo.deserialize(read_str_from_file(get_data_path(tmp_dir_path, "rangeinfo", range_number), tmp_codec=tmp_codec)))
 
-    num_columns_to_parse = end_column_index - start_column_index
-    data_value_count = 0
+    save_column_info_database(delimited_file_path, comment_prefix, delimiter, file_read_chunk_size, 0, column_info, tmp_dir_path, out_items_chunk_size)
+    write_str_to_file(get_data_path(tmp_dir_path, "ll", 0), str(int(column_info.sizes.sum())).encode(), False, tmp_codec=tmp_codec)
 
-    with get_delimited_file_handle(delimited_file_path) as in_file:
-        skip_comments(in_file, comment_prefix)
-        skip_line(in_file)  # Header line
+    record_checkpoint_reached(use_checkpoints, tmp_dir_path, 0)
 
-        # Save data.
-        with open_temp_file_to_compress(get_data_path(tmp_dir_path, "data", chunk_number)) as data_file:
-            out_list = []
+    for range_number in range(len(row_ranges)):
+        remove_tmp_file(get_data_path(tmp_dir_path, "rangeinfo", range_number))
 
-            column_size_cache = {}
-            if num_columns_to_parse <= 1000:
-                cursor.close()
-                cursor = conn.cursor()
-                cursor.execute('''SELECT size
-                                  FROM columns''')
+# This function is executed in parallel.
+def save_formatted_data_for_row_range(delimited_file_path, f4_file_path, delimiter, file_read_chunk_size, range_number, range_start, range_end, num_cols, tmp_dir_path, tmp_codec, out_items_chunk_size, use_checkpoints, verbose):
+    if has_checkpoint_been_reached_previously(use_checkpoints, tmp_dir_path, range_number, verbose):
+        return
 
-                for column_index in range(start_column_index, end_column_index):
-                    column_size_cache[column_index] = cursor.fetchone()["size"]
+    print_message(f"Saving formatted data when converting {delimited_file_path} to {f4_file_path} for bytes {range_start} - {range_end - 1}.", verbose)
 
-            for column_index, value in iterate_delimited_file_column_indices(in_file, delimiter, file_read_chunk_size, start_column_index, end_column_index):
-                if len(column_size_cache) == 0:
-                    if column_index == start_column_index:
-                        cursor.close()
-                        cursor = conn.cursor()
-                        cursor.execute('''SELECT size
-                                          FROM columns''')
+    conn = connect_sql(get_columns_database_file_path(tmp_dir_path, 0))
+    column_sizes = [row["size"] for row in query_sql(conn, '''SELECT size
+                                                            FROM columns
+                                                            ORDER BY column_index''')]
+    conn.close()
 
-                    column_size = cursor.fetchone()["size"]
-                else:
-                    column_size = column_size_cache[column_index]
+    num_rows = 0
 
-                out_list.append(format_string_as_fixed_width(value, column_size))
+    with open(delimited_file_path, "rb") as in_file:
+        in_file.seek(range_start)
 
-                data_value_count += 1
-                print_message(f"Saving formatted data for when converting {delimited_file_path} to {f4_file_path} for columns {start_column_index} - {end_column_index - 1}.", verbose, data_value_count / num_columns_to_parse)
+        with open_temp_file_to_compress(get_data_path(tmp_dir_path, "rowdata", range_number), tmp_codec=tmp_codec) as data_file:
+            out_list = []
+
+            for line in iterate_delimited_file_lines(in_file, file_read_chunk_size, range_end - range_start):
+                out_list.append(b"".join([format_string_as_fixed_width(value.strip(b" "), size) for value, size in zip(line.split(delimiter), column_sizes)]))
+
+                num_rows += 1
+                print_message(f"Saving formatted data when converting {delimited_file_path} to {f4_file_path} for bytes {range_start} - {range_end - 1}.", verbose, num_rows)
 
                 if len(out_list) == out_items_chunk_size:
                     data_file.write(b"".join(out_list))
@@ -358,12 +1057,11 @@ def save_formatted_data(delimited_file_path, f4_file_path, comment_prefix, delim
             if len(out_list) > 0:
                 data_file.write(b"".join(out_list))
 
-    cursor.close()
-    conn.close()
+    write_str_to_file(get_data_path(tmp_dir_path, "rownum", range_number), str(num_rows).encode(), False, tmp_codec=tmp_codec)
 
-    record_checkpoint_reached(use_checkpoints, tmp_dir_path, chunk_number)
+    record_checkpoint_reached(use_checkpoints, tmp_dir_path, range_number)
 
-    print_message(f"Done saving formatted data when converting {delimited_file_path} to {f4_file_path} for columns {start_column_index} - {end_column_index - 1}.", verbose)
+    print_message(f"Done saving formatted data when converting {delimited_file_path} to {f4_file_path} for bytes {range_start} - {range_end - 1}.", verbose)
 
 def combine_column_databases(delimited_file_path, f4_file_path, column_chunk_indices, tmp_dir_path, use_checkpoints, verbose):
     if has_checkpoint_been_reached_previously(use_checkpoints, tmp_dir_path, 0, verbose):
@@ -399,7 +1097,7 @@ def get_max_column_length(cursor, column_name):
     cursor.execute(sql)
     return cursor.fetchone()["max_length"]
 
-def save_column_name_info(delimited_file_path, f4_file_path, out_items_chunk_size, tmp_dir_path, use_checkpoints, verbose):
+def save_column_name_info(delimited_file_path, f4_file_path, out_items_chunk_size, tmp_dir_path, tmp_codec, use_checkpoints, verbose):
     if has_checkpoint_been_reached_previously(use_checkpoints, tmp_dir_path, 0, verbose):
         return
 
@@ -416,15 +1114,15 @@ def save_column_name_info(delimited_file_path, f4_file_path, out_items_chunk_siz
     ##########################################################
 
     cniccml = max(len(str(max_column_name_length)), len(str(max_column_name_length + max_column_index_length)))
-    write_str_to_file(get_data_path(tmp_dir_path, "cniccml"), str(cniccml).encode())
+    write_str_to_file(get_data_path(tmp_dir_path, "cniccml"), str(cniccml).encode(), tmp_codec=tmp_codec)
 
     cnicc = format_string_as_fixed_width(b"0", cniccml)
     cnicc += format_string_as_fixed_width(str(max_column_name_length).encode(), cniccml)
     cnicc += format_string_as_fixed_width(str(max_column_name_length + max_column_index_length).encode(), cniccml)
-    write_str_to_file(get_data_path(tmp_dir_path, "cnicc"), cnicc)
+    write_str_to_file(get_data_path(tmp_dir_path, "cnicc"), cnicc, tmp_codec=tmp_codec)
 
     cni_file_original_size = 0
-    with open_temp_file_to_compress(get_data_path(tmp_dir_path, "cni")) as data_file:
+    with open_temp_file_to_compress(get_data_path(tmp_dir_path, "cni"), tmp_codec=tmp_codec) as data_file:
         sql = f'''SELECT CAST(column_name AS TEXT) AS column_name, CAST(column_index AS TEXT) AS column_index
                   FROM columns
                   ORDER BY column_name'''
@@ -444,7 +1142,7 @@ def save_column_name_info(delimited_file_path, f4_file_path, out_items_chunk_siz
     write_temp_file_original_size(get_data_path(tmp_dir_path, "cni"), cni_file_original_size)
 
     cn_file_original_size = 0
-    with open_temp_file_to_compress(get_data_path(tmp_dir_path, "cn")) as data_file:
+    with open_temp_file_to_compress(get_data_path(tmp_dir_path, "cn"), tmp_codec=tmp_codec) as data_file:
         sql = f'''SELECT CAST(column_name AS TEXT) AS column_name
                   FROM columns
                   ORDER BY column_index'''
@@ -476,7 +1174,7 @@ def save_column_name_info(delimited_file_path, f4_file_path, out_items_chunk_siz
 
     record_checkpoint_reached(use_checkpoints, tmp_dir_path, 0)
 
-def save_column_types(delimited_file_path, f4_file_path, out_items_chunk_size, tmp_dir_path, use_checkpoints, verbose):
+def save_column_types(delimited_file_path, f4_file_path, out_items_chunk_size, tmp_dir_path, tmp_codec, use_checkpoints, verbose):
     if has_checkpoint_been_reached_previously(use_checkpoints, tmp_dir_path, 0, verbose):
         return
 
@@ -488,7 +1186,7 @@ def save_column_types(delimited_file_path, f4_file_path, out_items_chunk_size, t
     max_type_length = 1 # This should always be 1 unless we add a bunch of types.
 
     ct_file_original_size = 0
-    with open_temp_file_to_compress(get_data_path(tmp_dir_path, "ct")) as data_file:
+    with open_temp_file_to_compress(get_data_path(tmp_dir_path, "ct"), tmp_codec=tmp_codec) as data_file:
         sql = f'''SELECT CAST(inferred_type AS TEXT) AS inferred_type
                   FROM columns
                   ORDER BY column_index'''
@@ -513,7 +1211,7 @@ def save_column_types(delimited_file_path, f4_file_path, out_items_chunk_size, t
 
     record_checkpoint_reached(use_checkpoints, tmp_dir_path, 0)
 
-def save_column_coordinates(delimited_file_path, f4_file_path, out_items_chunk_size, tmp_dir_path, use_checkpoints, verbose):
+def save_column_coordinates(delimited_file_path, f4_file_path, out_items_chunk_size, tmp_dir_path, tmp_codec, use_checkpoints, verbose):
     if has_checkpoint_been_reached_previously(use_checkpoints, tmp_dir_path, 0, verbose):
         return
 
@@ -528,7 +1226,7 @@ def save_column_coordinates(delimited_file_path, f4_file_path, out_items_chunk_s
     max_coord_length = len(str(cursor.fetchone()["size"]))
 
     cc_file_original_size = 0
-    with open_temp_file_to_compress(get_data_path(tmp_dir_path, "cc")) as data_file:
+    with open_temp_file_to_compress(get_data_path(tmp_dir_path, "cc"), tmp_codec=tmp_codec) as data_file:
         sql = f'''SELECT size AS size
                   FROM columns
                   ORDER BY column_index'''
@@ -556,38 +1254,40 @@ def save_column_coordinates(delimited_file_path, f4_file_path, out_items_chunk_s
 
     write_temp_file_original_size(get_data_path(tmp_dir_path, "cc"), cc_file_original_size)
 
-    write_str_to_file(get_data_path(tmp_dir_path, "ccml"), str(max_coord_length).encode())
+    write_str_to_file(get_data_path(tmp_dir_path, "ccml"), str(max_coord_length).encode(), tmp_codec=tmp_codec)
 
     record_checkpoint_reached(use_checkpoints, tmp_dir_path, 0)
 
-def combine_data_for_column_chunks(delimited_file_path, f4_file_path, column_chunk_indices, tmp_dir_path, use_checkpoints, verbose):
+def combine_data_for_column_chunks(delimited_file_path, f4_file_path, column_chunk_indices, tmp_dir_path, tmp_codec, num_parallel, use_checkpoints, verbose):
     if has_checkpoint_been_reached_previously(use_checkpoints, tmp_dir_path, 0, verbose):
         return
 
     print_message(f"Combining data for column chunks when converting {delimited_file_path} to {f4_file_path}.", verbose)
 
-    file_handles = {}
-    for chunk_number in range(len(column_chunk_indices)):
-        file_handles[chunk_number] = open_temp_file_compressed(get_data_path(tmp_dir_path, "data", chunk_number))
-
-    line_lengths = {}
+    line_lengths = []
     for chunk_number in range(len(column_chunk_indices)):
         line_length_file_path = get_data_path(tmp_dir_path, "ll", chunk_number)
-        line_lengths[chunk_number] = int(read_str_from_file(line_length_file_path))
+        line_lengths.append(int(read_str_from_file(line_length_file_path, tmp_codec=tmp_codec)))
 
-    line_length_total = sum(line_lengths.values())
+    line_length_total = sum(line_lengths)
 
-    out_file_original_size = 0
-    with open_temp_file_to_compress(get_data_path(tmp_dir_path, "data")) as out_file:
-        num_rows = 0
-        while line_0 := file_handles[0].read(line_lengths[0]):
-            num_rows += 1
-            out_file_original_size += out_file.write(line_0)
+    # Uncompressed chunk files support real seeks, so the rows can be divided among parallel workers.
+    # Otherwise, we read the chunk files from start to end in a single process.
+    if tmp_codec == "raw" and num_parallel > 1 and line_lengths[0] > 0:
+        num_rows = path.getsize(get_data_path(tmp_dir_path, "data", 0)) // line_lengths[0]
 
-            for chunk_number in range(1, len(column_chunk_indices)):
-                out_file_original_size += out_file.write(file_handles[chunk_number].read(line_lengths[chunk_number]))
+        with open(get_data_path(tmp_dir_path, "data"), "wb") as out_file:
+            preallocate_file(out_file.fileno(), num_rows * line_length_total)
 
-    write_temp_file_original_size(get_data_path(tmp_dir_path, "data"), out_file_original_size)
+        num_rows_per_range = max(1, ceil(num_rows / num_parallel))
+        row_ranges = [[start_row_index, min(start_row_index + num_rows_per_range, num_rows)] for start_row_index in range(0, num_rows, num_rows_per_range)]
+
+        joblib.Parallel(n_jobs=num_parallel)(joblib.delayed(interleave_column_chunk_rows)(tmp_dir_path, tmp_codec, line_lengths, row_range[0], row_range[1]) for row_range in row_ranges)
+    else:
+        open(get_data_path(tmp_dir_path, "data"), "wb").close()
+        num_rows = interleave_column_chunk_rows(tmp_dir_path, tmp_codec, line_lengths, 0, None)
+
+    write_temp_file_original_size(get_data_path(tmp_dir_path, "data"), num_rows * line_length_total)
 
     record_checkpoint_reached(use_checkpoints, tmp_dir_path, 0)
 
@@ -596,213 +1296,356 @@ def combine_data_for_column_chunks(delimited_file_path, f4_file_path, column_chu
         remove_tmp_file(get_data_path(tmp_dir_path, "data", chunk_number))
 
     # We save these numbers to files so we can retrieve them when checkpoints are used.
-    write_str_to_file(f"{tmp_dir_path}num_rows", str(num_rows).encode(), False)
-    write_str_to_file(f"{tmp_dir_path}line_length_total", str(line_length_total).encode(), False)
+    write_str_to_file(f"{tmp_dir_path}num_rows", str(num_rows).encode(), False, tmp_codec=tmp_codec)
+    write_str_to_file(f"{tmp_dir_path}line_length_total", str(line_length_total).encode(), False, tmp_codec=tmp_codec)
+
+# This function is executed in parallel.
+# It reads many rows at a time from each column chunk, assembles them in a reusable buffer,
+# and writes the assembled rows to their final position. When end_row_index is None,
+# it continues until the chunk files have been read completely.
+def interleave_column_chunk_rows(tmp_dir_path, tmp_codec, line_lengths, start_row_index, end_row_index, max_block_size=10000000):
+    file_handles = [open_temp_file_compressed(get_data_path(tmp_dir_path, "data", chunk_number), tmp_codec=tmp_codec) for chunk_number in range(len(line_lengths))]
+
+    try:
+        for file_handle, line_length in zip(file_handles, line_lengths):
+            if start_row_index > 0:
+                file_handle.seek(start_row_index * line_length)
+
+        return interleave_rows(file_handles, line_lengths, get_data_path(tmp_dir_path, "data"), start_row_index, end_row_index, max_block_size)
+    finally:
+        for file_handle in file_handles:
+            file_handle.close()
+
+# This function places side by side the rows that are read from each file handle, starting at the current
+# position of each handle. The combined rows are written to out_file_path, beginning at start_row_index.
+def interleave_rows(file_handles, line_lengths, out_file_path, start_row_index, end_row_index, max_block_size=10000000):
+    line_length_total = sum(line_lengths)
+    num_rows_per_block = max(1, max_block_size // max(1, line_length_total))
+    block_buffer = np.empty((num_rows_per_block, line_length_total), dtype=np.uint8)
+    chunk_starts = np.cumsum([0] + line_lengths[:-1]).tolist()
+    num_rows = 0
+
+    with open(out_file_path, "r+b") as out_file:
+        out_file_descriptor = out_file.fileno()
+
+        while end_row_index is None or start_row_index + num_rows < end_row_index:
+            num_rows_to_read = num_rows_per_block if end_row_index is None else min(num_rows_per_block, end_row_index - start_row_index - num_rows)
+
+            chunk_data = file_handles[0].read(num_rows_to_read * line_lengths[0])
+            num_block_rows = len(chunk_data) // line_lengths[0] if line_lengths[0] > 0 else 0
+
+            if num_block_rows == 0:
+                break
+
+            for chunk_number, line_length in enumerate(line_lengths):
+                if chunk_number > 0:
+                    chunk_data = file_handles[chunk_number].read(num_block_rows * line_length)
+
+                block_buffer[:num_block_rows, chunk_starts[chunk_number]:(chunk_starts[chunk_number] + line_length)] = np.frombuffer(chunk_data, dtype=np.uint8).reshape(num_block_rows, line_length)
+
+            write_to_position(out_file_descriptor, block_buffer[:num_block_rows].reshape(-1), (start_row_index + num_rows) * line_length_total)
+            num_rows += num_block_rows
 
-def build_indexes(f4_file_path, tmp_dir_path, index_columns, num_rows, line_length, num_parallel, columns_database_file_path, use_checkpoints, verbose=False):
+    return num_rows
+
+def combine_data_for_row_ranges(delimited_file_path, f4_file_path, row_ranges, tmp_dir_path, tmp_codec, use_checkpoints, verbose):
     if has_checkpoint_been_reached_previously(use_checkpoints, tmp_dir_path, 0, verbose):
         return
 
-    index_info_dict = {}
+    print_message(f"Combining data for row ranges when converting {delimited_file_path} to {f4_file_path}.", verbose)
+
+    line_length_total = int(read_str_from_file(get_data_path(tmp_dir_path, "ll", 0), tmp_codec=tmp_codec))
+    num_rows = 0
+
+    out_file_original_size = 0
+    with open(get_data_path(tmp_dir_path, "data"), "wb") as out_file:
+        for range_number in range(len(row_ranges)):
+            num_rows += int(read_str_from_file(get_data_path(tmp_dir_path, "rownum", range_number), tmp_codec=tmp_codec))
+
+            with open_temp_file_compressed(get_data_path(tmp_dir_path, "rowdata", range_number), tmp_codec=tmp_codec) as range_file:
+                while chunk := range_file.read(1000000):
+                    out_file_original_size += out_file.write(chunk)
+
+    write_temp_file_original_size(get_data_path(tmp_dir_path, "data"), out_file_original_size)
+
+    record_checkpoint_reached(use_checkpoints, tmp_dir_path, 0)
+
+    remove_tmp_file(get_data_path(tmp_dir_path, "ll", 0))
+
+    for range_number in range(len(row_ranges)):
+        remove_tmp_file(get_data_path(tmp_dir_path, "rownum", range_number))
+        remove_tmp_file(get_data_path(tmp_dir_path, "rowdata", range_number))
+
+    # We save these numbers to files so we can retrieve them when checkpoints are used.
+    write_str_to_file(f"{tmp_dir_path}num_rows", str(num_rows).encode(), False, tmp_codec=tmp_codec)
+    write_str_to_file(f"{tmp_dir_path}line_length_total", str(line_length_total).encode(), False, tmp_codec=tmp_codec)
+
+def build_indexes(f4_file_path, tmp_dir_path, tmp_codec, index_columns, num_rows, line_length, num_parallel, columns_database_file_path, use_checkpoints, verbose=False, num_rows_per_run=1000000):
+    if has_checkpoint_been_reached_previously(use_checkpoints, tmp_dir_path, 0, verbose):
+        return
 
     if isinstance(index_columns, str):
-        index_columns, reverse_status_dict = check_index_column_reverse_status([index_columns])
-
-        build_index(f4_file_path, tmp_dir_path, 0, index_columns, reverse_status_dict, num_rows, line_length, columns_database_file_path, verbose)
-        index_info_dict[(index_columns, reverse_status_dict[index_columns])] = 0
-    elif isinstance(index_columns, list):
-        # Verify whether the index_columns are valid.
-        # TODO: Move this logic earlier in the overall process so it fails sooner.
-        for i, index_column in enumerate(index_columns):
-            if not isinstance(index_column, str) and not isinstance(index_column, list):
-                raise Exception("When specifying index columns, they must either be a string or a list.")
-
-            if "|" in index_column:
-                raise Exception("You may not index a column with a vertical bar (|) in its name.")
-
-        keys = joblib.Parallel(n_jobs=num_parallel)(
-            joblib.delayed(build_index_parallel)(f4_file_path, tmp_dir_path, num_rows, line_length, i, index_column, columns_database_file_path, verbose)
-            for i, index_column in enumerate(index_columns)
-        )
-
-        for i, key in enumerate(keys):
-            index_info_dict[key] = i
-    else:
+        index_columns = [index_columns]
+    elif not isinstance(index_columns, list):
         raise Exception("When specifying index columns, they must either be a string or a list.")
 
-    write_str_to_file(f"{tmp_dir_path}i", serialize(index_info_dict))
+    # Verify whether the index_columns are valid.
+    # TODO: Move this logic earlier in the overall process so it fails sooner.
+    for i, index_column in enumerate(index_columns):
+        if not isinstance(index_column, str) and not isinstance(index_column, list):
+            raise Exception("When specifying index columns, they must either be a string or a list.")
+
+        if "|" in index_column:
+            raise Exception("You may not index a column with a vertical bar (|) in its name.")
 
-    record_checkpoint_reached(use_checkpoints, tmp_dir_path, 0)
+    index_column_lists = []
+    index_column_infos = []
+    keys = []
 
-def build_index(f4_file_path, tmp_dir_path, index_number, index_columns, reverse_status_dict, num_rows, line_length, columns_database_file_path, verbose):
-    out_index_file_path_prefix = f"{tmp_dir_path}i{index_number}"
-    ccml = fast_int(read_str_from_file(get_data_path(tmp_dir_path, "ccml")))
+    for index_column in index_columns:
+        index_column_list = [index_column] if isinstance(index_column, str) else list(index_column)
+        index_column_list, reverse_status_dict = check_index_column_reverse_status(index_column_list)
 
-    print_message(f"Saving index information for {', '.join(index_columns)} column(s) in {f4_file_path}.", verbose)
+        index_column_lists.append(index_column_list)
+        index_column_infos.append(get_index_column_info(tmp_dir_path, tmp_codec, index_column_list, reverse_status_dict, columns_database_file_path))
+        keys.append(tuple([(x, reverse_status_dict[x]) for x in index_column_list]))
+
+    # Extract the values for all indexes in one scan of the data.
+    num_runs = save_index_runs(f4_file_path, tmp_dir_path, tmp_codec, index_column_infos, num_rows, line_length, num_rows_per_run, verbose)
+
+    # Sort and merge the runs for each index in parallel.
+    joblib.Parallel(n_jobs=num_parallel)(
+        joblib.delayed(merge_index_runs)(f4_file_path, tmp_dir_path, tmp_codec, index_number, index_column_lists[index_number], index_column_infos[index_number], num_rows, num_runs, verbose)
+        for index_number in range(len(index_columns))
+    )
+
+    index_info_dict = {}
+    for i, key in enumerate(keys):
+        index_info_dict[key] = i
+
+    write_str_to_file(f"{tmp_dir_path}i", serialize(index_info_dict), tmp_codec=tmp_codec)
+
+    record_checkpoint_reached(use_checkpoints, tmp_dir_path, 0)
 
-    # Collect other information about each column.
+def get_index_column_info(tmp_dir_path, tmp_codec, index_columns, reverse_status_dict, columns_database_file_path):
+    ccml = fast_int(read_str_from_file(get_data_path(tmp_dir_path, "ccml"), tmp_codec=tmp_codec))
+
+    # Collect information about each column.
     conn = connect_sql(columns_database_file_path)
     sql = f'''SELECT column_index, TRIM(column_name) AS column_name, inferred_type
     FROM columns
     WHERE TRIM(column_name) IN ("{'", "'.join(index_columns)}")
     ORDER BY column_index'''
 
-    index_columns_index_dict = {}
     index_columns_name_dict = {}
 
     for row in query_sql(conn, sql):
         column_name = row["column_name"]
-        column_index = row["column_index"]
+        start_coord, end_coord = get_column_index_coords(tmp_dir_path, tmp_codec, row["column_index"], ccml)
+
+        # Every value in a column has the same (fixed) width.
+        index_columns_name_dict[column_name] = {
+            "column_name": column_name,
+            "reverse_status": reverse_status_dict[column_name],
+            "type": row["inferred_type"],
+            "start_coord": start_coord,
+            "end_coord": end_coord,
+            "max_value_length": end_coord - start_coord
+        }
 
-        index_columns_index_dict[column_index] = {}
-        index_columns_index_dict[column_index]["column_name"] = column_name
-        index_columns_index_dict[column_index]["reverse_status"] = reverse_status_dict[column_name]
-        index_columns_index_dict[column_index]["type"] = row["inferred_type"]
+    conn.close()
 
-        start_coord, end_coord = get_column_index_coords(tmp_dir_path, column_index, ccml)
-        index_columns_index_dict[column_index]["start_coord"] = start_coord
-        index_columns_index_dict[column_index]["end_coord"] = end_coord
-        index_columns_index_dict[column_index]["max_value_length"] = 0
+    return [index_columns_name_dict[index_column] for index_column in index_columns]
 
-        index_columns_name_dict[column_name] = column_index
+# By default, all rows are extracted from the data in the temp directory. When rows are appended,
+# only the rows from start_row_index onward are extracted. The data can also be in an existing F4 file.
+def save_index_runs(f4_file_path, tmp_dir_path, tmp_codec, index_column_infos, num_rows, line_length, num_rows_per_run, verbose, start_row_index=0, first_run_number=0, data_file_path=None, data_start=0):
+    print_message(f"Extracting values for {len(index_column_infos)} index(es) in {f4_file_path}.", verbose)
 
-    conn.close()
+    if data_file_path is None:
+        data_file_path = get_data_path(tmp_dir_path, "data")
 
-    index_column_indexes_sorted = sorted(list(index_columns_index_dict.keys()))
+    max_row_index_length = len(str(num_rows - 1))
 
-    sql_create_table = f'CREATE TABLE index_data (index_column{index_column_indexes_sorted[0]} TEXT NOT NULL'
-    for i in range(1, len(index_column_indexes_sorted)):
-        sql_create_table += f", index_column{index_column_indexes_sorted[i]} TEXT NOT NULL"
-    sql_create_table += ")"
+    # Each column is extracted only once, even if it is used in multiple indexes.
+    column_coords = sorted(set([(info["start_coord"], info["end_coord"]) for index_column_info in index_column_infos for info in index_column_info]))
 
-    index_database_file_path = f"{out_index_file_path_prefix}.db"
-    conn = connect_sql(index_database_file_path)
-    execute_sql(conn, sql_create_table)
+    # We limit how much data we extract at a time in case the values are long.
+    num_rows_per_read = max(1, min(num_rows_per_run, 10000000 // max(sum([coords[1] - coords[0] for coords in column_coords]), 1)))
 
-    non_committed_values = []
-    cursor = conn.cursor()
-    cursor.execute('BEGIN TRANSACTION')
+    num_runs = first_run_number
+    run_lists = [[] for info in index_column_infos]
 
-    sql_insert = f'''INSERT INTO index_data ({', '.join([f"index_column{index_column_indexes_sorted[i]}" for i in range(len(index_column_indexes_sorted))])})
-                     VALUES ({', '.join(['?' for x in index_column_indexes_sorted])})'''
+    with open(data_file_path, "rb") as data_file:
+        with mmap(data_file.fileno(), 0, prot=PROT_READ) as mmap_handle:
+            # Viewing the data as a matrix lets us extract the bytes for the indexed columns
+            # without reading the other columns (when the lines are long).
+            data_array = np.frombuffer(mmap_handle, dtype=np.uint8, count=num_rows * line_length, offset=data_start).reshape(num_rows, line_length)
 
-    with open_temp_file_compressed(get_data_path(tmp_dir_path, "data")) as data_file:
-        for row_index in range(num_rows):
-            start_pos = row_index * line_length
+            for read_start_row_index in range(start_row_index, num_rows, num_rows_per_read):
+                read_end_row_index = min(read_start_row_index + num_rows_per_read, num_rows)
+                num_read_rows = read_end_row_index - read_start_row_index
+                print_message(f"Extracting values for {len(index_column_infos)} index(es) in {f4_file_path}.", verbose, read_end_row_index)
 
-            values = []
-            for index_column_index in index_column_indexes_sorted:
-                this_start_pos = start_pos + index_columns_index_dict[index_column_index]["start_coord"]
-                this_end_pos = start_pos + index_columns_index_dict[index_column_index]["end_coord"]
-                data_file.seek(this_start_pos)
-                value = data_file.read(this_end_pos - this_start_pos)
+                row_indices = [format_string_as_fixed_width(str(row_index).encode(), max_row_index_length) for row_index in range(read_start_row_index, read_end_row_index)]
 
-                if index_columns_index_dict[index_column_index]["reverse_status"]:
-                    value = reverse_string(value)
+                column_values_dict = {}
+                for coords in column_coords:
+                    value_length = coords[1] - coords[0]
+                    column_data = data_array[read_start_row_index:read_end_row_index, coords[0]:coords[1]].tobytes()
+                    column_values_dict[coords] = [column_data[(i * value_length):((i + 1) * value_length)] for i in range(num_read_rows)]
 
-                values.append(value)
-                index_columns_index_dict[index_column_index]["max_value_length"] = max(index_columns_index_dict[index_column_index]["max_value_length"], len(value))
+                for index_number, index_column_info in enumerate(index_column_infos):
+                    values_by_column = []
 
-            non_committed_values.append(values)
-            if len(non_committed_values) == 10000:
-                cursor.executemany(sql_insert, non_committed_values)
-                non_committed_values = []
+                    for info in index_column_info:
+                        values = column_values_dict[(info["start_coord"], info["end_coord"])]
 
-        if len(non_committed_values) > 0:
-            cursor.executemany(sql_insert, non_committed_values)
+                        if info["reverse_status"]:
+                            values = [reverse_string(value) for value in values]
 
-    conn.commit()
-    cursor.close()
-    conn.close()
+                        values_by_column.append(values)
+
+                    # Each record has the layout of the final index.
+                    values_by_column.append(row_indices)
+                    run_lists[index_number].extend(map(b"".join, zip(*values_by_column)))
+
+                # Save a run when it reaches the maximum size (or when we have reached the end).
+                if len(run_lists[0]) >= num_rows_per_run or read_end_row_index == num_rows:
+                    for index_number, run_list in enumerate(run_lists):
+                        write_str_to_file(get_data_path(tmp_dir_path, f"i{index_number}run", num_runs), b"".join(run_list), False, tmp_codec=tmp_codec)
 
-    print_message(f"Querying temporary database when indexing the {', '.join(index_columns)} column(s) in {f4_file_path}.", verbose)
+                    run_lists = [[] for info in index_column_infos]
+                    num_runs += 1
 
-    conn = connect_sql(index_database_file_path)
+            # The memory map cannot be closed while the array refers to it.
+            del data_array
+
+    print_message(f"Done extracting values for {len(index_column_infos)} index(es) in {f4_file_path}.", verbose)
+
+    return num_runs
+
+# This function is executed in parallel.
+# The first num_sorted_runs runs are already sorted, so they are only merged.
+def merge_index_runs(f4_file_path, tmp_dir_path, tmp_codec, index_number, index_columns, index_column_info, num_rows, num_runs, verbose, num_sorted_runs=0):
+    out_index_file_path_prefix = f"{tmp_dir_path}i{index_number}"
     max_row_index_length = len(str(num_rows - 1))
+    record_length = sum([info["max_value_length"] for info in index_column_info]) + max_row_index_length
+    run_file_paths = [get_data_path(tmp_dir_path, f"i{index_number}run", run_number) for run_number in range(num_runs)]
 
-    index_data_file_original_size = 0
-    with open_temp_file_to_compress(out_index_file_path_prefix) as index_data_file:
-        sql_query = f'''SELECT rowid - 1 AS rowid, {', '.join([f"index_column{index_columns_name_dict[x]}" for x in index_columns])}
-                        FROM index_data
-                        ORDER BY '''
-
-        for i, index_column in enumerate(index_columns):
-            index_column_index = index_columns_name_dict[index_column]
-            index_column_type = index_columns_index_dict[index_column_index]["type"]
-
-            if i > 0:
-                sql_query += ", "
-
-            if index_column_type == "s":
-                sql_query += f"index_column{index_column_index}"
-            elif index_column_type == "i":
-                sql_query += f"CAST(index_column{index_column_index} AS INTEGER)"
-            else:
-                sql_query += f"CAST(index_column{index_column_index} AS REAL)"
+    print_message(f"Saving index information for {', '.join(index_columns)} column(s) in {f4_file_path}.", verbose)
 
-        cursor = conn.cursor()
-        cursor.execute(sql_query)
+    # We sort the records in each run and then merge the runs into the index data file.
+    for run_file_path in run_file_paths[num_sorted_runs:]:
+        sort_index_run(run_file_path, index_column_info, record_length, tmp_codec)
 
-        # Fetch rows in batches to prevent using too much memory
-        batch_size = 10000
-        row_index = 0
+    print_message(f"Merging {num_runs} sorted run(s) when indexing the {', '.join(index_columns)} column(s) in {f4_file_path}.", verbose)
 
-        while True:
-            batch = cursor.fetchmany(batch_size)
+    index_data_file_original_size = 0
 
-            if not batch:
-                break
+    with open(out_index_file_path_prefix, "wb") as index_data_file:
+        run_files = [open_temp_file_compressed(run_file_path, tmp_codec=tmp_codec) for run_file_path in run_file_paths]
 
-            batch_out = []
-            for row in batch:
-                out_row = b""
+        if len(run_files) == 1:
+            records = iterate_index_run_records(run_files[0], record_length)
+        else:
+            # The runs are in row order, and heapq.merge is stable, so ties remain in row order.
+            records = heapq.merge(*[iterate_index_run_records(run_file, record_length) for run_file in run_files], key=lambda record: parse_index_record_sort_key(record, index_column_info))
 
-                for index_column in index_columns:
-                    index_column_index = index_columns_name_dict[index_column]
-                    out_row += format_string_as_fixed_width(row[f"index_column{index_column_index}"], index_columns_index_dict[index_column_index]["max_value_length"])
+        out_list = []
+        for record in records:
+            out_list.append(record)
 
-                batch_out.append(out_row + format_string_as_fixed_width(str(row["rowid"]).encode(), max_row_index_length))
-                row_index += 1
+            if len(out_list) == 10000:
+                index_data_file_original_size += index_data_file.write(b"".join(out_list))
+                out_list = []
 
-            index_data_file_original_size += index_data_file.write(b"".join(batch_out))
+        if len(out_list) > 0:
+            index_data_file_original_size += index_data_file.write(b"".join(out_list))
 
-        cursor.close()
-    conn.close()
+        for run_file in run_files:
+            run_file.close()
+
+    for run_file_path in run_file_paths:
+        remove_tmp_file(run_file_path)
 
     write_temp_file_original_size(out_index_file_path_prefix, index_data_file_original_size)
 
-    print_message(f"Done querying temporary database when indexing the {', '.join(index_columns)} column(s) in {f4_file_path}.", verbose)
+    print_message(f"Done merging sorted run(s) when indexing the {', '.join(index_columns)} column(s) in {f4_file_path}.", verbose)
 
     coords = [0]
-    for index_column in index_columns:
-        index_column_index = index_columns_name_dict[index_column]
-        coords.append(coords[-1] + index_columns_index_dict[index_column_index]["max_value_length"])
+    for info in index_column_info:
+        coords.append(coords[-1] + info["max_value_length"])
     coords.append(coords[-1] + max_row_index_length)
     coords = [str(x).encode() for x in coords]
 
     ccml = max([len(x) for x in coords])
-    write_str_to_file(f"{out_index_file_path_prefix}ccml", str(ccml).encode())
+    write_str_to_file(f"{out_index_file_path_prefix}ccml", str(ccml).encode(), tmp_codec=tmp_codec)
 
     cc = b""
     for x in coords:
         cc += format_string_as_fixed_width(x, ccml)
-    write_str_to_file(f"{out_index_file_path_prefix}cc", cc)
-
-    remove_tmp_file(index_database_file_path)
+    write_str_to_file(f"{out_index_file_path_prefix}cc", cc, tmp_codec=tmp_codec)
 
     print_message(f"Done building index for {', '.join(index_columns)} column(s) in {f4_file_path}.", verbose)
 
-def build_index_parallel(f4_file_path, tmp_dir_path, num_rows, line_length, index_number, index_column, columns_database_file_path, verbose):
-    index_column_list = [index_column] if isinstance(index_column, str) else index_column
-    index_column_list, reverse_status_dict = check_index_column_reverse_status(index_column_list)
+def sort_index_run(run_file_path, index_column_info, record_length, tmp_codec):
+    run_data = read_str_from_file(run_file_path, tmp_codec=tmp_codec)
+    records = [run_data[position:(position + record_length)] for position in range(0, len(run_data), record_length)]
+
+    if len(records) == 0:
+        return
+
+    sort_keys = []
+    position = 0
+
+    for info in index_column_info:
+        values = [record[position:(position + info["max_value_length"])] for record in records]
+        position += info["max_value_length"]
+
+        sort_keys.append(get_index_sort_key_array(values, info["type"], info["max_value_length"]))
+
+    # np.lexsort is stable and treats the last key as the primary key.
+    order = np.lexsort(sort_keys[::-1])
 
-    build_index(f4_file_path, tmp_dir_path, index_number, index_column_list, reverse_status_dict, num_rows, line_length, columns_database_file_path, verbose)
+    write_str_to_file(run_file_path, b"".join([records[i] for i in order.tolist()]), False, tmp_codec=tmp_codec)
 
-    key = []
-    for index_column in index_column_list:
-        key.append((index_column, reverse_status_dict[index_column]))
+def get_index_sort_key_array(values, column_type, value_length):
+    if column_type == "s":
+        return np.array(values, dtype=f"S{max(value_length, 1)}")
 
-    return tuple(key)
+    if column_type == "i":
+        try:
+            return np.fromiter((fast_int(value, default=0) for value in values), dtype=np.int64, count=len(values))
+        except OverflowError:
+            # Some integers are too large for 64 bits, so we compare them approximately.
+            pass
+
+    return np.fromiter((fast_float(value, default=0.0) for value in values), dtype=np.float64, count=len(values))
+
+def parse_index_record_sort_key(record, index_column_info):
+    sort_key = []
+    position = 0
+
+    for info in index_column_info:
+        value = record[position:(position + info["max_value_length"])]
+        position += info["max_value_length"]
+
+        if info["type"] == "s":
+            sort_key.append(value)
+        elif info["type"] == "i":
+            sort_key.append(fast_int(value, default=0))
+        else:
+            sort_key.append(fast_float(value, default=0.0))
+
+    return sort_key
+
+def iterate_index_run_records(run_file, record_length):
+    num_records_per_read = 10000
+
+    while run_data := run_file.read(record_length * num_records_per_read):
+        for position in range(0, len(run_data), record_length):
+            yield run_data[position:(position + record_length)]
 
 def check_index_column_reverse_status(index_columns):
     reverse_status_dict = {}
@@ -816,8 +1659,8 @@ def check_index_column_reverse_status(index_columns):
 
     return index_columns, reverse_status_dict
 
-def get_column_index_coords(tmp_dir_path, index_column_index, ccml):
-    with open_temp_file_compressed(get_data_path(tmp_dir_path, "cc")) as file_handle:
+def get_column_index_coords(tmp_dir_path, tmp_codec, index_column_index, ccml):
+    with open_temp_file_compressed(get_data_path(tmp_dir_path, "cc"), tmp_codec=tmp_codec) as file_handle:
         # with mmap(file_handle.fileno(), 0, prot=PROT_READ) as mmap_handle:
         pos_a = index_column_index * ccml
         pos_b = pos_a + ccml
@@ -831,67 +1674,68 @@ def get_column_index_coords(tmp_dir_path, index_column_index, ccml):
 
         return fast_int(coord1), fast_int(coord2)
 
-def compress_data(delimited_file_path, f4_file_path, tmp_dir_path, compression_type, num_rows, line_length, use_checkpoints, verbose):
+def compress_data(delimited_file_path, f4_file_path, tmp_dir_path, tmp_codec, compression_type, num_rows, line_length, num_parallel, use_checkpoints, verbose):
     if has_checkpoint_been_reached_previously(use_checkpoints, tmp_dir_path, 0, verbose):
         return
 
     print_message(f"Compressing data for {delimited_file_path} to {f4_file_path}.", verbose)
 
-    # For now, we assume z-standard compression.
-    compressor = ZstdCompressor(level=1)
+    # With zstd, each row is compressed separately. With zstd_block, rows are compressed together
+    # in blocks of approximately 64 KB (uncompressed), and the "re" file stores where each block ends.
+    if compression_type == "zstd_block":
+        num_rows_per_frame = max(1, 65536 // line_length)
+    else:
+        num_rows_per_frame = 1
 
-    # Compress the data.
-    # TODO: If necessary, chunk the compression so we can handle extremely wide files.
-    compressed_row_ends = []
-    current_compressed_row_end = 0
-    compressed_lines_to_save = []
-    compressed_chars_not_saved = 0
+    # With zstd_column_groups, each row is compressed as separate frames for groups of columns,
+    # so a query can decompress only the groups that contain the columns it needs.
+    group_boundaries = [0, line_length]
+    if compression_type == "zstd_column_groups":
+        group_boundaries = find_column_group_boundaries(tmp_dir_path, tmp_codec, line_length)
 
-    with open_temp_file_compressed(get_data_path(tmp_dir_path, "data")) as file_handle:
-        cmpr_file_original_size = 0
+    # With zstd_dict, each row is compressed separately using a dictionary trained on a sample of rows.
+    # If a dictionary cannot be trained (for example, when there are too few rows), we use zstd.
+    dict_data = None
+    if compression_type == "zstd_dict":
+        dict_data = train_compression_dictionary(tmp_dir_path, num_rows, line_length)
 
-        with open_temp_file_to_compress(get_data_path(tmp_dir_path, "cmpr")) as cmpr_file:
-            with open_temp_file_to_compress(get_data_path(tmp_dir_path, "re_tmp")) as re_tmp_file:
-                for row_i in range(num_rows):
-                    row_start = row_i * line_length
-                    row_end = (row_i + 1) * line_length
+        if dict_data is None:
+            print_message(f"A compression dictionary could not be trained, so using zstd compression for {f4_file_path}.", verbose)
+            compression_type = "zstd"
 
-                    file_handle.seek(row_start)
-                    row = file_handle.read(row_end - row_start)
-                    compressed_line = compressor.compress(row)
-                    compressed_row_length = len(compressed_line)
+    # Compress blocks of rows in parallel. Each block contains a whole number of frames.
+    num_rows_per_block = ceil(ceil(num_rows / num_parallel) / num_rows_per_frame) * num_rows_per_frame
+    row_blocks = [[start_row_index, min(start_row_index + num_rows_per_block, num_rows)] for start_row_index in range(0, num_rows, num_rows_per_block)]
 
-                    current_compressed_row_end += compressed_row_length
-                    compressed_row_ends.append(current_compressed_row_end)
-                    compressed_lines_to_save.append(compressed_line)
-                    compressed_chars_not_saved += compressed_row_length
+    joblib.Parallel(n_jobs=num_parallel)(joblib.delayed(compress_row_block)(delimited_file_path, f4_file_path, tmp_dir_path, tmp_codec, block_number, row_block[0], row_block[1], line_length, num_rows_per_frame, group_boundaries, dict_data, verbose) for block_number, row_block in enumerate(row_blocks))
 
-                    if compressed_chars_not_saved >= 1000000:
-                        cmpr_file_original_size += cmpr_file.write(b"".join(compressed_lines_to_save))
+    print_message(f"Combining compressed blocks for {delimited_file_path} to {f4_file_path}.", verbose)
 
-                        re_tmp_file.write(b"\n".join([str(rl).encode() for rl in compressed_row_ends]))
-                        if row_i != (num_rows - 1):
-                            re_tmp_file.write(b"\n")
+    # The frame ends in each block are relative to the start of the block. We use the total compressed size to determine their width.
+    block_sizes = [int(read_str_from_file(get_data_path(tmp_dir_path, "cmprsize", block_number), tmp_codec=tmp_codec)) for block_number in range(len(row_blocks))]
+    mrel = len(str(sum(block_sizes)))
 
-                        mrel = len(str(compressed_row_ends[-1]))
-                        compressed_row_ends = []
-                        compressed_lines_to_save = []
-                        compressed_chars_not_saved = 0
+    write_str_to_file(get_data_path(tmp_dir_path, "mrel"), str(mrel).encode(), tmp_codec=tmp_codec)
 
-                if compressed_chars_not_saved > 0:
-                    cmpr_file_original_size += cmpr_file.write(b"".join(compressed_lines_to_save))
-                    re_tmp_file.write(b"\n".join([str(rl).encode() for rl in compressed_row_ends]))
+    re_file_original_size = 0
+    cmpr_file_original_size = 0
+    block_start = 0
 
-    if len(compressed_row_ends) > 0:
-        mrel = len(str(compressed_row_ends[-1]))
+    with open_temp_file_to_compress(get_data_path(tmp_dir_path, "re"), tmp_codec=tmp_codec) as re_file:
+        with open(get_data_path(tmp_dir_path, "cmpr"), "wb") as cmpr_file:
+            for block_number in range(len(row_blocks)):
+                row_ends = np.frombuffer(read_str_from_file(get_data_path(tmp_dir_path, "reblock", block_number), tmp_codec=tmp_codec), dtype=np.int64) + block_start
+                re_file_original_size += re_file.write(b"".join([format_string_as_fixed_width(str(row_end).encode(), mrel) for row_end in row_ends.tolist()]))
 
-    write_str_to_file(get_data_path(tmp_dir_path, "mrel"), str(mrel).encode())
+                with open_temp_file_compressed(get_data_path(tmp_dir_path, "cmprblock", block_number), tmp_codec=tmp_codec) as block_file:
+                    while block_data := block_file.read(1000000):
+                        cmpr_file_original_size += cmpr_file.write(block_data)
 
-    re_file_original_size = 0
-    with open_temp_file_to_compress(get_data_path(tmp_dir_path, "re")) as re_file:
-        for line in read_compressed_file_line_by_line(get_data_path(tmp_dir_path, "re_tmp")):
-            row_end = line.rstrip(b"\n")
-            re_file_original_size += re_file.write(format_string_as_fixed_width(row_end, mrel))
+                block_start += block_sizes[block_number]
+
+                remove_tmp_file(get_data_path(tmp_dir_path, "reblock", block_number))
+                remove_tmp_file(get_data_path(tmp_dir_path, "cmprblock", block_number))
+                remove_tmp_file(get_data_path(tmp_dir_path, "cmprsize", block_number))
 
     write_temp_file_original_size(get_data_path(tmp_dir_path, "re"), re_file_original_size)
 
@@ -900,13 +1744,95 @@ def compress_data(delimited_file_path, f4_file_path, tmp_dir_path, compression_t
     rename(get_data_path(tmp_dir_path, "cmpr"), get_data_path(tmp_dir_path, "data"))
     write_temp_file_original_size(get_data_path(tmp_dir_path, "data"), cmpr_file_original_size)
 
-    write_str_to_file(get_data_path(tmp_dir_path, "ll"), str(line_length).encode())
-    write_str_to_file(get_data_path(tmp_dir_path, "nrow"), str(num_rows).encode())
-    write_str_to_file(get_data_path(tmp_dir_path, "cmpr"), b"z")
+    write_str_to_file(get_data_path(tmp_dir_path, "ll"), str(line_length).encode(), tmp_codec=tmp_codec)
+    write_str_to_file(get_data_path(tmp_dir_path, "nrow"), str(num_rows).encode(), tmp_codec=tmp_codec)
+    if compression_type == "zstd_block":
+        write_str_to_file(get_data_path(tmp_dir_path, "cmpr"), b"zb", tmp_codec=tmp_codec)
+        write_str_to_file(get_data_path(tmp_dir_path, "rpb"), str(num_rows_per_frame).encode(), tmp_codec=tmp_codec)
+    elif compression_type == "zstd_column_groups":
+        write_str_to_file(get_data_path(tmp_dir_path, "cmpr"), b"zc", tmp_codec=tmp_codec)
+        write_str_to_file(get_data_path(tmp_dir_path, "cgb"), serialize(group_boundaries), tmp_codec=tmp_codec)
+    elif compression_type == "zstd_dict":
+        write_str_to_file(get_data_path(tmp_dir_path, "cmpr"), b"zd", tmp_codec=tmp_codec)
+        write_str_to_file(get_data_path(tmp_dir_path, "zdict"), dict_data, tmp_codec=tmp_codec)
+    else:
+        write_str_to_file(get_data_path(tmp_dir_path, "cmpr"), b"z", tmp_codec=tmp_codec)
+
+# This function is executed in parallel.
+def compress_row_block(delimited_file_path, f4_file_path, tmp_dir_path, tmp_codec, block_number, start_row_index, end_row_index, line_length, num_rows_per_frame, group_boundaries, dict_data, verbose):
+    print_message(f"Compressing rows {start_row_index} - {end_row_index - 1} for {delimited_file_path} to {f4_file_path}.", verbose)
+
+    # For now, we assume z-standard compression.
+    if dict_data is None:
+        compressor = ZstdCompressor(level=1)
+    else:
+        compressor = ZstdCompressor(level=1, dict_data=ZstdCompressionDict(dict_data))
+
+    # Each frame (one or more rows, or a group of columns within a row) is compressed separately so it can be decompressed on its own.
+    frame_length = num_rows_per_frame * line_length
+    num_rows_per_read = num_rows_per_frame * max(1, 1000000 // max(frame_length, 1))
+    num_groups = len(group_boundaries) - 1
+    row_ends = np.zeros(ceil((end_row_index - start_row_index) / num_rows_per_frame) * num_groups, dtype=np.int64)
+    current_row_end = 0
+
+    with open(get_data_path(tmp_dir_path, "data"), "rb") as data_file:
+        data_file.seek(start_row_index * line_length)
+
+        with open_temp_file_to_compress(get_data_path(tmp_dir_path, "cmprblock", block_number), tmp_codec=tmp_codec) as block_file:
+            for read_start_row_index in range(start_row_index, end_row_index, num_rows_per_read):
+                read_end_row_index = min(read_start_row_index + num_rows_per_read, end_row_index)
+                read_data = data_file.read((read_end_row_index - read_start_row_index) * line_length)
+
+                if num_groups == 1:
+                    compressed_rows = [compressor.compress(read_data[frame_start:(frame_start + frame_length)]) for frame_start in range(0, len(read_data), frame_length)]
+                else:
+                    compressed_rows = [compressor.compress(read_data[(frame_start + group_boundaries[i]):(frame_start + group_boundaries[i + 1])]) for frame_start in range(0, len(read_data), frame_length) for i in range(num_groups)]
+
+                first_frame_index = (read_start_row_index - start_row_index) // num_rows_per_frame * num_groups
+
+                for i, compressed_row in enumerate(compressed_rows):
+                    current_row_end += len(compressed_row)
+                    row_ends[first_frame_index + i] = current_row_end
+
+                block_file.write(b"".join(compressed_rows))
+
+    write_str_to_file(get_data_path(tmp_dir_path, "reblock", block_number), row_ends.tobytes(), False, tmp_codec=tmp_codec)
+    write_str_to_file(get_data_path(tmp_dir_path, "cmprsize", block_number), str(current_row_end).encode(), False, tmp_codec=tmp_codec)
+
+def find_column_group_boundaries(tmp_dir_path, tmp_codec, line_length, target_group_length=4096):
+    ccml = fast_int(read_str_from_file(get_data_path(tmp_dir_path, "ccml"), tmp_codec=tmp_codec))
+    cc = read_str_from_file(get_data_path(tmp_dir_path, "cc"), tmp_codec=tmp_codec)
+
+    # Groups start and end at column boundaries, so each value is within a single group.
+    group_boundaries = [0]
+    for position in range(ccml, len(cc), ccml):
+        column_end = fast_int(cc[position:(position + ccml)])
+
+        if column_end > group_boundaries[-1] and (column_end - group_boundaries[-1] >= target_group_length or column_end == line_length):
+            group_boundaries.append(column_end)
+
+    return group_boundaries
 
-    remove_tmp_file(get_data_path(tmp_dir_path, "re_tmp"))
+def train_compression_dictionary(tmp_dir_path, num_rows, line_length, max_num_samples=10000, max_dict_size=112640):
+    # We sample rows that are evenly spaced throughout the data.
+    sample_interval = max(1, num_rows // max_num_samples)
+    num_rows_per_read = sample_interval * max(1, 1000000 // (sample_interval * line_length))
+    samples = []
 
-def combine_into_single_file(delimited_file_path, f4_file_path, tmp_dir_path, read_chunk_size, verbose):
+    with open(get_data_path(tmp_dir_path, "data"), "rb") as data_file:
+        while read_data := data_file.read(num_rows_per_read * line_length):
+            for row_start in range(0, len(read_data), sample_interval * line_length):
+                samples.append(read_data[row_start:(row_start + line_length)])
+
+    # The dictionary should be much smaller than the data that it was trained on.
+    dict_size = min(max_dict_size, sum([len(sample) for sample in samples]) // 10)
+
+    try:
+        return train_dictionary(dict_size, samples).as_bytes()
+    except ZstdError:
+        return None
+
+def combine_into_single_file(delimited_file_path, f4_file_path, tmp_dir_path, tmp_codec, read_chunk_size, verbose):
     def _create_file_map(start_end_positions):
         start_end_dict = {}
 
@@ -920,7 +1846,7 @@ def combine_into_single_file(delimited_file_path, f4_file_path, tmp_dir_path, re
 
     print_message(f"Combining data into a single file for {delimited_file_path} to {f4_file_path}.", verbose)
 
-    write_str_to_file(f"{tmp_dir_path}ver", get_current_version_major().encode())
+    write_str_to_file(f"{tmp_dir_path}ver", get_current_version_major().encode(), tmp_codec=tmp_codec)
 
     start_end_positions = []
     for file_path in sorted(glob(f"{tmp_dir_path}*")):
@@ -958,9 +1884,13 @@ def combine_into_single_file(delimited_file_path, f4_file_path, tmp_dir_path, re
 
         file_map_serialized = _create_file_map(start_end_positions)
 
-    # Write the output file
+    # Write the output file. We allocate space for the whole file and then write each component at its final position.
     with open(f4_file_path, "wb") as f4_file:
         f4_file.write(file_map_serialized)
+        f4_file.flush()
+
+        f4_file_descriptor = f4_file.fileno()
+        preallocate_file(f4_file_descriptor, start_end_positions[-1][2] if len(start_end_positions) > 0 else len(file_map_serialized))
 
         for file_start_end in start_end_positions:
             file_path = f"{tmp_dir_path}{file_start_end[0]}"
@@ -968,13 +1898,299 @@ def combine_into_single_file(delimited_file_path, f4_file_path, tmp_dir_path, re
             if file_start_end[0] == "":
                 file_path += "data"
 
-            with open_temp_file_compressed(file_path) as component_file:
-                while chunk := component_file.read(read_chunk_size):
-                    f4_file.write(chunk)
+            if tmp_codec == "raw" or is_raw_component(file_start_end[0]):
+                copy_file_to_position(file_path, f4_file_descriptor, file_start_end[1], file_start_end[2] - file_start_end[1], read_chunk_size)
+            else:
+                with open_temp_file_compressed(file_path, tmp_codec=tmp_codec) as component_file:
+                    position = file_start_end[1]
+
+                    while chunk := component_file.read(read_chunk_size):
+                        write_to_position(f4_file_descriptor, chunk, position)
+                        position += len(chunk)
 
             remove_tmp_file(file_path)
             remove_tmp_file(f"{file_path}__original_size")
 
+# The data and index data components are not compressed in the temp directory,
+# so they can be copied directly into the output file.
+def is_raw_component(extension):
+    return extension == "" or compile(r"i\d+").fullmatch(extension) is not None
+
+def get_index_key(index_column):
+    if not isinstance(index_column, str) and not isinstance(index_column, list):
+        raise Exception("When specifying index columns, they must either be a string or a list.")
+
+    if "|" in index_column:
+        raise Exception("You may not index a column with a vertical bar (|) in its name.")
+
+    index_columns = [index_column] if isinstance(index_column, str) else list(index_column)
+    index_columns, reverse_status_dict = check_index_column_reverse_status(index_columns)
+
+    return index_columns, reverse_status_dict, tuple([(x, reverse_status_dict[x]) for x in index_columns])
+
+def get_file_index_column_info(f4_file_path, f4_file, file_map_dict, index_columns, reverse_status_dict):
+    column_names = [column_name.decode().strip() for column_name in read_file_component(f4_file, file_map_dict, "cn").split(b"\n")]
+    column_types = read_file_component(f4_file, file_map_dict, "ct").decode()
+    column_coords = parse_column_coords(read_file_component(f4_file, file_map_dict, "cc"), fast_int(read_file_component(f4_file, file_map_dict, "ccml")))
+    column_indices_dict = {column_name: column_index for column_index, column_name in enumerate(column_names)}
+
+    index_column_info = []
+
+    for column_name in index_columns:
+        if column_name not in column_indices_dict:
+            raise Exception(f"A column named {column_name} does not exist in {f4_file_path}.")
+
+        column_index = column_indices_dict[column_name]
+
+        # This has the same structure as the info from get_index_column_info.
+        index_column_info.append({
+            "column_name": column_name,
+            "reverse_status": reverse_status_dict[column_name],
+            "type": column_types[column_index],
+            "start_coord": column_coords[column_index],
+            "end_coord": column_coords[column_index + 1],
+            "max_value_length": column_coords[column_index + 1] - column_coords[column_index]
+        })
+
+    return index_column_info
+
+# This function writes the file map at the start of an existing file. The components do not
+# need to be contiguous, so if the file map has become too large to fit before the first component,
+# we move that component to the end of the file (which is inexpensive for the small components that
+# precede the data). Space after the last component is removed.
+# New and moved components are always written at the end of the file before the file map that refers to them, and the
+# file is never truncated. So an update that is interrupted before the file map is written leaves the previous version
+# intact, and memory maps that are already open remain valid.
+def write_file_map(f4_file_path, f4_file_descriptor, file_map_dict, read_chunk_size=100000):
+    while True:
+        file_map_serialized = serialize(file_map_dict)
+        file_map_serialized = str(len(file_map_serialized)).encode() + b"\n" + file_map_serialized
+
+        first_extension = min(file_map_dict, key=lambda extension: file_map_dict[extension][0])
+        first_start, first_end = file_map_dict[first_extension]
+
+        if len(file_map_serialized) <= first_start:
+            break
+
+        position = path.getsize(f4_file_path)
+        copy_file_to_position(f4_file_path, f4_file_descriptor, position, first_end - first_start, read_chunk_size, first_start)
+        file_map_dict[first_extension] = [position, position + first_end - first_start]
+
+    # Any bytes between the file map and the first component are unused.
+    write_to_position(f4_file_descriptor, file_map_serialized + b"\0" * (first_start - len(file_map_serialized)), 0)
+
+def read_file_info(f4_file_path):
+    with open(f4_file_path, "rb") as f4_file:
+        file_map_dict = read_file_map(f4_file)
+        column_coords = parse_column_coords(read_file_component(f4_file, file_map_dict, "cc"), fast_int(read_file_component(f4_file, file_map_dict, "ccml")))
+
+        if "cmpr" in file_map_dict:
+            num_rows = fast_int(read_file_component(f4_file, file_map_dict, "nrow"))
+        else:
+            num_rows = (file_map_dict[""][1] - file_map_dict[""][0]) // column_coords[-1]
+
+        return {
+            "file_path": f4_file_path,
+            "file_map_dict": file_map_dict,
+            "column_names": read_file_component(f4_file, file_map_dict, "cn").split(b"\n"),
+            "column_types": read_file_component(f4_file, file_map_dict, "ct").decode(),
+            "column_coords": column_coords,
+            "num_rows": num_rows,
+            "index_info_dict": deserialize(read_file_component(f4_file, file_map_dict, "i")) if "i" in file_map_dict else {}
+        }
+
+def read_file_map(f4_file):
+    file_map_length_string = f4_file.readline()
+    file_map_length = fast_int(file_map_length_string.rstrip(b"\n"))
+
+    return deserialize(f4_file.read(file_map_length))
+
+def read_file_component(f4_file, file_map_dict, extension):
+    start, end = file_map_dict[extension]
+    f4_file.seek(start)
+
+    return f4_file.read(end - start)
+
+def parse_column_coords(cc, ccml):
+    return [fast_int(cc[position:(position + ccml)]) for position in range(0, len(cc), ccml)]
+
+def merge_existing_column_info(delimited_file_path, f4_file_path, chunk_number, tmp_dir_path, old_column_names, old_column_types, old_column_coords):
+    conn = connect_sql(get_columns_database_file_path(tmp_dir_path, chunk_number))
+    cursor = conn.cursor()
+
+    sql_update = '''UPDATE columns
+                    SET size = ?, inferred_type = ?
+                    WHERE column_index = ?'''
+    update_tuples = []
+
+    for row in query_sql(conn, '''SELECT column_index, CAST(column_name AS TEXT) AS column_name, size, inferred_type
+                                  FROM columns
+                                  ORDER BY column_index'''):
+        column_index = row["column_index"]
+
+        if row["column_name"].encode() != old_column_names[column_index]:
+            raise Exception(f"The column names in {delimited_file_path} do not match the column names in {f4_file_path}.")
+
+        old_size = old_column_coords[column_index + 1] - old_column_coords[column_index]
+        update_tuples.append((max(row["size"], old_size), merge_column_types(old_column_types[column_index], row["inferred_type"]), column_index))
+
+    cursor.executemany(sql_update, update_tuples)
+
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+def merge_column_types(type1, type2):
+    if "s" in (type1, type2):
+        return "s"
+    if "f" in (type1, type2):
+        return "f"
+    return "i"
+
+def prepend_existing_rows(f4_file_path, file_info, num_new_rows, tmp_dir_path, tmp_codec, read_chunk_size, verbose):
+    print_message(f"Combining existing rows with new rows in {f4_file_path}.", verbose)
+
+    column_coords = parse_column_coords(read_str_from_file(get_data_path(tmp_dir_path, "cc"), tmp_codec=tmp_codec), fast_int(read_str_from_file(get_data_path(tmp_dir_path, "ccml"), tmp_codec=tmp_codec)))
+    line_length = column_coords[-1]
+    old_num_rows = file_info["num_rows"]
+
+    data_file_path = get_data_path(tmp_dir_path, "data")
+    new_data_file_path = get_data_path(tmp_dir_path, "newdata")
+    rename(data_file_path, new_data_file_path)
+
+    with open(data_file_path, "wb") as data_file:
+        data_file_descriptor = data_file.fileno()
+        preallocate_file(data_file_descriptor, (old_num_rows + num_new_rows) * line_length)
+
+        copy_rows_to_position(f4_file_path, file_info["file_map_dict"][""][0], file_info["column_coords"], column_coords, old_num_rows, data_file_descriptor, 0, read_chunk_size)
+        copy_file_to_position(new_data_file_path, data_file_descriptor, old_num_rows * line_length, num_new_rows * line_length, read_chunk_size)
+
+    remove_tmp_file(new_data_file_path)
+    write_temp_file_original_size(data_file_path, (old_num_rows + num_new_rows) * line_length)
+
+# This function copies rows from an existing file to a position in another file. The rows are copied
+# directly unless columns have become wider, in which case the values are padded again.
+def copy_rows_to_position(src_file_path, src_data_start, src_column_coords, column_coords, num_rows, dst_file_descriptor, dst_position, read_chunk_size):
+    if column_coords == src_column_coords:
+        copy_file_to_position(src_file_path, dst_file_descriptor, dst_position, num_rows * column_coords[-1], read_chunk_size, src_data_start)
+        return
+
+    for block in iterate_repadded_records(src_file_path, src_data_start, num_rows, src_column_coords, column_coords):
+        write_to_position(dst_file_descriptor, block, dst_position)
+        dst_position += len(block)
+
+# This function reads fixed-width records and yields blocks of records in which the values
+# have been padded to new widths. Values are left-aligned unless right_aligned says otherwise.
+def iterate_repadded_records(file_path, start_position, num_records, old_coords, new_coords, right_aligned=None, max_block_size=10000000):
+    old_record_length = old_coords[-1]
+    new_record_length = new_coords[-1]
+
+    # Adjacent values whose widths have not changed are copied together.
+    segments = []
+    for i in range(len(old_coords) - 1):
+        old_start, old_end = old_coords[i], old_coords[i + 1]
+        new_start = new_coords[i + 1] - (old_end - old_start) if right_aligned and right_aligned[i] else new_coords[i]
+
+        if len(segments) > 0 and segments[-1][1] == old_start and segments[-1][2] + (segments[-1][1] - segments[-1][0]) == new_start:
+            segments[-1][1] = old_end
+        else:
+            segments.append([old_start, old_end, new_start])
+
+    num_records_per_block = max(1, max_block_size // max(old_record_length, new_record_length, 1))
+    block_buffer = np.empty((num_records_per_block, new_record_length), dtype=np.uint8)
+
+    with open(file_path, "rb") as in_file:
+        in_file.seek(start_position)
+
+        for block_start in range(0, num_records, num_records_per_block):
+            num_block_records = min(num_records_per_block, num_records - block_start)
+            old_block = np.frombuffer(in_file.read(num_block_records * old_record_length), dtype=np.uint8).reshape(num_block_records, old_record_length)
+
+            block_buffer[:num_block_records] = ord(" ")
+            for old_start, old_end, new_start in segments:
+                block_buffer[:num_block_records, new_start:(new_start + old_end - old_start)] = old_block[:, old_start:old_end]
+
+            yield block_buffer[:num_block_records].reshape(-1)
+
+# The index data in each source file is already sorted, so it is saved as a run rather than extracted again.
+# It is padded again if the indexed columns or the row indices have become wider, and its row indices are
+# offset by the position of that file's rows. If new_rows_start is specified, the values for rows from that
+# position onward are extracted into additional runs, which are sorted and merged with the existing data.
+def merge_existing_indexes(f4_file_path, src_file_infos, index_info_dict, num_rows, line_length, num_parallel, tmp_dir_path, tmp_codec, verbose, new_rows_start=None):
+    print_message(f"Updating indexes for {f4_file_path}.", verbose)
+
+    columns_database_file_path = get_columns_database_file_path(tmp_dir_path)
+
+    index_column_lists = []
+    index_column_infos = []
+    can_merge = all([file_info["index_info_dict"] == index_info_dict for file_info in src_file_infos])
+
+    for key, index_number in sorted(index_info_dict.items(), key=lambda x: x[1]):
+        index_column_list = [x[0] for x in key]
+        reverse_status_dict = {x[0]: x[1] for x in key}
+
+        index_column_lists.append(index_column_list)
+        index_column_infos.append(get_index_column_info(tmp_dir_path, tmp_codec, index_column_list, reverse_status_dict, columns_database_file_path))
+
+        for file_info in src_file_infos:
+            src_column_types_dict = {column_name.decode(): column_type for column_name, column_type in zip(file_info["column_names"], file_info["column_types"])}
+
+            for info in index_column_infos[-1]:
+                if info["type"] != src_column_types_dict[info["column_name"]]:
+                    can_merge = False
+
+    # When the type of an indexed column changes, the values may sort differently, so we rebuild the indexes.
+    # We also rebuild them if the source files were not indexed the same way.
+    if not can_merge:
+        index_columns = [[x[0] + "_endswith" if x[1] else x[0] for x in key] for key in sorted(index_info_dict, key=lambda key: index_info_dict[key])]
+        build_indexes(f4_file_path, tmp_dir_path, tmp_codec, index_columns, num_rows, line_length, num_parallel, columns_database_file_path, False, verbose)
+        return
+
+    max_row_index_length = len(str(num_rows - 1))
+
+    for index_number, index_column_info in enumerate(index_column_infos):
+        new_coords = [0]
+        for info in index_column_info:
+            new_coords.append(new_coords[-1] + info["max_value_length"])
+        new_coords.append(new_coords[-1] + max_row_index_length)
+
+        right_aligned = [info["reverse_status"] for info in index_column_info] + [False]
+
+        for run_number, file_info in enumerate(src_file_infos):
+            save_existing_index_run(file_info, index_number, new_coords, right_aligned, get_data_path(tmp_dir_path, f"i{index_number}run", run_number), tmp_codec)
+
+    num_runs = len(src_file_infos)
+
+    if new_rows_start is not None:
+        num_runs = save_index_runs(f4_file_path, tmp_dir_path, tmp_codec, index_column_infos, num_rows, line_length, 1000000, verbose, new_rows_start, num_runs)
+
+    joblib.Parallel(n_jobs=num_parallel)(
+        joblib.delayed(merge_index_runs)(f4_file_path, tmp_dir_path, tmp_codec, index_number, index_column_lists[index_number], index_column_infos[index_number], num_rows, num_runs, verbose, len(src_file_infos))
+        for index_number in range(len(index_column_infos))
+    )
+
+    write_str_to_file(f"{tmp_dir_path}i", serialize(index_info_dict), tmp_codec=tmp_codec)
+
+def save_existing_index_run(file_info, index_number, new_coords, right_aligned, run_file_path, tmp_codec):
+    file_map_dict = file_info["file_map_dict"]
+    row_offset = file_info["row_offset"]
+
+    with open(file_info["file_path"], "rb") as f4_file:
+        old_coords = parse_column_coords(read_file_component(f4_file, file_map_dict, f"i{index_number}cc"), fast_int(read_file_component(f4_file, file_map_dict, f"i{index_number}ccml")))
+
+    row_index_start = new_coords[-2]
+    row_index_length = new_coords[-1] - new_coords[-2]
+
+    with open_temp_file_to_compress(run_file_path, tmp_codec=tmp_codec) as run_file:
+        for block in iterate_repadded_records(file_info["file_path"], file_map_dict[f"i{index_number}"][0], file_info["num_rows"], old_coords, new_coords, right_aligned):
+            if row_offset > 0:
+                records = block.reshape(-1, new_coords[-1])
+                row_indices = np.frombuffer(records[:, row_index_start:].tobytes(), dtype=f"S{row_index_length}").astype(np.int64) + row_offset
+                row_indices = np.char.ljust(row_indices.astype(f"S{row_index_length}"), row_index_length)
+                records[:, row_index_start:] = np.frombuffer(row_indices.tobytes(), dtype=np.uint8).reshape(-1, row_index_length)
+
+            run_file.write(block)
+
 def skip_comments(in_file, comment_prefix):
     if comment_prefix is None:
         return
@@ -1023,6 +2239,22 @@ def skip_line(in_file):
 #             else:
 #                 next_text = next_text[newline_index + 1:]
 
+def iterate_delimited_file_lines(in_file, file_read_chunk_size, num_bytes_to_read=None):
+    previous_text = b""
+
+    while next_text := in_file.read(file_read_chunk_size if num_bytes_to_read is None else min(file_read_chunk_size, num_bytes_to_read)):
+        if num_bytes_to_read is not None:
+            num_bytes_to_read -= len(next_text)
+
+        lines = (previous_text + next_text).split(b"\n")
+        previous_text = lines.pop(-1)
+
+        for line in lines:
+            yield line
+
+    if len(previous_text) > 0:
+        yield previous_text
+
 def iterate_delimited_file_column_indices(in_file, delimiter, file_read_chunk_size, start_column_index, end_column_index):
     previous_text = b""
     current_column_index = -1
@@ -1060,12 +2292,12 @@ def generate_column_chunk_ranges(num_cols, num_cols_per_chunk, num_parallel):
 
     return ranges
 
-def infer_type(value):
-    if isint(value):
-        return 1, 0, 0
-    if isfloat(value):
-        return 0, 1, 0
-    return 0, 0, 1
+def infer_column_type(num_i, num_f, num_s):
+    if num_s > 0:
+        return "s"
+    if num_f > 0:
+        return "f"
+    return "i"
 
 # def find_unique_bigrams(value):
 #     grams = set()
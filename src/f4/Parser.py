@@ -17,6 +17,196 @@ class FileData:
         self.decompression_type = decompression_type
         self.decompressor = decompressor
 
+        # When rows are compressed in blocks, we keep the most recently decompressed blocks in memory.
+        self.block_cache = OrderedDict()
+        self.max_cached_blocks = 64
+
+        # Files in the file pool may be used by multiple threads. This lock protects the decompressor and block cache.
+        self.lock = Lock()
+
+        # Column indices are cached after they have been looked up by name.
+        self.column_index_dict = {}
+
+        # The coordinates for each component (such as "" or "i0") are parsed once, when they are first needed.
+        self.coords_dict = {}
+
+        # These are used when the file is kept open in the file pool.
+        self.file_signature = None
+        self.num_users = 0
+        self.is_pooled = False
+
+    def close(self):
+        self.file_handle.close()
+
+"""
+This class stores the indices of rows that match a filter, in ascending order. Contiguous rows are stored
+as a range, a small number of rows is stored as a sorted array, and a large number of rows is stored as a
+bitmap (a Boolean array with one value per row in the file).
+"""
+class RowSet:
+    def __init__(self, num_rows, rows=range(0)):
+        self.num_rows = num_rows
+
+        if isinstance(rows, range):
+            self.rows = range(max(0, rows.start), max(0, min(num_rows, rows.stop)))
+            return
+
+        rows = np.asarray(rows)
+
+        if rows.dtype == np.bool_:
+            # A bitmap uses less memory than an array when more than 1/8 of the rows are present.
+            if np.count_nonzero(rows) * 8 > num_rows:
+                self.rows = rows
+                return
+
+            rows = np.flatnonzero(rows)
+
+        if len(rows) == 0:
+            self.rows = range(0)
+        elif rows[-1] - rows[0] + 1 == len(rows):
+            self.rows = range(int(rows[0]), int(rows[-1]) + 1)
+        elif len(rows) * 8 > num_rows:
+            self.rows = np.zeros(num_rows, dtype=np.bool_)
+            self.rows[rows] = True
+        else:
+            self.rows = rows.astype(np.int64, copy=False)
+
+    # The row indices do not need to be sorted or unique.
+    @classmethod
+    def from_indices(cls, num_rows, row_indices):
+        if not isinstance(row_indices, np.ndarray):
+            row_indices = np.fromiter(row_indices, dtype=np.int64)
+
+        if len(row_indices) * 8 > num_rows:
+            bitmap = np.zeros(num_rows, dtype=np.bool_)
+            bitmap[row_indices] = True
+
+            return cls(num_rows, bitmap)
+
+        row_indices = np.sort(row_indices)
+
+        if len(row_indices) > 1:
+            row_indices = row_indices[np.concatenate(([True], row_indices[1:] != row_indices[:-1]))]
+
+        return cls(num_rows, row_indices)
+
+    def __len__(self):
+        if self.is_bitmap():
+            return int(np.count_nonzero(self.rows))
+
+        return len(self.rows)
+
+    # The row indices are converted to Python ints in blocks, so the whole set is never stored as a list.
+    def __iter__(self):
+        if isinstance(self.rows, range):
+            yield from self.rows
+            return
+
+        for chunk in self.split(100000):
+            yield from chunk.rows.tolist()
+
+    def __and__(self, other):
+        if isinstance(self.rows, range) and isinstance(other.rows, range):
+            return RowSet(self.num_rows, range(max(self.rows.start, other.rows.start), min(self.rows.stop, other.rows.stop)))
+
+        if self.is_bitmap() and other.is_bitmap():
+            return RowSet(self.num_rows, self.rows & other.rows)
+
+        for a, b in ((self, other), (other, self)):
+            if isinstance(a.rows, range) and b.is_bitmap():
+                bitmap = np.zeros(self.num_rows, dtype=np.bool_)
+                bitmap[a.rows.start:a.rows.stop] = b.rows[a.rows.start:a.rows.stop]
+
+                return RowSet(self.num_rows, bitmap)
+
+        # At least one of the sets is an array, so we keep the values in the smaller array that are in the other set.
+        if isinstance(self.rows, np.ndarray) and not self.is_bitmap() and (len(self) <= len(other) or isinstance(other.rows, range) or other.is_bitmap()):
+            a, b = self, other
+        else:
+            a, b = other, self
+
+        return RowSet(self.num_rows, a.rows[b.contains(a.rows)])
+
+    def __or__(self, other):
+        if isinstance(self.rows, range) and isinstance(other.rows, range) and self.rows.start <= other.rows.stop and other.rows.start <= self.rows.stop:
+            if len(self.rows) == 0:
+                return other
+            if len(other.rows) == 0:
+                return self
+
+            return RowSet(self.num_rows, range(min(self.rows.start, other.rows.start), max(self.rows.stop, other.rows.stop)))
+
+        if (len(self) + len(other)) * 8 > self.num_rows:
+            return RowSet(self.num_rows, self.to_bitmap() | other.to_bitmap())
+
+        return RowSet(self.num_rows, np.union1d(self.to_array(), other.to_array()))
+
+    def is_bitmap(self):
+        return isinstance(self.rows, np.ndarray) and self.rows.dtype == np.bool_
+
+    # This function indicates whether each of the specified row indices is in the set.
+    def contains(self, row_indices):
+        if isinstance(self.rows, range):
+            return (row_indices >= self.rows.start) & (row_indices < self.rows.stop)
+
+        if self.is_bitmap():
+            return self.rows[row_indices]
+
+        positions = np.minimum(np.searchsorted(self.rows, row_indices), len(self.rows) - 1)
+        return self.rows[positions] == row_indices
+
+    def to_array(self):
+        if isinstance(self.rows, range):
+            return np.arange(self.rows.start, self.rows.stop, dtype=np.int64)
+
+        if self.is_bitmap():
+            return np.flatnonzero(self.rows)
+
+        return self.rows
+
+    def to_bitmap(self):
+        if self.is_bitmap():
+            return self.rows
+
+        bitmap = np.zeros(self.num_rows, dtype=np.bool_)
+
+        if isinstance(self.rows, range):
+            bitmap[self.rows.start:self.rows.stop] = True
+        else:
+            bitmap[self.rows] = True
+
+        return bitmap
+
+    # This function divides the rows into sets of consecutive row indices. These are stored as ranges or
+    # arrays so they can be sent to other processes without the bitmap.
+    def split(self, max_rows_per_chunk):
+        if not self.is_bitmap():
+            for chunk_rows in split_list_into_chunks(self.rows, max_rows_per_chunk):
+                yield self._get_chunk(chunk_rows)
+
+            return
+
+        # The row indices in a bitmap are found one segment at a time, so they are never all stored at once.
+        pending_rows = np.empty(0, dtype=np.int64)
+
+        for segment_start in range(0, self.num_rows, max_rows_per_chunk):
+            segment_rows = np.flatnonzero(self.rows[segment_start:(segment_start + max_rows_per_chunk)]) + segment_start
+            pending_rows = np.concatenate((pending_rows, segment_rows))
+
+            while len(pending_rows) >= max_rows_per_chunk:
+                yield self._get_chunk(pending_rows[:max_rows_per_chunk])
+                pending_rows = pending_rows[max_rows_per_chunk:]
+
+        if len(pending_rows) > 0:
+            yield self._get_chunk(pending_rows)
+
+    def _get_chunk(self, chunk_rows):
+        chunk = RowSet.__new__(RowSet)
+        chunk.num_rows = self.num_rows
+        chunk.rows = chunk_rows
+
+        return chunk
+
 """
 This class is used to indicate that no filtering should be performed.
 """
@@ -55,24 +245,23 @@ class _SimpleBaseFilter(_BaseFilter):
             coords = parse_data_coord(file_data, "", column_index)
             parse_function = get_parse_row_value_function(file_data)
 
+            num_rows = file_data.cache_dict["num_rows"]
+
+            matching_row_indices = scan_column(file_data, coords, row_indices, self._passes_array)
+            if matching_row_indices is not None:
+                return RowSet(num_rows, matching_row_indices)
+
             if row_indices is None:
-                num_rows = file_data.cache_dict["num_rows"]
+                row_indices = RowSet(num_rows, range(num_rows))
 
-                if num_rows <= 100 or num_parallel == 1:
-                    return self._do_row_indices_pass(file_data, coords, parse_function, range(num_rows))
-                else:
-                    return set(chain.from_iterable(joblib.Parallel(n_jobs=num_parallel)(
-                        joblib.delayed(self._do_row_indices_pass_parallel)(file_data.data_file_path, file_data.use_memory_mapping, coords, parse_function, chunk_row_indices)
-                        for chunk_row_indices in generate_range_chunks(num_rows, 1000001)))
-                    )
+            # The row indices are checked in ascending order, so the matching row indices are sorted.
+            if len(row_indices) <= 100 or num_parallel == 1:
+                return RowSet(num_rows, self._do_row_indices_pass(file_data, coords, parse_function, row_indices))
             else:
-                if len(row_indices) <= 100 or num_parallel == 1:
-                    return self._do_row_indices_pass(file_data, coords, parse_function, row_indices)
-                else:
-                    return set(chain.from_iterable(joblib.Parallel(n_jobs=num_parallel)(
-                        joblib.delayed(self._do_row_indices_pass_parallel)(file_data.data_file_path, file_data.use_memory_mapping, coords, parse_function, chunk_row_indices)
-                        for chunk_row_indices in split_list_into_chunks(list(row_indices), 1000001)))
-                    )
+                return RowSet(num_rows, np.concatenate(joblib.Parallel(n_jobs=num_parallel)(
+                    joblib.delayed(self._do_row_indices_pass_parallel)(file_data.data_file_path, file_data.use_memory_mapping, coords, parse_function, chunk_row_indices)
+                    for chunk_row_indices in row_indices.split(1000001)))
+                )
         else:
             matching_row_indices = self.get_matching_row_indices_indexed(file_data, index_number, 0, 1, 0, file_data.cache_dict["num_rows"], True, num_parallel)
 
@@ -91,27 +280,29 @@ class _SimpleBaseFilter(_BaseFilter):
         return -1
 
     def _do_row_indices_pass(self, file_data, coords, parse_function, row_indices_to_check):
-        passing_row_indices = set()
+        passing_row_indices = []
 
         for i in row_indices_to_check:
             if self._passes(parse_function(file_data, "", i, coords)):
-                passing_row_indices.add(i)
+                passing_row_indices.append(i)
 
-        return passing_row_indices
+        return np.array(passing_row_indices, dtype=np.int64)
 
     def _do_row_indices_pass_parallel(self, data_file_path, use_memory_mapping, coords, parse_function, row_indices_to_check):
-        passing_row_indices = set()
-
         with initialize(data_file_path, use_memory_mapping) as file_data:
-            for i in row_indices_to_check:
-                if self._passes(parse_function(file_data, "", i, coords)):
-                    passing_row_indices.add(i)
-
-        return passing_row_indices
+            return self._do_row_indices_pass(file_data, coords, parse_function, row_indices_to_check)
 
     def _get_conversion_function(self):
         return do_nothing
 
+    # This function evaluates the filter for many values at once. It receives a matrix with the bytes for each value
+    # (padded with spaces) and returns an array that indicates which values pass. It returns None if this is not supported.
+    def _passes_array(self, value_bytes):
+        return None
+
+    def _convert_array(self, value_bytes):
+        return get_string_array(value_bytes)
+
 #    def __str__(self):
 #        return f"{type(self).__name__}____{self.column_name.decode()}____{self.value}"
 
@@ -124,8 +315,14 @@ class _OperatorFilter(_SimpleBaseFilter):
     def _passes(self, value):
         return self.oper(self._get_conversion_function()(value), self.value)
 
+    def _passes_array(self, value_bytes):
+        if self.oper not in (eq, ne, lt, le, gt, ge):
+            return None
+
+        return self.oper(self._convert_array(value_bytes), self.value)
+
     def get_matching_row_indices_indexed(self, file_data, index_number, cc_value_column_index, cc_position_column_index, start_search_position, end_search_position, retrieve_row_indices, num_parallel):
-        return filter_using_operator(file_data, f"i{index_number}", self, cc_value_column_index, cc_position_column_index, start_search_position, end_search_position, retrieve_row_indices, num_parallel)
+        return filter_using_operator(file_data, f"i{index_number}", self, cc_value_column_index, cc_position_column_index, start_search_position, end_search_position, retrieve_row_indices)
 
 class StringFilter(_OperatorFilter):
     def __init__(self, column_name, oper, value):
@@ -154,6 +351,9 @@ class IntFilter(_OperatorFilter):
     def _get_conversion_function(self):
         return fast_int
 
+    def _convert_array(self, value_bytes):
+        return get_typed_array(value_bytes, np.int64)
+
 class FloatFilter(_OperatorFilter):
     def __init__(self, column_name, oper, value):
         self._check_argument(value, "value", float)
@@ -169,6 +369,9 @@ class FloatFilter(_OperatorFilter):
     def _get_conversion_function(self):
         return fast_float
 
+    def _convert_array(self, value_bytes):
+        return get_typed_array(value_bytes, np.float64)
+
 class _RangeFilter(_SimpleBaseFilter):
     def __init__(self, column_name, lower_bound_value, upper_bound_value):
         self._check_argument(column_name, "column_name", str)
@@ -184,12 +387,19 @@ class _RangeFilter(_SimpleBaseFilter):
         typed_value = self._get_conversion_function()(value)
         return self.lower_bound_value <= typed_value <= self.upper_bound_value
 
+    def _passes_array(self, value_bytes):
+        typed_values = self._convert_array(value_bytes)
+        return (typed_values >= self._get_array_bound(self.lower_bound_value)) & (typed_values <= self._get_array_bound(self.upper_bound_value))
+
+    def _get_array_bound(self, bound_value):
+        return bound_value
+
     def get_matching_row_indices_indexed(self, file_data, index_number, cc_value_column_index, cc_position_column_index, start_search_position, end_search_position, retrieve_row_indices, num_parallel):
         data_file_key = f"i{index_number}"
 
         coords = parse_data_coords(file_data, data_file_key, [cc_value_column_index, cc_position_column_index])
 
-        return find_row_indices_for_range(file_data, data_file_key, coords[0], coords[1], self._get_index_filter_1(), self._get_index_filter_2(), start_search_position, end_search_position, retrieve_row_indices, num_parallel)
+        return find_row_indices_for_range(file_data, data_file_key, coords[0], coords[1], self._get_index_filter_1(), self._get_index_filter_2(), start_search_position, end_search_position, retrieve_row_indices)
 
     def _get_conversion_function(self):
         raise NotImplementedError
@@ -208,6 +418,10 @@ class StringRangeFilter(_RangeFilter):
     def _get_conversion_function(self):
         return convert_bytes_to_str
 
+    # Encoded values sort in the same order as the strings they represent.
+    def _get_array_bound(self, bound_value):
+        return bound_value.encode()
+
     def _get_index_filter_1(self):
         return StringFilter(self.column_name.decode(), ge, self.lower_bound_value)
 
@@ -228,6 +442,9 @@ class IntRangeFilter(_RangeFilter):
     def _get_conversion_function(self):
         return fast_int
 
+    def _convert_array(self, value_bytes):
+        return get_typed_array(value_bytes, np.int64)
+
     def _get_index_filter_1(self):
         return IntFilter(self.column_name.decode(), ge, self.lower_bound_value)
 
@@ -248,6 +465,9 @@ class FloatRangeFilter(_RangeFilter):
     def _get_conversion_function(self):
         return fast_float
 
+    def _convert_array(self, value_bytes):
+        return get_typed_array(value_bytes, np.float64)
+
     def _get_index_filter_1(self):
         return FloatFilter(self.column_name.decode(), ge, self.lower_bound_value)
 
@@ -259,15 +479,17 @@ class HeadFilter(_BaseFilter):
         self.n = n
 
     def get_matching_row_indices(self, file_data, row_indices, num_parallel):
+        matching_row_indices = RowSet(file_data.cache_dict["num_rows"], range(self.n))
+
         if row_indices is None:
-            return set(range(min(file_data.cache_dict["num_rows"], self.n)))
+            return matching_row_indices
         else:
-            return set(range(min(file_data.cache_dict["num_rows"], self.n))) & row_indices
+            return matching_row_indices & row_indices
 
 class TailFilter(HeadFilter):
     def get_matching_row_indices(self, file_data, row_indices, num_parallel):
         num_rows = file_data.cache_dict["num_rows"]
-        matching_row_indices = set(range(num_rows - self.n, num_rows))
+        matching_row_indices = RowSet(num_rows, range(num_rows - self.n, num_rows))
 
         if row_indices is None:
             return matching_row_indices
@@ -289,13 +511,19 @@ class StartsWithFilter(_SimpleBaseFilter):
     def _passes(self, value):
         return value.startswith(self.value)
 
+    def _passes_array(self, value_bytes):
+        return np.char.startswith(get_string_array(value_bytes), self.value)
+
     def get_matching_row_indices_indexed(self, file_data, index_number, cc_value_column_index, cc_position_column_index, start_search_position, end_search_position, retrieve_row_indices, num_parallel):
-        return get_passing_row_indices_with_filter(file_data, f"i{index_number}", self, cc_value_column_index, cc_position_column_index, start_search_position, end_search_position, retrieve_row_indices, num_parallel)
+        return get_passing_row_indices_with_filter(file_data, f"i{index_number}", self, cc_value_column_index, cc_position_column_index, start_search_position, end_search_position, retrieve_row_indices)
 
 class EndsWithFilter(StartsWithFilter):
     def _passes(self, value):
         return value.endswith(self.value)
 
+    def _passes_array(self, value_bytes):
+        return np.char.endswith(get_string_array(value_bytes), self.value)
+
 class _CompositeFilter(_BaseFilter):
     def __init__(self, filters):
         for f in filters:
@@ -338,7 +566,7 @@ class AndFilter(_CompositeFilter):
 
                 # If there are no matches, stop looking.
                 if rows_start_end[0] == rows_start_end[1]:
-                    return set()
+                    return RowSet(file_data.cache_dict["num_rows"])
 
             return self.filters[-1].get_matching_row_indices_indexed(file_data, index_number, num_filters - 1, num_filters, rows_start_end[0], rows_start_end[1], True, num_parallel)
 
@@ -381,12 +609,13 @@ class OrFilter(_CompositeFilter):
     def get_matching_row_indices(self, file_data, row_indices, num_parallel):
         # FYI: Multi-column indices don't make sense to use with Or logic.
 
-        row_indices_out = set()
+        num_rows = file_data.cache_dict["num_rows"]
+        row_indices_out = RowSet(num_rows)
 
         index_numbers = self._get_index_numbers(file_data)
         has_no_indices = sum([1 for i in index_numbers if i > -1]) == 0
 
-        if self._has_all_operator_filters() and has_no_indices:
+        if self._has_all_operator_filters() and has_no_indices and file_data.decompression_type:
             # This is a special case where we can make it more efficient.
             # We always check the first filter. If that equates to False, we continue checking subsequent filters.
             column_indices = [get_column_index_from_name(file_data, f.column_name) for f in self.filters]
@@ -394,20 +623,25 @@ class OrFilter(_CompositeFilter):
             parse_function = get_parse_row_value_function(file_data)
 
             if row_indices is None:
-                row_indices = set(range(file_data.cache_dict["num_rows"]))
+                row_indices = RowSet(num_rows, range(num_rows))
+
+            passing_row_indices = []
 
             for row_index in row_indices:
                 for i, f in enumerate(self.filters):
                     if f._passes(parse_function(file_data, "", row_index, coords[i])):
-                        row_indices_out.add(row_index)
+                        passing_row_indices.append(row_index)
                         break
+
+            row_indices_out = RowSet(num_rows, np.array(passing_row_indices, dtype=np.int64))
         else:
             for fltr_index, fltr in enumerate(self.filters):
                 if index_numbers[fltr_index] < 0:
-                    if row_indices is None:
-                        row_indices = set(range(file_data.cache_dict["num_rows"]))
-
                     row_indices_f = fltr.get_matching_row_indices(file_data, row_indices, num_parallel)
+
+                    # A filter such as NoFilter returns None when all rows match.
+                    if row_indices_f is None:
+                        row_indices_f = RowSet(num_rows, range(num_rows))
                 else:
                     # When using the index, we have to search all rows because the row_indices will not be in the same order for all indices.
                     row_indices_f = fltr.get_matching_row_indices_indexed(file_data, index_numbers[fltr_index], 0, 1, 0, file_data.cache_dict["num_rows"], True, num_parallel)
@@ -446,6 +680,145 @@ class OrFilter(_CompositeFilter):
 
         return -1
 
+class F4Reader:
+    """
+    This class keeps an f4 file open so that its metadata is read only once, no matter how many
+    queries are performed. It can be used as a context manager; otherwise, call close() when done.
+    The file is shared with the file pool, so opening a reader for a recently used file is cheap.
+
+    Args:
+        data_file_path (str): The path to an f4 file.
+        use_memory_mapping (bool): Whether to access the file via memory mapping.
+    """
+    def __init__(self, data_file_path, use_memory_mapping=True):
+        if not isinstance(data_file_path, str):
+            raise Exception("You must specify data_file_path as an str value.")
+
+        self.data_file_path = data_file_path
+        self.file_data = acquire_file_data(data_file_path, use_memory_mapping)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.file_data:
+            release_file_data(self.file_data)
+            self.file_data = None
+
+    def query(self, fltr=NoFilter(), select_columns=[], out_file_path=None, out_file_type="tsv", num_parallel=1, tmp_dir_path=None):
+        """
+        Query the file using zero or more filters. The arguments are the same as for the query function.
+        """
+        run_query(self.file_data, fltr, select_columns, out_file_path, out_file_type, num_parallel, tmp_dir_path)
+
+    def scan(self, fltr=NoFilter(), select_columns=None, typed=False, num_parallel=1):
+        """
+        Iterate over the rows that match a filter, in the order they appear in the file. Rows are parsed only
+        as they are requested, so iteration can stop at any point. The reader must remain open while iterating.
+
+        Args:
+            fltr (BaseFilter): A filter.
+            select_columns (list): A list of strings that indicate the names of columns that should be selected. If this is None or an empty list, all columns will be selected.
+            typed (bool): Whether to convert values to int, float, or str, according to the column types. Otherwise, each value is bytes.
+            num_parallel (int): The number of processes to use when identifying matching rows.
+
+        Returns:
+            A generator that yields a tuple of values for each row.
+        """
+        return scan_rows(self.file_data, fltr, select_columns, typed, num_parallel)
+
+    def query_to_numpy(self, fltr=NoFilter(), select_columns=None, num_parallel=1):
+        """
+        Query the file and return the matching rows as a NumPy structured array, with a field for each selected column.
+        Integer and float columns are stored as int64 and float64. String columns are stored as fixed-width bytes (S{n}),
+        where n is the width of the column in the file. Integer columns wider than 18 characters may hold values that do
+        not fit in int64, so they are stored as Python int objects. A column may be selected only once.
+
+        Args:
+            fltr (BaseFilter): A filter.
+            select_columns (list): A list of strings that indicate the names of columns that should be selected. If this is None or an empty list, all columns will be selected.
+            num_parallel (int): The number of processes to use when identifying matching rows.
+        """
+        return get_numpy_rows(self.file_data, fltr, select_columns, num_parallel)
+
+    def query_to_pandas(self, fltr=NoFilter(), select_columns=None, num_parallel=1):
+        """
+        Query the file and return the matching rows as a pandas DataFrame. The arguments are the same as for query_to_numpy.
+        String values are decoded to str. The pandas package must be installed.
+        """
+        try:
+            import pandas as pd
+        except ImportError:
+            raise Exception("The pandas package must be installed to use query_to_pandas.")
+
+        rows = self.query_to_numpy(fltr, select_columns, num_parallel)
+
+        data = {}
+        for column_name in rows.dtype.names:
+            if rows.dtype[column_name].kind == "S":
+                data[column_name] = np.char.decode(rows[column_name])
+            else:
+                data[column_name] = rows[column_name]
+
+        return pd.DataFrame(data, columns=rows.dtype.names)
+
+    def head(self, n=10, select_columns=None, out_file_path=None, out_file_type="tsv"):
+        self.query(HeadFilter(n), select_columns if select_columns else [], out_file_path=out_file_path, out_file_type=out_file_type)
+
+    def tail(self, n=10, select_columns=None, out_file_path=None, out_file_type="tsv"):
+        self.query(TailFilter(n), select_columns if select_columns else [], out_file_path=out_file_path, out_file_type=out_file_type)
+
+    def get_version(self):
+        return self.file_data.version.decode()
+
+    def get_num_rows(self):
+        return self.file_data.cache_dict["num_rows"]
+
+    def get_num_cols(self):
+        return self.file_data.cache_dict["num_cols"]
+
+    def get_column_type_from_name(self, column_name):
+        try:
+            column_index = get_column_index_from_name(self.file_data, column_name.encode())
+
+            return get_column_type_from_index(self.file_data, column_index)
+        except:
+            raise Exception(f"A column with the name {column_name} does not exist.")
+
+    def get_indexes(self):
+        indexes = []
+
+        if "i" in self.file_data.cache_dict:
+            for key, number in self.file_data.cache_dict["i"].items():
+                if len(key) == 1:
+                    column_name = key[0][0]
+                    reverse_status = key[0][1]
+
+                    if reverse_status:
+                        column_name += "_endswith"
+
+                    indexes.append([column_name, number])
+                else:
+                    column_names = []
+                    for x in key:
+                        column_name = x[0]
+                        reverse_status = x[1]
+
+                        if reverse_status:
+                            column_name += "_endswith"
+
+                        column_names.append(column_name)
+
+                    indexes.append([column_names, number])
+
+            indexes = sorted(indexes, key=lambda x: x[1])
+            indexes = [x[0] for x in indexes]
+
+        return indexes
+
 #####################################################
 # Public function(s)
 #####################################################
@@ -464,273 +837,482 @@ def query(data_file_path, fltr=NoFilter(), select_columns=[], out_file_path=None
         out_file_type (str): The output file type. Currently, the only supported value is tsv.
     """
 
-    if not isinstance(data_file_path, str):
-        raise Exception("You must specify data_file_path as an str value.")
+    with F4Reader(data_file_path, use_memory_mapping) as reader:
+        reader.query(fltr, select_columns, out_file_path, out_file_type, num_parallel, tmp_dir_path)
 
-    if not fltr:
-        raise Exception("A filter must be specified.")
+def iter_query(data_file_path, fltr=NoFilter(), select_columns=None, typed=False, num_parallel=1, use_memory_mapping=True):
+    """
+    Iterate over the rows that match a filter rather than writing them to a file. The file is kept open
+    until iteration is complete. See F4Reader.scan for a description of the arguments.
+    """
 
-    if not isinstance(fltr, _BaseFilter):
-        raise Exception("An object that inherits from __BaseFilter must be specified.")
+    with F4Reader(data_file_path, use_memory_mapping) as reader:
+        yield from reader.scan(fltr, select_columns, typed, num_parallel)
+
+def query_to_numpy(data_file_path, fltr=NoFilter(), select_columns=None, num_parallel=1, use_memory_mapping=True):
+    """
+    Query the data file and return the matching rows as a NumPy structured array. See F4Reader.query_to_numpy for details.
+    """
+
+    with F4Reader(data_file_path, use_memory_mapping) as reader:
+        return reader.query_to_numpy(fltr, select_columns, num_parallel)
+
+def query_to_pandas(data_file_path, fltr=NoFilter(), select_columns=None, num_parallel=1, use_memory_mapping=True):
+    """
+    Query the data file and return the matching rows as a pandas DataFrame. See F4Reader.query_to_numpy for details.
+    """
+
+    with F4Reader(data_file_path, use_memory_mapping) as reader:
+        return reader.query_to_pandas(fltr, select_columns, num_parallel)
+
+def head(data_file_path, n=10, select_columns=None, out_file_path=None, out_file_type="tsv"):
+    if not select_columns:
+        select_columns = []
+
+    query(data_file_path, HeadFilter(n), select_columns, out_file_path=out_file_path, out_file_type=out_file_type)
+
+def tail(data_file_path, n=10, select_columns=None, out_file_path=None, out_file_type="tsv"):
+    if not select_columns:
+        select_columns = []
+
+    query(data_file_path, TailFilter(n), select_columns, out_file_path=out_file_path, out_file_type=out_file_type)
+
+def get_version(data_file_path):
+    with F4Reader(data_file_path) as reader:
+        return reader.get_version()
+
+def get_num_rows(data_file_path, use_memory_mapping=True):
+    with F4Reader(data_file_path, use_memory_mapping) as reader:
+        return reader.get_num_rows()
+
+def get_num_cols(data_file_path, use_memory_mapping=True):
+    with F4Reader(data_file_path, use_memory_mapping) as reader:
+        return reader.get_num_cols()
+
+def get_column_type_from_name(data_file_path, column_name, use_memory_mapping=True):
+    with F4Reader(data_file_path, use_memory_mapping) as reader:
+        return reader.get_column_type_from_name(column_name)
+
+def get_indexes(data_file_path, use_memory_mapping=True):
+    with F4Reader(data_file_path, use_memory_mapping) as reader:
+        return reader.get_indexes()
+
+def set_file_pool_size(max_num_files):
+    """
+    Set how many recently used files are kept open (per process) so their metadata need not be read again.
+    The least recently used files are closed when the pool is full. Specify 0 to disable the pool.
+    """
+
+    if not isinstance(max_num_files, int) or max_num_files < 0:
+        raise Exception("The value specified for max_num_files must be a non-negative integer.")
+
+    with file_pool_lock:
+        file_pool_stats["max_num_files"] = max_num_files
+
+        while len(file_pool) > max_num_files:
+            remove_from_file_pool(next(iter(file_pool)))
 
+def get_file_pool_stats():
+    with file_pool_lock:
+        return {"hits": file_pool_stats["hits"], "misses": file_pool_stats["misses"], "num_files": len(file_pool), "max_num_files": file_pool_stats["max_num_files"]}
+
+def clear_file_pool():
+    with file_pool_lock:
+        while len(file_pool) > 0:
+            remove_from_file_pool(next(iter(file_pool)))
+
+        file_pool_stats["hits"] = 0
+        file_pool_stats["misses"] = 0
+
+##############################################
+# Non-public functions
+##############################################
+
+def run_query(file_data, fltr, select_columns, out_file_path, out_file_type, num_parallel, tmp_dir_path):
     if out_file_type != "tsv":
         raise Exception("The only out_file_type currently supported is tsv.")
 
-    if num_parallel > 1:
-        global joblib
-        joblib = __import__('joblib', globals(), locals())
+    keep_row_indices = get_keep_row_indices(file_data, fltr, num_parallel)
 
-    with initialize(data_file_path, use_memory_mapping) as file_data:
-        # Make sure the filters match the column types.
-        fltr._check_types(file_data)
+    # Parse information about columns to be selected.
+    if select_columns:
+        if not isinstance(select_columns, list):
+            raise Exception("You must specify select_column as a list.")
 
-        # Filter rows based on the data
-        keep_row_indices = fltr.get_matching_row_indices(file_data, None, num_parallel)
+        # Save header line
+        select_columns = [c.encode() for c in select_columns]
+        with get_write_object(out_file_path) as write_obj:
+            write_obj.write(b"\t".join(select_columns) + b"\n")
 
-        if keep_row_indices is None:
-            keep_row_indices = range(file_data.cache_dict["num_rows"])
+        # Get select column indices
+        if len(select_columns) <= 100:
+            select_column_index_chunks = [[get_column_index_from_name(file_data, c) for c in select_columns]]
+            num_select_column_chunks = 1
         else:
-            keep_row_indices = sorted(keep_row_indices)
-
-        # Parse information about columns to be selected.
-        if select_columns:
-            if not isinstance(select_columns, list):
-                raise Exception("You must specify select_column as a list.")
-
-            # Save header line
-            select_columns = [c.encode() for c in select_columns]
-            with get_write_object(out_file_path) as write_obj:
-                write_obj.write(b"\t".join(select_columns) + b"\n")
-
-            # Get select column indices
-            if len(select_columns) <= 100:
-                select_column_index_chunks = [[get_column_index_from_name(file_data, c) for c in select_columns]]
-                num_select_column_chunks = 1
-            else:
-                max_columns_per_chunk = 1000001
+            max_columns_per_chunk = 1000001
+
+            select_column_name_chunks = split_list_into_chunks(select_columns, max_columns_per_chunk)
+            select_column_index_chunks = list(get_column_index_chunks_from_names(file_data, select_column_name_chunks))
 
-                select_column_name_chunks = split_list_into_chunks(select_columns, max_columns_per_chunk)
-                select_column_index_chunks = list(get_column_index_chunks_from_names(file_data, select_column_name_chunks))
+            num_select_column_chunks = ceil(len(select_columns) / max_columns_per_chunk)
+    else:
+        # Save header line
+        chunk_size = 1000001
+        cn_start = file_data.file_map_dict["cn"][0]
+        cn_end = file_data.file_map_dict["cn"][1]
+
+        with get_write_object(out_file_path) as write_obj:
+            for chunk_start in range(cn_start, cn_end, chunk_size):
+                # chunk_text = file_data.file_handle[chunk_start:min(chunk_start + chunk_size, cn_end)]
+                chunk_text = read_from_file(file_data.file_handle, chunk_start, min(chunk_start + chunk_size, cn_end), file_data.use_memory_mapping)
+                write_obj.write(chunk_text.replace(b"\n", b"\t"))
+
+            write_obj.write(b"\n")
+
+        # Get select column indices
+        max_columns_per_chunk = 1000001
+        num_cols = file_data.cache_dict["num_cols"]
+        select_column_index_chunks = list(generate_range_chunks(num_cols, max_columns_per_chunk))
+        num_select_column_chunks = ceil(num_cols / max_columns_per_chunk)
+
+    if len(keep_row_indices) == 0:
+        return
+
+    num_keep_rows = len(keep_row_indices)
+    max_rows_per_chunk = ceil(num_keep_rows / num_parallel)
+    num_row_index_chunks = ceil(num_keep_rows / max_rows_per_chunk)
+
+    if num_row_index_chunks == 1:
+        keep_row_indices = [keep_row_indices]
+    else:
+        keep_row_indices = list(keep_row_indices.split(max_rows_per_chunk))
 
-                num_select_column_chunks = ceil(len(select_columns) / max_columns_per_chunk)
+    if num_select_column_chunks == 1 and num_row_index_chunks == 1:
+        write_output_rows(file_data, out_file_path, keep_row_indices[0], select_column_index_chunks[0])
+    else:
+        if tmp_dir_path:
+            makedirs(tmp_dir_path, exist_ok=True)
         else:
-            # Save header line
-            chunk_size = 1000001
-            cn_start = file_data.file_map_dict["cn"][0]
-            cn_end = file_data.file_map_dict["cn"][1]
+            tmp_dir_path = mkdtemp()
 
-            with get_write_object(out_file_path) as write_obj:
-                for chunk_start in range(cn_start, cn_end, chunk_size):
-                    # chunk_text = file_data.file_handle[chunk_start:min(chunk_start + chunk_size, cn_end)]
-                    chunk_text = read_from_file(file_data.file_handle, chunk_start, min(chunk_start + chunk_size, cn_end), use_memory_mapping)
-                    write_obj.write(chunk_text.replace(b"\n", b"\t"))
+        tmp_dir_path = fix_dir_path_ending(tmp_dir_path)
 
-                write_obj.write(b"\n")
+        if num_parallel == 1:
+            for row_chunk_number, row_chunk_indices in enumerate(keep_row_indices):
+                for column_chunk_number, column_chunk_indices in enumerate(select_column_index_chunks):
+                    save_output_rows(file_data.data_file_path, file_data.use_memory_mapping, f"{tmp_dir_path}{row_chunk_number}_{column_chunk_number}", row_chunk_indices, column_chunk_indices)
+        else:
+            joblib.Parallel(n_jobs=num_parallel)(
+                joblib.delayed(save_output_rows)(file_data.data_file_path, file_data.use_memory_mapping, f"{tmp_dir_path}{row_chunk_number}_{column_chunk_number}", row_chunk_indices, column_chunk_indices)
+                    for row_chunk_number, row_chunk_indices in enumerate(keep_row_indices)
+                        for column_chunk_number, column_chunk_indices in enumerate(select_column_index_chunks)
+            )
 
-            # Get select column indices
-            max_columns_per_chunk = 1000001
-            num_cols = file_data.cache_dict["num_cols"]
-            select_column_index_chunks = list(generate_range_chunks(num_cols, max_columns_per_chunk))
-            num_select_column_chunks = ceil(num_cols / max_columns_per_chunk)
+        with get_write_object(out_file_path, "ab") as write_obj:
+            for row_chunk_number, row_indices in enumerate(keep_row_indices):
+                chunk_file_dict = {}
+                for column_chunk_number in range(num_select_column_chunks):
+                    chunk_file_dict[column_chunk_number] = open(f"{tmp_dir_path}{row_chunk_number}_{column_chunk_number}", "rb")
 
-        if len(keep_row_indices) == 0:
-            return
+                for row_index in range(len(row_indices)):
+                    for column_chunk_number in range(num_select_column_chunks):
+                        chunk_file = chunk_file_dict[column_chunk_number]
 
-        num_keep_rows = len(keep_row_indices)
-        max_rows_per_chunk = ceil(num_keep_rows / num_parallel)
-        num_row_index_chunks = ceil(num_keep_rows / max_rows_per_chunk)
+                        if column_chunk_number + 1 == num_select_column_chunks:
+                            write_obj.write(chunk_file.readline())
+                        else:
+                            write_obj.write(chunk_file.readline().rstrip(b"\n") + b"\t")
 
-        if num_row_index_chunks == 1:
-            keep_row_indices = [keep_row_indices]
-        else:
-            keep_row_indices = list(split_list_into_chunks(keep_row_indices, max_rows_per_chunk))
+                for chunk_file in chunk_file_dict.values():
+                    chunk_file.close()
 
-        if num_select_column_chunks == 1 and num_row_index_chunks == 1:
-            save_output_rows(data_file_path, use_memory_mapping, out_file_path, keep_row_indices[0], select_column_index_chunks[0])
-        else:
-            if tmp_dir_path:
-                makedirs(tmp_dir_path, exist_ok=True)
-            else:
-                tmp_dir_path = mkdtemp()
+        for row_chunk_number in range(num_row_index_chunks):
+            for column_chunk_number in range(num_select_column_chunks):
+                remove_tmp_file(f"{tmp_dir_path}{row_chunk_number}_{column_chunk_number}")
 
-            tmp_dir_path = fix_dir_path_ending(tmp_dir_path)
+def get_keep_row_indices(file_data, fltr, num_parallel):
+    if not fltr:
+        raise Exception("A filter must be specified.")
 
-            if num_parallel == 1:
-                for row_chunk_number, row_chunk_indices in enumerate(keep_row_indices):
-                    for column_chunk_number, column_chunk_indices in enumerate(select_column_index_chunks):
-                        save_output_rows(data_file_path, use_memory_mapping, f"{tmp_dir_path}{row_chunk_number}_{column_chunk_number}", row_chunk_indices, column_chunk_indices)
-            else:
-                joblib.Parallel(n_jobs=num_parallel)(
-                    joblib.delayed(save_output_rows)(data_file_path, use_memory_mapping, f"{tmp_dir_path}{row_chunk_number}_{column_chunk_number}", row_chunk_indices, column_chunk_indices)
-                        for row_chunk_number, row_chunk_indices in enumerate(keep_row_indices)
-                            for column_chunk_number, column_chunk_indices in enumerate(select_column_index_chunks)
-                )
+    if not isinstance(fltr, _BaseFilter):
+        raise Exception("An object that inherits from __BaseFilter must be specified.")
 
-            with get_write_object(out_file_path, "ab") as write_obj:
-                for row_chunk_number, row_indices in enumerate(keep_row_indices):
-                    chunk_file_dict = {}
-                    for column_chunk_number in range(num_select_column_chunks):
-                        chunk_file_dict[column_chunk_number] = open(f"{tmp_dir_path}{row_chunk_number}_{column_chunk_number}", "rb")
+    if num_parallel > 1:
+        global joblib
+        joblib = __import__('joblib', globals(), locals())
 
-                    for row_index in range(len(row_indices)):
-                        for column_chunk_number in range(num_select_column_chunks):
-                            chunk_file = chunk_file_dict[column_chunk_number]
+    # Make sure the filters match the column types.
+    fltr._check_types(file_data)
 
-                            if column_chunk_number + 1 == num_select_column_chunks:
-                                write_obj.write(chunk_file.readline())
-                            else:
-                                write_obj.write(chunk_file.readline().rstrip(b"\n") + b"\t")
+    # Filter rows based on the data
+    keep_row_indices = fltr.get_matching_row_indices(file_data, None, num_parallel)
 
-                    for chunk_file in chunk_file_dict.values():
-                        chunk_file.close()
+    if keep_row_indices is None:
+        keep_row_indices = RowSet(file_data.cache_dict["num_rows"], range(file_data.cache_dict["num_rows"]))
 
-            for row_chunk_number in range(num_row_index_chunks):
-                for column_chunk_number in range(num_select_column_chunks):
-                    remove_tmp_file(f"{tmp_dir_path}{row_chunk_number}_{column_chunk_number}")
+    return keep_row_indices
 
-    # TODO: Use the RangeSet or intervaltree packages to store discrete
-    #         indices more compactly (and quickly)?
+# Only the matching row indices are kept in memory; each row is parsed when it is requested.
+# The row indices are converted to Python ints in blocks so memory use stays bounded.
+def scan_rows(file_data, fltr, select_columns, typed, num_parallel):
+    keep_row_indices = get_keep_row_indices(file_data, fltr, num_parallel)
+    column_indices = get_select_column_indices(file_data, select_columns)
 
-def head(data_file_path, n=10, select_columns=None, out_file_path=None, out_file_type="tsv"):
-    if not select_columns:
-        select_columns = []
+    column_coords = parse_data_coords(file_data, "", column_indices)
+    parse_row_values_function = get_parse_row_values_function(file_data)
 
-    query(data_file_path, HeadFilter(n), select_columns, out_file_path=out_file_path, out_file_type=out_file_type)
+    if typed:
+        conversion_function_dict = {"i": fast_int, "f": fast_float, "s": convert_bytes_to_str}
+        conversion_functions = [conversion_function_dict[get_column_type_from_index(file_data, i)] for i in column_indices]
 
-def tail(data_file_path, n=10, select_columns=None, out_file_path=None, out_file_type="tsv"):
-    if not select_columns:
-        select_columns = []
+        for block in keep_row_indices.split(100000):
+            for row_index in block:
+                yield tuple([conversion_function(value) for conversion_function, value in zip(conversion_functions, parse_row_values_function(file_data, "", row_index, column_coords))])
+    else:
+        for block in keep_row_indices.split(100000):
+            for row_index in block:
+                yield tuple(parse_row_values_function(file_data, "", row_index, column_coords))
 
-    query(data_file_path, TailFilter(n), select_columns, out_file_path=out_file_path, out_file_type=out_file_type)
+# Values are converted one column at a time, for blocks of rows.
+def get_numpy_rows(file_data, fltr, select_columns, num_parallel):
+    keep_row_indices = get_keep_row_indices(file_data, fltr, num_parallel)
+    column_indices = get_select_column_indices(file_data, select_columns)
 
-def get_version(data_file_path):
-    with initialize(data_file_path, use_memory_mapping=True) as file_data:
-        return file_data.version.decode()
+    if select_columns:
+        column_names = select_columns
+    else:
+        column_names = [column_name.decode() for column_name in read_from_file(file_data.file_handle, file_data.file_map_dict["cn"][0], file_data.file_map_dict["cn"][1], file_data.use_memory_mapping).split(b"\n")]
 
-def get_num_rows(data_file_path, use_memory_mapping=True):
-    with initialize(data_file_path, use_memory_mapping) as file_data:
-        return file_data.cache_dict["num_rows"]
+    duplicate_column_names = sorted(set([column_name for column_name in column_names if column_names.count(column_name) > 1]))
+    if len(duplicate_column_names) > 0:
+        raise Exception(f"A column can be selected only once when the results are stored in an array, but these were selected more than once: {', '.join(duplicate_column_names)}.")
 
-def get_num_cols(data_file_path, use_memory_mapping=True):
-    with initialize(data_file_path, use_memory_mapping) as file_data:
-        return file_data.cache_dict["num_cols"]
+    column_coords = parse_data_coords(file_data, "", column_indices)
+    column_types = [get_column_type_from_index(file_data, i) for i in column_indices]
+    column_dtypes = [get_numpy_dtype(column_type, coords[1] - coords[0]) for column_type, coords in zip(column_types, column_coords)]
 
-def get_column_type_from_name(data_file_path, column_name, use_memory_mapping=True):
-    try:
-        with initialize(data_file_path, use_memory_mapping) as file_data:
-            column_index = get_column_index_from_name(file_data, column_name.encode())
+    rows = np.zeros(len(keep_row_indices), dtype=list(zip(column_names, column_dtypes)))
+    position = 0
 
-            return get_column_type_from_index(file_data, column_index)
-    except:
-        raise Exception(f"A column with the name {column_name} does not exist.")
+    if not file_data.decompression_type:
+        for block_row_indices, row_bytes in generate_row_blocks(file_data, keep_row_indices):
+            block_end = position + len(block_row_indices)
 
-def get_indexes(data_file_path, use_memory_mapping=True):
-    indexes = []
+            for column_name, column_type, coords in zip(column_names, column_types, column_coords):
+                if coords[1] == coords[0]:
+                    continue
 
-    with initialize(data_file_path, use_memory_mapping) as file_data:
-        if "i" in file_data.cache_dict:
-            for key, number in file_data.cache_dict["i"].items():
-                if len(key) == 1:
-                    column_name = key[0][0]
-                    reverse_status = key[0][1]
+                value_bytes = np.ascontiguousarray(row_bytes[:, coords[0]:coords[1]])
 
-                    if reverse_status:
-                        column_name += "_endswith"
+                if column_type == "s":
+                    rows[column_name][position:block_end] = get_string_array(value_bytes)
+                elif rows.dtype[column_name] == object:
+                    rows[column_name][position:block_end] = convert_to_python_ints(get_string_array(value_bytes))
+                else:
+                    rows[column_name][position:block_end] = get_typed_array(value_bytes, rows.dtype[column_name])
 
-                    indexes.append([column_name, number])
+            position = block_end
+    else:
+        parse_row_values_function = get_parse_row_values_function(file_data)
+
+        for block in keep_row_indices.split(100000):
+            column_values = [[] for column_index in column_indices]
+
+            for row_index in block:
+                for values, value in zip(column_values, parse_row_values_function(file_data, "", row_index, column_coords)):
+                    values.append(value)
+
+            block_end = position + len(block)
+
+            for column_name, column_dtype, values in zip(column_names, column_dtypes, column_values):
+                if column_dtype == object:
+                    rows[column_name][position:block_end] = convert_to_python_ints(values)
                 else:
-                    column_names = []
-                    for x in key:
-                        column_name = x[0]
-                        reverse_status = x[1]
+                    rows[column_name][position:block_end] = np.array(values, dtype=bytes).astype(column_dtype)
 
-                        if reverse_status:
-                            column_name += "_endswith"
+            position = block_end
 
-                        column_names.append(column_name)
+    return rows
 
-                    indexes.append([column_names, number])
+# Any integer with 18 or fewer characters (including a minus sign) fits in int64.
+def get_numpy_dtype(column_type, column_width):
+    if column_type == "i":
+        return np.int64 if column_width <= 18 else object
+    elif column_type == "f":
+        return np.float64
 
-            indexes = sorted(indexes, key=lambda x: x[1])
-            indexes = [x[0] for x in indexes]
+    return f"S{max(1, column_width)}"
 
-    return indexes
+def convert_to_python_ints(values):
+    python_ints = np.empty(len(values), dtype=object)
+    python_ints[:] = [fast_int(value) for value in values]
 
-##############################################
-# Non-public functions
-##############################################
+    return python_ints
+
+def get_select_column_indices(file_data, select_columns):
+    if select_columns:
+        if not isinstance(select_columns, list):
+            raise Exception("You must specify select_column as a list.")
+
+        return [get_column_index_from_name(file_data, c.encode()) for c in select_columns]
+
+    return range(file_data.cache_dict["num_cols"])
 
 @contextmanager
 def initialize(data_file_path, use_memory_mapping):
-    with get_file_handle(data_file_path, use_memory_mapping) as file_handle:
-        file_map_length_string = file_handle.readline()
-        file_map_length = fast_int(file_map_length_string.rstrip(b"\n"))
-        # file_map_dict = deserialize(mmap_handle[len(file_map_length_string):(len(file_map_length_string) + file_map_length)])
-        file_map_dict = deserialize(read_from_file(file_handle, len(file_map_length_string), len(file_map_length_string) + file_map_length, use_memory_mapping))
-
-        cache_dict = {}
-        # cache_dict["ccml"] = fast_int(mmap_handle[file_map_dict["ccml"][0]:file_map_dict["ccml"][1]])
-        cache_dict["ccml"] = fast_int(read_from_file(file_handle, file_map_dict["ccml"][0], file_map_dict["ccml"][1], use_memory_mapping))
-        cache_dict["num_cols"] = fast_int((file_map_dict["cc"][1] - file_map_dict["cc"][0]) / cache_dict["ccml"]) - 1
-
-        decompression_type = None
-        decompressor = None
-
-        if "cmpr" in file_map_dict:
-            # decompression_text = mmap_handle[file_map_dict["cmpr"][0]:file_map_dict["cmpr"][1]]
-            decompression_text = read_from_file(file_handle, file_map_dict["cmpr"][0], file_map_dict["cmpr"][1], use_memory_mapping)
-
-            if decompression_text == b"z":
-                decompression_type = "zstd"
+    file_data = acquire_file_data(data_file_path, use_memory_mapping)
+
+    try:
+        yield file_data
+    finally:
+        release_file_data(file_data)
+
+# Recently used files are kept open, in least-recently-used order. A file is identified by its path
+# and whether it is memory mapped. If the file has been modified since it was opened, it is opened again.
+file_pool = OrderedDict()
+file_pool_stats = {"hits": 0, "misses": 0, "max_num_files": 16}
+file_pool_lock = Lock()
+
+def acquire_file_data(data_file_path, use_memory_mapping):
+    pool_key = (path.abspath(data_file_path), use_memory_mapping)
+    stat_result = stat(data_file_path)
+    file_signature = (stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ctime_ns)
+
+    with file_pool_lock:
+        file_data = file_pool.get(pool_key)
+
+        if file_data is not None:
+            if file_data.file_signature == file_signature:
+                file_pool.move_to_end(pool_key)
+                file_pool_stats["hits"] += 1
+                file_data.num_users += 1
+
+                return file_data
+
+            remove_from_file_pool(pool_key)
+
+        file_pool_stats["misses"] += 1
+
+    file_data = open_file_data(data_file_path, use_memory_mapping)
+    file_data.file_signature = file_signature
+    file_data.num_users = 1
+
+    with file_pool_lock:
+        if pool_key not in file_pool and file_pool_stats["max_num_files"] > 0:
+            file_pool[pool_key] = file_data
+            file_data.is_pooled = True
+
+            while len(file_pool) > file_pool_stats["max_num_files"]:
+                remove_from_file_pool(next(iter(file_pool)))
+
+    return file_data
+
+def release_file_data(file_data):
+    with file_pool_lock:
+        file_data.num_users -= 1
+
+        if file_data.num_users == 0 and not file_data.is_pooled:
+            file_data.close()
+
+# A file that is removed from the pool stays open until it is no longer in use.
+# The caller must hold file_pool_lock.
+def remove_from_file_pool(pool_key):
+    file_data = file_pool.pop(pool_key)
+    file_data.is_pooled = False
+
+    if file_data.num_users == 0:
+        file_data.close()
+
+def open_file_data(data_file_path, use_memory_mapping):
+    file_handle = open_file_handle(data_file_path, use_memory_mapping)
+
+    try:
+        return read_file_data(data_file_path, file_handle, use_memory_mapping)
+    except:
+        file_handle.close()
+        raise
+
+def read_file_data(data_file_path, file_handle, use_memory_mapping):
+    file_map_length_string = file_handle.readline()
+    file_map_length = fast_int(file_map_length_string.rstrip(b"\n"))
+    # file_map_dict = deserialize(mmap_handle[len(file_map_length_string):(len(file_map_length_string) + file_map_length)])
+    file_map_dict = deserialize(read_from_file(file_handle, len(file_map_length_string), len(file_map_length_string) + file_map_length, use_memory_mapping))
+
+    cache_dict = {}
+    # cache_dict["ccml"] = fast_int(mmap_handle[file_map_dict["ccml"][0]:file_map_dict["ccml"][1]])
+    cache_dict["ccml"] = fast_int(read_from_file(file_handle, file_map_dict["ccml"][0], file_map_dict["ccml"][1], use_memory_mapping))
+    cache_dict["num_cols"] = fast_int((file_map_dict["cc"][1] - file_map_dict["cc"][0]) / cache_dict["ccml"]) - 1
+
+    decompression_type = None
+    decompressor = None
+
+    if "cmpr" in file_map_dict:
+        # decompression_text = mmap_handle[file_map_dict["cmpr"][0]:file_map_dict["cmpr"][1]]
+        decompression_text = read_from_file(file_handle, file_map_dict["cmpr"][0], file_map_dict["cmpr"][1], use_memory_mapping)
+
+        if decompression_text in (b"z", b"zb", b"zd", b"zc"):
+            decompression_type = {b"z": "zstd", b"zb": "zstd_block", b"zd": "zstd_dict", b"zc": "zstd_column_groups"}[decompression_text]
+
+            if decompression_type == "zstd_dict":
+                # The dictionary is loaded once and used to decompress every row.
+                dict_data = read_from_file(file_handle, file_map_dict["zdict"][0], file_map_dict["zdict"][1], use_memory_mapping)
+                decompressor = ZstdDecompressor(dict_data=ZstdCompressionDict(dict_data))
+            else:
                 decompressor = ZstdDecompressor()
 
-                # TODO: For super tall files, this gets too large to fit in memory.
-                #       If we continue to support zstd compression, you may need to incorporate
-                #       the idea of row chunks when building the file and then retrieve
-                #       the row_starts just for those.
-                #       However, the custom compression approach would avoid this problem.
-                # row_lengths = deserialize(mmap_handle[file_map_dict["rl"][0]:file_map_dict["rl"][1]])
-                # cache_dict["row_starts"] = [file_map_dict[""][0]]
-                # for i, row_length in enumerate(row_lengths):
-                #     cache_dict["row_starts"].append(cache_dict["row_starts"][-1] + row_length)
-                # cache_dict["mrel"] = fast_int(mmap_handle[file_map_dict["mrel"][0]:file_map_dict["mrel"][1]])
-                cache_dict["mrel"] = fast_int(read_from_file(file_handle, file_map_dict["mrel"][0], file_map_dict["mrel"][1], use_memory_mapping))
-
-                # cache_dict["ll"] = fast_int(mmap_handle[file_map_dict["ll"][0]:file_map_dict["ll"][1]])
-                cache_dict["ll"] = fast_int(read_from_file(file_handle, file_map_dict["ll"][0], file_map_dict["ll"][1], use_memory_mapping))
-
-                # cache_dict["num_rows"] = fast_int(mmap_handle[file_map_dict["nrow"][0]:file_map_dict["nrow"][1]])
-                cache_dict["num_rows"] = fast_int(read_from_file(file_handle, file_map_dict["nrow"][0], file_map_dict["nrow"][1], use_memory_mapping))
-            # else:
-            #     decompression_type = "dictionary"
-            #     decompressor = deserialize(decompression_text)
-        else:
-            last_cc = file_map_dict["cc"][1]
-            # cache_dict["ll"] = fast_int(mmap_handle[(last_cc - cache_dict["ccml"]):last_cc])
-            cache_dict["ll"] = fast_int(read_from_file(file_handle, (last_cc - cache_dict["ccml"]), last_cc, use_memory_mapping))
-            cache_dict["num_rows"] = fast_int((file_map_dict[""][1] - file_map_dict[""][0]) / cache_dict["ll"])
+            # TODO: For super tall files, this gets too large to fit in memory.
+            #       If we continue to support zstd compression, you may need to incorporate
+            #       the idea of row chunks when building the file and then retrieve
+            #       the row_starts just for those.
+            #       However, the custom compression approach would avoid this problem.
+            # row_lengths = deserialize(mmap_handle[file_map_dict["rl"][0]:file_map_dict["rl"][1]])
+            # cache_dict["row_starts"] = [file_map_dict[""][0]]
+            # for i, row_length in enumerate(row_lengths):
+            #     cache_dict["row_starts"].append(cache_dict["row_starts"][-1] + row_length)
+            # cache_dict["mrel"] = fast_int(mmap_handle[file_map_dict["mrel"][0]:file_map_dict["mrel"][1]])
+            cache_dict["mrel"] = fast_int(read_from_file(file_handle, file_map_dict["mrel"][0], file_map_dict["mrel"][1], use_memory_mapping))
+
+            # cache_dict["ll"] = fast_int(mmap_handle[file_map_dict["ll"][0]:file_map_dict["ll"][1]])
+            cache_dict["ll"] = fast_int(read_from_file(file_handle, file_map_dict["ll"][0], file_map_dict["ll"][1], use_memory_mapping))
+
+            # cache_dict["num_rows"] = fast_int(mmap_handle[file_map_dict["nrow"][0]:file_map_dict["nrow"][1]])
+            cache_dict["num_rows"] = fast_int(read_from_file(file_handle, file_map_dict["nrow"][0], file_map_dict["nrow"][1], use_memory_mapping))
+
+            if decompression_type == "zstd_block":
+                cache_dict["rpb"] = fast_int(read_from_file(file_handle, file_map_dict["rpb"][0], file_map_dict["rpb"][1], use_memory_mapping))
+            elif decompression_type == "zstd_column_groups":
+                # These are the positions (within each row) where each group of columns starts and ends.
+                cache_dict["cgb"] = deserialize(read_from_file(file_handle, file_map_dict["cgb"][0], file_map_dict["cgb"][1], use_memory_mapping))
+        # else:
+        #     decompression_type = "dictionary"
+        #     decompressor = deserialize(decompression_text)
+    else:
+        last_cc = file_map_dict["cc"][1]
+        # cache_dict["ll"] = fast_int(mmap_handle[(last_cc - cache_dict["ccml"]):last_cc])
+        cache_dict["ll"] = fast_int(read_from_file(file_handle, (last_cc - cache_dict["ccml"]), last_cc, use_memory_mapping))
+        cache_dict["num_rows"] = fast_int((file_map_dict[""][1] - file_map_dict[""][0]) / cache_dict["ll"])
 
-        # Calculate line length based on last "cnicc" value.
-        cache_dict["cniccml"] = fast_int(read_from_file(file_handle, file_map_dict["cniccml"][0], file_map_dict["cniccml"][1], use_memory_mapping))
-        cache_dict["cnill"] = fast_int(read_from_file(file_handle, (file_map_dict["cnicc"][1] - cache_dict["cniccml"]), file_map_dict["cnicc"][1], use_memory_mapping))
+    # Calculate line length based on last "cnicc" value.
+    cache_dict["cniccml"] = fast_int(read_from_file(file_handle, file_map_dict["cniccml"][0], file_map_dict["cniccml"][1], use_memory_mapping))
+    cache_dict["cnill"] = fast_int(read_from_file(file_handle, (file_map_dict["cnicc"][1] - cache_dict["cniccml"]), file_map_dict["cnicc"][1], use_memory_mapping))
 
-        if "i" in file_map_dict:
-            # cache_dict["i"] = deserialize(mmap_handle[file_map_dict["i"][0]:file_map_dict["i"][1]])
-            cache_dict["i"] = deserialize(read_from_file(file_handle, file_map_dict["i"][0], file_map_dict["i"][1], use_memory_mapping))
+    if "i" in file_map_dict:
+        # cache_dict["i"] = deserialize(mmap_handle[file_map_dict["i"][0]:file_map_dict["i"][1]])
+        cache_dict["i"] = deserialize(read_from_file(file_handle, file_map_dict["i"][0], file_map_dict["i"][1], use_memory_mapping))
 
-            for key in file_map_dict:
-                if key.endswith("ccml"):
-                    # cache_dict[key] = fast_int(mmap_handle[file_map_dict[key][0]:file_map_dict[key][1]])
-                    cache_dict[key] = fast_int(read_from_file(file_handle, file_map_dict[key][0], file_map_dict[key][1], use_memory_mapping))
+        for key in file_map_dict:
+            if key.endswith("ccml"):
+                # cache_dict[key] = fast_int(mmap_handle[file_map_dict[key][0]:file_map_dict[key][1]])
+                cache_dict[key] = fast_int(read_from_file(file_handle, file_map_dict[key][0], file_map_dict[key][1], use_memory_mapping))
 
-                    last_cc = file_map_dict[key[:-2]][1]
-                    # cache_dict[key.replace("ccml", "ll")] = fast_int(mmap_handle[(last_cc - cache_dict[key]):last_cc])
-                    cache_dict[key.replace("ccml", "ll")] = fast_int(read_from_file(file_handle, (last_cc - cache_dict[key]), last_cc, use_memory_mapping))
+                last_cc = file_map_dict[key[:-2]][1]
+                # cache_dict[key.replace("ccml", "ll")] = fast_int(mmap_handle[(last_cc - cache_dict[key]):last_cc])
+                cache_dict[key.replace("ccml", "ll")] = fast_int(read_from_file(file_handle, (last_cc - cache_dict[key]), last_cc, use_memory_mapping))
 
-        # ver = mmap_handle[file_map_dict["ver"][0]:file_map_dict["ver"][1]]
-        ver = read_from_file(file_handle, file_map_dict["ver"][0], file_map_dict["ver"][1], use_memory_mapping)
+    # ver = mmap_handle[file_map_dict["ver"][0]:file_map_dict["ver"][1]]
+    ver = read_from_file(file_handle, file_map_dict["ver"][0], file_map_dict["ver"][1], use_memory_mapping)
 
-        yield FileData(data_file_path, file_handle, use_memory_mapping, file_map_dict, cache_dict, ver, decompression_type, decompressor)
+    return FileData(data_file_path, file_handle, use_memory_mapping, file_map_dict, cache_dict, ver, decompression_type, decompressor)
 
 # def initialize(data_file_path, use_memory_mapping=True):
 #     with get_file_handle(data_file_path, use_memory_mapping) as file_handle:
@@ -791,21 +1373,24 @@ def initialize(data_file_path, use_memory_mapping):
 #
 #         yield FileData(data_file_path, mmap_handle, file_map_dict, cache_dict, ver, decompression_type, decompressor)
 
-@contextmanager
-def get_file_handle(data_file_path, use_memory_mapping):
+# The memory map remains valid after the file itself has been closed.
+def open_file_handle(data_file_path, use_memory_mapping):
     if use_memory_mapping:
         with open(data_file_path, 'rb') as file_handle:
-            with mmap(file_handle.fileno(), 0, prot=PROT_READ) as mmap_handle:
-                yield mmap_handle
-    else:
-        with open(data_file_path, 'rb') as file_handle:
-            yield file_handle
+            return mmap(file_handle.fileno(), 0, prot=PROT_READ)
+
+    return open(data_file_path, 'rb')
 
 def get_column_index_from_name(file_data, column_name):
-    position = get_identifier_row_index(file_data, "cni", column_name, file_data.cache_dict["num_cols"])
+    position = file_data.column_index_dict.get(column_name)
+
+    if position is None:
+        position = get_identifier_row_index(file_data, "cni", column_name, file_data.cache_dict["num_cols"])
 
-    if position < 0:
-        raise Exception(f"Could not retrieve index because column named {column_name.decode()} was not found.")
+        if position < 0:
+            raise Exception(f"Could not retrieve index because column named {column_name.decode()} was not found.")
+
+        file_data.column_index_dict[column_name] = position
 
     return position
 
@@ -852,50 +1437,28 @@ def get_column_type_from_index(file_data, column_index):
 #     return read_from_file(file_handle, start_search_position, (start_search_position + segment_length), use_memory_mapping).rstrip(b" ")
 
 def parse_data_coord(file_data, data_file_key, index):
-    ccml = file_data.cache_dict[data_file_key + "ccml"]
-
-    start_pos = index * ccml
-    next_start_pos = start_pos + ccml
-    further_next_start_pos = next_start_pos + ccml
-
-    # Retrieve the start position from the cc file and then cache it.
-    data_start_pos = fast_int(parse_data_value_from_file(file_data, data_file_key + "cc", 0, 0, [start_pos, next_start_pos]).rstrip(b" "))
+    coords = get_coords_array(file_data, data_file_key)
 
-    # Retrieve the end position from the cc file and then cache it.
-    data_end_pos = fast_int(parse_data_value_from_file(file_data, data_file_key + "cc", 0, 0, [next_start_pos, further_next_start_pos]).rstrip(b" "))
-
-    return data_start_pos, data_end_pos
+    return int(coords[index]), int(coords[index + 1])
 
 def parse_data_coords(file_data, data_file_key, indices):
-    data_coords = []
-    out_dict = {}
+    coords = get_coords_array(file_data, data_file_key)
+    indices = np.fromiter(indices, dtype=np.int64)
 
-    ccml = file_data.cache_dict[data_file_key + "ccml"]
+    return [[start, end] for start, end in zip(coords[indices].tolist(), coords[indices + 1].tolist())]
 
-    for index in indices:
-        start_pos = index * ccml
-        next_start_pos = start_pos + ccml
-        further_next_start_pos = next_start_pos + ccml
+# The coordinates are stored as fixed-width text. We convert all of them to integers at once.
+def get_coords_array(file_data, data_file_key):
+    coords = file_data.coords_dict.get(data_file_key)
 
-        # See if we already have cached the start position.
-        if index in out_dict:
-            data_start_pos = out_dict[index]
-        # If not, retrieve the start position from the cc file and then cache it.
-        else:
-            data_start_pos = fast_int(parse_data_value_from_file(file_data, data_file_key + "cc", 0, 0, [start_pos, next_start_pos]).rstrip(b" "))
-            out_dict[index] = data_start_pos
+    if coords is None:
+        cc_start, cc_end = file_data.file_map_dict[data_file_key + "cc"]
+        cc = read_from_file(file_data.file_handle, cc_start, cc_end, file_data.use_memory_mapping)
 
-        # See if we already have cached the end position.
-        if (index + 1) in out_dict:
-            data_end_pos = out_dict[index + 1]
-        # If not, retrieve the end position from the cc file and then cache it.
-        else:
-            data_end_pos = fast_int(parse_data_value_from_file(file_data, data_file_key + "cc", 0, 0, [next_start_pos, further_next_start_pos]).rstrip(b" "))
-            out_dict[index + 1] = data_end_pos
+        coords = np.frombuffer(cc, dtype=f"S{file_data.cache_dict[data_file_key + 'ccml']}").astype(np.int64)
+        file_data.coords_dict[data_file_key] = coords
 
-        data_coords.append([data_start_pos, data_end_pos])
-
-    return data_coords
+    return coords
 
 def parse_data_value_from_file(file_data, data_file_key, start_element, segment_length, coords):
     start_pos = start_element * segment_length + file_data.file_map_dict[data_file_key][0]
@@ -916,9 +1479,97 @@ def parse_data_values_from_file(file_data, data_file_key, start_element, segment
         # yield file_data.file_handle[(start_pos + coords[0]):(start_pos + coords[1])].rstrip(b" ")
         yield read_from_file(file_data.file_handle, start_pos + coords[0], start_pos + coords[1], file_data.use_memory_mapping).rstrip(b" ")
 
+# When the data are not compressed, every row has the same length, so the values for a column can be viewed as a
+# matrix and filtered in blocks of rows with NumPy. This function returns the matching row indices (or None if
+# a vectorized scan is not possible, in which case the values must be checked one at a time).
+def scan_column(file_data, coords, row_indices, passes_array_function):
+    if file_data.decompression_type or coords[1] == coords[0]:
+        return None
+
+    if row_indices is None:
+        row_indices = RowSet(file_data.cache_dict["num_rows"], range(file_data.cache_dict["num_rows"]))
+
+    matching_row_indices = []
+
+    try:
+        for block_row_indices, row_bytes in generate_row_blocks(file_data, row_indices):
+            passes = passes_array_function(np.ascontiguousarray(row_bytes[:, coords[0]:coords[1]]))
+
+            if passes is None:
+                return None
+
+            matching_row_indices.append(block_row_indices[passes])
+    except (ValueError, OverflowError):
+        # Some values could not be converted by NumPy.
+        return None
+
+    if len(matching_row_indices) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    return np.concatenate(matching_row_indices)
+
+# This function yields blocks of rows from a file that is not compressed. Each block is a matrix with the
+# bytes for one row per line, along with the indices of those rows.
+def generate_row_blocks(file_data, row_indices, max_block_size=10000000):
+    num_rows = file_data.cache_dict["num_rows"]
+    line_length = file_data.cache_dict["ll"]
+    data_start = file_data.file_map_dict[""][0]
+    num_rows_per_block = max(1, max_block_size // line_length)
+
+    data_array = None
+
+    try:
+        if file_data.use_memory_mapping:
+            data_array = np.frombuffer(file_data.file_handle, dtype=np.uint8, count=num_rows * line_length, offset=data_start).reshape(num_rows, line_length)
+
+        for block in row_indices.split(num_rows_per_block):
+            if isinstance(block.rows, range):
+                block_start = block.rows.start
+                block_end = block.rows.stop
+
+                if data_array is not None:
+                    row_bytes = data_array[block_start:block_end]
+                else:
+                    row_bytes = np.frombuffer(read_from_file(file_data.file_handle, data_start + block_start * line_length, data_start + block_end * line_length, False), dtype=np.uint8).reshape(-1, line_length)
+
+                yield np.arange(block_start, block_end), row_bytes
+            else:
+                block_row_indices = block.rows
+
+                if data_array is not None:
+                    row_bytes = data_array[block_row_indices]
+                else:
+                    block_start = int(block_row_indices[0])
+                    block_end = int(block_row_indices[-1]) + 1
+
+                    # If the rows are close together, it is faster to read everything between them at once.
+                    if block_end - block_start <= 4 * len(block_row_indices):
+                        row_bytes = np.frombuffer(read_from_file(file_data.file_handle, data_start + block_start * line_length, data_start + block_end * line_length, False), dtype=np.uint8).reshape(-1, line_length)
+                        row_bytes = row_bytes[block_row_indices - block_start]
+                    else:
+                        rows = [read_from_file(file_data.file_handle, data_start + i * line_length, data_start + (i + 1) * line_length, False) for i in block_row_indices.tolist()]
+                        row_bytes = np.frombuffer(b"".join(rows), dtype=np.uint8).reshape(-1, line_length)
+
+                yield block_row_indices, row_bytes
+    finally:
+        # The memory map cannot be closed while an array refers to it.
+        del data_array
+
+# Trailing spaces are replaced with null characters, which NumPy ignores at the end of fixed-width strings.
+def get_string_array(value_bytes):
+    is_not_space = value_bytes != ord(" ")
+    is_value = np.flip(np.logical_or.accumulate(np.flip(is_not_space, axis=1), axis=1), axis=1)
+
+    return np.where(is_value, value_bytes, 0).view(f"S{value_bytes.shape[1]}").ravel()
+
+def get_typed_array(value_bytes, dtype):
+    return value_bytes.view(f"S{value_bytes.shape[1]}").ravel().astype(dtype)
+
 def get_parse_row_value_function(file_data):
     if not file_data.decompression_type:
         return parse_row_value
+    elif file_data.decompression_type == "zstd_column_groups":
+        return parse_zstd_column_group_row_value
     else:
         return parse_zstd_compressed_row_value
 
@@ -948,25 +1599,91 @@ def parse_zstd_compressed_row_value(file_data, data_file_key, row_index, column_
     # return all_text[column_coords[0]:column_coords[1]].rstrip(b" ")
 
 def get_zstd_compressed_row(file_data, row_index):
+    if file_data.decompression_type == "zstd_block":
+        num_rows_per_block = file_data.cache_dict["rpb"]
+        line_length = file_data.cache_dict["ll"]
+
+        block = get_zstd_compressed_block(file_data, row_index // num_rows_per_block)
+        row_start = (row_index % num_rows_per_block) * line_length
+
+        return block[row_start:(row_start + line_length)]
+
+    return get_zstd_compressed_frame(file_data, row_index)
+
+def get_zstd_compressed_block(file_data, block_index):
+    with file_data.lock:
+        block = file_data.block_cache.get(block_index)
+
+        if block is not None:
+            file_data.block_cache.move_to_end(block_index)
+            return block
+
+    block = get_zstd_compressed_frame(file_data, block_index)
+
+    with file_data.lock:
+        file_data.block_cache[block_index] = block
+
+        if len(file_data.block_cache) > file_data.max_cached_blocks:
+            file_data.block_cache.popitem(last=False)
+
+    return block
+
+# Each frame contains a single row, a block of rows (with zstd_block), or a group of columns within a row (with zstd_column_groups).
+# The "re" component indicates where each frame ends.
+def get_zstd_compressed_frame(file_data, frame_index):
     mrel = file_data.cache_dict["mrel"]
     re_overall_start = file_data.file_map_dict["re"][0]
 
-    if row_index == 0:
+    if frame_index == 0:
         row_start = 0
     else:
-        row_start_start = re_overall_start + (row_index - 1) * mrel
+        row_start_start = re_overall_start + (frame_index - 1) * mrel
         row_start_end = row_start_start + mrel
         # row_start = int(file_data.file_handle[row_start_start:row_start_end].rstrip(b' '))
         row_start = int(read_from_file(file_data.file_handle, row_start_start, row_start_end, file_data.use_memory_mapping).rstrip(b' '))
 
-    row_end_start = re_overall_start + row_index * mrel
+    row_end_start = re_overall_start + frame_index * mrel
     row_end_end = row_end_start + mrel
     # row_end = int(file_data.file_handle[row_end_start:row_end_end].rstrip(b' '))
     row_end = int(read_from_file(file_data.file_handle, row_end_start, row_end_end, file_data.use_memory_mapping).rstrip(b' '))
 
     data_start = file_data.file_map_dict[""][0]
     # return file_data.decompressor.decompress(file_data.file_handle[(data_start + row_start):(data_start + row_end)])
-    return file_data.decompressor.decompress(read_from_file(file_data.file_handle, data_start + row_start, data_start + row_end, file_data.use_memory_mapping))
+    compressed_frame = read_from_file(file_data.file_handle, data_start + row_start, data_start + row_end, file_data.use_memory_mapping)
+
+    with file_data.lock:
+        return file_data.decompressor.decompress(compressed_frame)
+
+# With zstd_column_groups, each row is compressed as one frame per group of columns.
+# Only the groups that contain the requested columns are decompressed.
+def parse_zstd_column_group_row_value(file_data, data_file_key, row_index, column_coords):
+    group_index, group_start = get_column_group(file_data, column_coords[0])
+    group = get_zstd_compressed_frame(file_data, row_index * (len(file_data.cache_dict["cgb"]) - 1) + group_index)
+
+    return parse_data_value_from_string((column_coords[0] - group_start, column_coords[1] - group_start), group)
+
+def parse_zstd_column_group_row_values(file_data, data_file_key, row_index, column_coords):
+    num_groups = len(file_data.cache_dict["cgb"]) - 1
+    group_dict = {}
+    values = []
+
+    for coords in column_coords:
+        group_index, group_start = get_column_group(file_data, coords[0])
+
+        if group_index not in group_dict:
+            group_dict[group_index] = get_zstd_compressed_frame(file_data, row_index * num_groups + group_index)
+
+        values.append(parse_data_value_from_string((coords[0] - group_start, coords[1] - group_start), group_dict[group_index]))
+
+    return values
+
+def get_column_group(file_data, position):
+    group_boundaries = file_data.cache_dict["cgb"]
+
+    # A column with no width at the end of a row starts where the last group ends, so it belongs to the last group.
+    group_index = min(bisect_right(group_boundaries, position) - 1, len(group_boundaries) - 2)
+
+    return group_index, group_boundaries[group_index]
 
 # def parse_dictionary_compressed_row_value(file_data, data_file_key, row_index, column_coords, bigram_size_dict=None, column_name=None):
 #     value = parse_data_value_from_file(file_data, data_file_key, row_index, file_data.cache_dict["ll"], column_coords).rstrip(b" ")
@@ -975,6 +1692,8 @@ def get_zstd_compressed_row(file_data, row_index):
 def get_parse_row_values_function(file_data):
     if not file_data.decompression_type:
         return parse_row_values
+    elif file_data.decompression_type == "zstd_column_groups":
+        return parse_zstd_column_group_row_values
     else:
         return parse_zstd_compressed_row_values
 
@@ -1029,12 +1748,15 @@ def get_write_object(out_file_path, mode="wb"):
 
 def save_output_rows(in_file_path, use_memory_mapping, out_file_path, row_indices, column_indices):
     with initialize(in_file_path, use_memory_mapping) as file_data:
-        with get_write_object(out_file_path, "ab") as write_obj:
-            select_column_coords = parse_data_coords(file_data, "", column_indices)
-            parse_row_values_function = get_parse_row_values_function(file_data)
+        write_output_rows(file_data, out_file_path, row_indices, column_indices)
 
-            for row_index in row_indices:
-                write_obj.write(b"\t".join(parse_row_values_function(file_data, "", row_index, select_column_coords)) + b"\n")
+def write_output_rows(file_data, out_file_path, row_indices, column_indices):
+    with get_write_object(out_file_path, "ab") as write_obj:
+        select_column_coords = parse_data_coords(file_data, "", column_indices)
+        parse_row_values_function = get_parse_row_values_function(file_data)
+
+        for row_index in row_indices:
+            write_obj.write(b"\t".join(parse_row_values_function(file_data, "", row_index, select_column_coords)) + b"\n")
 
 # def _get_decompression_dict(self, file_path, column_index_name_dict):
 #     with open(file_path, "rb") as cmpr_file:
@@ -1127,14 +1849,14 @@ def binary_identifier_search(file_data, data_file_key, value_coords, value_to_fi
         # Else the element can only be present in right subarray
         return binary_identifier_search(file_data, data_file_key, value_coords, value_to_find, mid + 1, r)
 
-def filter_using_operator(file_data, data_file_key, fltr, cc_value_column_index, cc_position_column_index, start_search_position, end_search_position, retrieve_row_indices, num_parallel):
+def filter_using_operator(file_data, data_file_key, fltr, cc_value_column_index, cc_position_column_index, start_search_position, end_search_position, retrieve_row_indices):
     if end_search_position == 0:
-        return set()
+        return RowSet(file_data.cache_dict["num_rows"])
 
     coords = parse_data_coords(file_data, data_file_key, [cc_value_column_index, cc_position_column_index])
 
     if fltr.oper == eq:
-        return find_row_indices_for_range(file_data, data_file_key, coords[0], coords[1], fltr, fltr, start_search_position, end_search_position, retrieve_row_indices, num_parallel)
+        return find_row_indices_for_range(file_data, data_file_key, coords[0], coords[1], fltr, fltr, start_search_position, end_search_position, retrieve_row_indices)
     else:
         if fltr.oper == ne:
             # FYI: retrieve_row_indices is not supported in this case.
@@ -1143,8 +1865,8 @@ def filter_using_operator(file_data, data_file_key, fltr, cc_value_column_index,
             lower_positions = (0, lower_position)
             upper_positions = (upper_position, end_search_position)
 
-            lower_row_indices = retrieve_matching_row_indices(file_data, data_file_key, coords[1], lower_positions, num_parallel)
-            upper_row_indices = retrieve_matching_row_indices(file_data, data_file_key, coords[1], upper_positions, num_parallel)
+            lower_row_indices = retrieve_matching_row_indices(file_data, data_file_key, coords[1], lower_positions)
+            upper_row_indices = retrieve_matching_row_indices(file_data, data_file_key, coords[1], upper_positions)
 
             return lower_row_indices | upper_row_indices
         else:
@@ -1158,7 +1880,7 @@ def filter_using_operator(file_data, data_file_key, fltr, cc_value_column_index,
                 positions = find_positions_l(file_data, data_file_key, coords[0], fltr, start_search_position, end_search_position, fltr.oper)
 
             if retrieve_row_indices:
-                return retrieve_matching_row_indices(file_data, data_file_key, coords[1], positions, num_parallel)
+                return retrieve_matching_row_indices(file_data, data_file_key, coords[1], positions)
 
             return positions
 
@@ -1255,42 +1977,25 @@ def search_with_filter(file_data, data_file_key, value_coords, left_index, right
 
         return search_with_filter(file_data, data_file_key, value_coords, left_index, mid_index, overall_end_index, fltr)
 
-def find_matching_row_indices(file_data, data_file_key, position_coords, positions):
-    matching_row_indices = set()
+# The row indices for the specified positions in an index are read in blocks and parsed with NumPy.
+def retrieve_matching_row_indices(file_data, data_file_key, position_coords, positions, max_block_size=10000000):
+    line_length = file_data.cache_dict[data_file_key + "ll"]
+    index_start = file_data.file_map_dict[data_file_key][0]
+    num_positions_per_block = max(1, max_block_size // line_length)
 
-    for i in range(positions[0], positions[1]):
-        matching_row_indices.add(fast_int(parse_row_value(file_data, data_file_key, i, position_coords)))
+    row_indices = []
 
-    return matching_row_indices
+    for block_start in range(positions[0], positions[1], num_positions_per_block):
+        block_end = min(block_start + num_positions_per_block, positions[1])
+        block = read_from_file(file_data.file_handle, index_start + block_start * line_length, index_start + block_end * line_length, file_data.use_memory_mapping)
 
-# This is the same as the function above it, but it needs to pass the file path
-# to work with joblib.
-def find_matching_row_indices_parallel(data_file_path, use_memory_mapping, data_file_key, position_coords, positions):
-    with initialize(data_file_path, use_memory_mapping) as file_data:
-        matching_row_indices = set()
-
-        for i in range(positions[0], positions[1]):
-            matching_row_indices.add(fast_int(parse_row_value(file_data, data_file_key, i, position_coords)))
-
-        return matching_row_indices
-
-def retrieve_matching_row_indices(file_data, data_file_key, position_coords, positions, num_parallel):
-    # This is a rough threshold for determine whether it is worth the overhead to parallelize.
-    num_indices = positions[1] - positions[0]
-
-    if num_parallel == 1 or num_indices < 100:
-        return find_matching_row_indices(file_data, data_file_key, position_coords, positions)
-    else:
-        chunk_size = ceil(num_indices / num_parallel)
+        position_bytes = np.frombuffer(block, dtype=np.uint8).reshape(-1, line_length)[:, position_coords[0]:position_coords[1]]
+        row_indices.append(get_typed_array(np.ascontiguousarray(position_bytes), np.int64))
 
-        position_chunks = []
-        for i in range(positions[0], positions[1], chunk_size):
-            position_chunks.append((i, min(positions[1], i + chunk_size)))
+    if len(row_indices) == 0:
+        return RowSet(file_data.cache_dict["num_rows"])
 
-        return set(chain.from_iterable(joblib.Parallel(n_jobs=num_parallel)(
-            joblib.delayed(find_matching_row_indices_parallel)(file_data.data_file_path, file_data.use_memory_mapping, data_file_key, position_coords, position_chunk)
-            for position_chunk in position_chunks))
-        )
+    return RowSet.from_indices(file_data.cache_dict["num_rows"], np.concatenate(row_indices))
 
 def find_bounds_for_range(file_data, data_file_key, value_coords, filter1, filter2, start_search_position, end_search_position):
     lower_positions = find_positions_g(file_data, data_file_key, value_coords, filter1, start_search_position, end_search_position, lt)
@@ -1301,21 +2006,21 @@ def find_bounds_for_range(file_data, data_file_key, value_coords, filter1, filte
 
     return lower_position, upper_position
 
-def find_row_indices_for_range(file_data, data_file_key, value_coords, position_coords, filter1, filter2, start_search_position, end_search_position, retrieve_row_indices, num_parallel):
+def find_row_indices_for_range(file_data, data_file_key, value_coords, position_coords, filter1, filter2, start_search_position, end_search_position, retrieve_row_indices):
     lower_position, upper_position = find_bounds_for_range(file_data, data_file_key, value_coords, filter1, filter2, start_search_position, end_search_position)
 
     if retrieve_row_indices:
-        return retrieve_matching_row_indices(file_data, data_file_key, position_coords, (lower_position, upper_position), num_parallel)
+        return retrieve_matching_row_indices(file_data, data_file_key, position_coords, (lower_position, upper_position))
     else:
         return (lower_position, upper_position)
 
-def get_passing_row_indices_with_filter(file_data, data_file_key, fltr, cc_value_column_index, cc_position_column_index, start_search_position, end_search_position, retrieve_row_indices, num_parallel):
+def get_passing_row_indices_with_filter(file_data, data_file_key, fltr, cc_value_column_index, cc_position_column_index, start_search_position, end_search_position, retrieve_row_indices):
     coords = parse_data_coords(file_data, data_file_key, [cc_value_column_index, cc_position_column_index])
 
     lower_range = find_positions_g(file_data, data_file_key, coords[0], fltr, start_search_position, end_search_position, lt)
 
     if lower_range[0] == end_search_position:
-        return set()
+        return RowSet(file_data.cache_dict["num_rows"])
 
     if lower_range[1] == end_search_position:
         upper_position = end_search_position
@@ -1323,6 +2028,6 @@ def get_passing_row_indices_with_filter(file_data, data_file_key, fltr, cc_value
         upper_position = search_with_filter(file_data, data_file_key, coords[0], lower_range[0], lower_range[1], end_search_position, fltr)
 
     if retrieve_row_indices:
-        return retrieve_matching_row_indices(file_data, data_file_key, coords[1], (lower_range[0], upper_position), num_parallel)
+        return retrieve_matching_row_indices(file_data, data_file_key, coords[1], (lower_range[0], upper_position))
 
     return (lower_range[0], upper_position)
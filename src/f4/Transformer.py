@@ -295,12 +295,216 @@ def inner_join(f4_left_src_file_path, f4_right_src_file_path, join_column, f4_de
                             tmp_tsv_file.write(b"\t".join(left_save_values + right_save_values) + b"\n")
 
             # TODO: Expand this logic for all compression types. Make sure to document it for users.
-            compression_type = None
-            if left_file_data.decompression_type == "zstd" or right_file_data.decompression_type == "zstd":
-                compression_type = "zstd"
+            compression_type = left_file_data.decompression_type or right_file_data.decompression_type
 
             print_message(f"Converting temp file at {tmp_tsv_file_path} to {f4_dest_file_path}.", verbose)
             convert_delimited_file(tmp_tsv_file_path, f4_dest_file_path, compression_type=compression_type, index_columns=index_columns, num_parallel=num_parallel, comment_prefix=None, verbose=verbose)
 
     remove_tmp_file(tmp_tsv_file_path)
     rmtree(tmp_dir_path)
+
+def concat(f4_src_file_paths, f4_dest_file_path, num_parallel=1, tmp_dir_path=None, tmp_codec="zstd", verbose=False):
+    if not isinstance(f4_src_file_paths, list) or len(f4_src_file_paths) == 0:
+        raise Exception("The value specified for f4_src_file_paths must be a non-empty list.")
+
+    validate_tmp_codec(tmp_codec)
+
+    src_description = ", ".join(f4_src_file_paths)
+    print_message(f"Concatenating {src_description} to {f4_dest_file_path}.", verbose)
+
+    # Set constants
+    read_chunk_size = 100000
+    out_items_chunk_size = 10000
+
+    file_infos = [read_file_info(f4_src_file_path) for f4_src_file_path in f4_src_file_paths]
+    column_names = file_infos[0]["column_names"]
+
+    for file_info in file_infos:
+        if "cmpr" in file_info["file_map_dict"]:
+            raise Exception(f"Concatenating is only supported for files that are not compressed, but {file_info['file_path']} is compressed.")
+
+        if file_info["column_names"] != column_names:
+            raise Exception(f"The column names in {file_info['file_path']} do not match the column names in {f4_src_file_paths[0]}.")
+
+    # Each column is as wide as its widest value in any of the files, and its type is the most general one.
+    column_sizes = np.max([np.diff(file_info["column_coords"]) for file_info in file_infos], axis=0)
+    column_types = list(file_infos[0]["column_types"])
+
+    for file_info in file_infos[1:]:
+        column_types = [merge_column_types(type1, type2) for type1, type2 in zip(column_types, file_info["column_types"])]
+
+    tmp_dir_path2 = prepare_tmp_dir(tmp_dir_path)[0]
+    columns_database_file_path = get_columns_database_file_path(tmp_dir_path2)
+
+    conn = connect_sql(columns_database_file_path)
+    cursor = conn.cursor()
+    create_column_database(cursor)
+    cursor.executemany("INSERT INTO columns (column_index, column_name, size, inferred_type) VALUES (?, ?, ?, ?)", zip(range(len(column_names)), column_names, column_sizes.tolist(), column_types))
+    cursor.close()
+    conn.close()
+
+    save_column_name_info(src_description, f4_dest_file_path, out_items_chunk_size, tmp_dir_path2, tmp_codec, False, verbose)
+    save_column_types(src_description, f4_dest_file_path, out_items_chunk_size, tmp_dir_path2, tmp_codec, False, verbose)
+    save_column_coordinates(src_description, f4_dest_file_path, out_items_chunk_size, tmp_dir_path2, tmp_codec, False, verbose)
+
+    column_coords = parse_column_coords(read_str_from_file(get_data_path(tmp_dir_path2, "cc"), tmp_codec=tmp_codec), fast_int(read_str_from_file(get_data_path(tmp_dir_path2, "ccml"), tmp_codec=tmp_codec)))
+    line_length = column_coords[-1]
+
+    # The rows from each file are placed after the rows from the files before it.
+    row_offset = 0
+    for file_info in file_infos:
+        file_info["row_offset"] = row_offset
+        row_offset += file_info["num_rows"]
+
+    num_rows = row_offset
+
+    print_message(f"Copying rows when concatenating {src_description} to {f4_dest_file_path}.", verbose)
+
+    data_file_path = get_data_path(tmp_dir_path2, "data")
+    with open(data_file_path, "wb") as data_file:
+        preallocate_file(data_file.fileno(), num_rows * line_length)
+
+    global joblib
+    joblib = __import__('joblib', globals(), locals())
+
+    joblib.Parallel(n_jobs=num_parallel)(joblib.delayed(copy_file_rows)(file_info, column_coords, data_file_path, file_info["row_offset"] * line_length, read_chunk_size) for file_info in file_infos)
+
+    write_temp_file_original_size(data_file_path, num_rows * line_length)
+
+    # The indexes of the first file are kept. If the other files were indexed the same way, the existing
+    # indexes are merged. Otherwise, they are built again.
+    if file_infos[0]["index_info_dict"]:
+        merge_existing_indexes(f4_dest_file_path, file_infos, file_infos[0]["index_info_dict"], num_rows, line_length, num_parallel, tmp_dir_path2, tmp_codec, verbose)
+
+    combine_into_single_file(src_description, f4_dest_file_path, tmp_dir_path2, tmp_codec, read_chunk_size, verbose)
+
+    remove_tmp_file(columns_database_file_path)
+
+    # Only remove the temp directory if we created it.
+    if not tmp_dir_path:
+        rmtree(tmp_dir_path2)
+
+    print_message(f"Done concatenating {src_description} to {f4_dest_file_path}.", verbose)
+
+# This function is executed in parallel.
+def copy_file_rows(file_info, column_coords, data_file_path, position, read_chunk_size):
+    with open(data_file_path, "r+b") as data_file:
+        copy_rows_to_position(file_info["file_path"], file_info["file_map_dict"][""][0], file_info["column_coords"], column_coords, file_info["num_rows"], data_file.fileno(), position, read_chunk_size)
+
+def cbind(f4_src_file_paths, f4_dest_file_path, num_parallel=1, tmp_dir_path=None, tmp_codec="zstd", verbose=False):
+    if not isinstance(f4_src_file_paths, list) or len(f4_src_file_paths) == 0:
+        raise Exception("The value specified for f4_src_file_paths must be a non-empty list.")
+
+    validate_tmp_codec(tmp_codec)
+
+    src_description = ", ".join(f4_src_file_paths)
+    print_message(f"Binding the columns of {src_description} to {f4_dest_file_path}.", verbose)
+
+    # Set constants
+    read_chunk_size = 100000
+    out_items_chunk_size = 10000
+
+    file_infos = [read_file_info(f4_src_file_path) for f4_src_file_path in f4_src_file_paths]
+    num_rows = file_infos[0]["num_rows"]
+    column_names = []
+
+    for file_info in file_infos:
+        if "cmpr" in file_info["file_map_dict"]:
+            raise Exception(f"Binding columns is only supported for files that are not compressed, but {file_info['file_path']} is compressed.")
+
+        if file_info["num_rows"] != num_rows:
+            raise Exception(f"The number of rows in {file_info['file_path']} does not match the number of rows in {f4_src_file_paths[0]}.")
+
+        column_names.extend(file_info["column_names"])
+
+    if len(set(column_names)) != len(column_names):
+        raise Exception(f"Column names may not be repeated across {src_description}.")
+
+    tmp_dir_path2 = prepare_tmp_dir(tmp_dir_path)[0]
+    columns_database_file_path = get_columns_database_file_path(tmp_dir_path2)
+
+    # The columns keep their widths and types from the files they came from.
+    column_sizes = np.concatenate([np.diff(file_info["column_coords"]) for file_info in file_infos])
+    column_types = "".join([file_info["column_types"] for file_info in file_infos])
+
+    conn = connect_sql(columns_database_file_path)
+    cursor = conn.cursor()
+    create_column_database(cursor)
+    cursor.executemany("INSERT INTO columns (column_index, column_name, size, inferred_type) VALUES (?, ?, ?, ?)", zip(range(len(column_names)), column_names, column_sizes.tolist(), column_types))
+    cursor.close()
+    conn.close()
+
+    save_column_name_info(src_description, f4_dest_file_path, out_items_chunk_size, tmp_dir_path2, tmp_codec, False, verbose)
+    save_column_types(src_description, f4_dest_file_path, out_items_chunk_size, tmp_dir_path2, tmp_codec, False, verbose)
+    save_column_coordinates(src_description, f4_dest_file_path, out_items_chunk_size, tmp_dir_path2, tmp_codec, False, verbose)
+
+    print_message(f"Interleaving rows when binding the columns of {src_description} to {f4_dest_file_path}.", verbose)
+
+    line_length = int(column_sizes.sum())
+    data_file_path = get_data_path(tmp_dir_path2, "data")
+
+    with open(data_file_path, "wb") as data_file:
+        preallocate_file(data_file.fileno(), num_rows * line_length)
+
+    if num_rows > 0 and line_length > 0:
+        num_rows_per_range = max(1, ceil(num_rows / num_parallel))
+        row_ranges = [[start_row_index, min(start_row_index + num_rows_per_range, num_rows)] for start_row_index in range(0, num_rows, num_rows_per_range)]
+
+        global joblib
+        joblib = __import__('joblib', globals(), locals())
+
+        joblib.Parallel(n_jobs=num_parallel)(joblib.delayed(interleave_file_rows)(file_infos, data_file_path, row_range[0], row_range[1]) for row_range in row_ranges)
+
+    write_temp_file_original_size(data_file_path, num_rows * line_length)
+
+    # The rows are in the same order, so the existing indexes remain valid and are copied as they are.
+    index_info_dict = {}
+
+    for file_info in file_infos:
+        index_number_offset = len(index_info_dict)
+
+        with open(file_info["file_path"], "rb") as f4_file:
+            for key, index_number in file_info["index_info_dict"].items():
+                index_info_dict[key] = index_number_offset + index_number
+
+                index_data_file_path = get_data_path(tmp_dir_path2, f"i{index_info_dict[key]}")
+                index_start, index_end = file_info["file_map_dict"][f"i{index_number}"]
+
+                with open(index_data_file_path, "wb") as index_data_file:
+                    preallocate_file(index_data_file.fileno(), index_end - index_start)
+                    copy_file_to_position(file_info["file_path"], index_data_file.fileno(), 0, index_end - index_start, read_chunk_size, index_start)
+
+                write_temp_file_original_size(index_data_file_path, index_end - index_start)
+
+                for extension in ["cc", "ccml"]:
+                    write_str_to_file(get_data_path(tmp_dir_path2, f"i{index_info_dict[key]}{extension}"), read_file_component(f4_file, file_info["file_map_dict"], f"i{index_number}{extension}"), tmp_codec=tmp_codec)
+
+    if index_info_dict:
+        write_str_to_file(f"{tmp_dir_path2}i", serialize(index_info_dict), tmp_codec=tmp_codec)
+
+    combine_into_single_file(src_description, f4_dest_file_path, tmp_dir_path2, tmp_codec, read_chunk_size, verbose)
+
+    remove_tmp_file(columns_database_file_path)
+
+    # Only remove the temp directory if we created it.
+    if not tmp_dir_path:
+        rmtree(tmp_dir_path2)
+
+    print_message(f"Done binding the columns of {src_description} to {f4_dest_file_path}.", verbose)
+
+# This function is executed in parallel.
+def interleave_file_rows(file_infos, data_file_path, start_row_index, end_row_index):
+    # Files without any data have nothing to contribute to the rows.
+    file_infos = [file_info for file_info in file_infos if file_info["column_coords"][-1] > 0]
+    line_lengths = [file_info["column_coords"][-1] for file_info in file_infos]
+
+    file_handles = [open(file_info["file_path"], "rb") for file_info in file_infos]
+
+    try:
+        for file_handle, file_info, line_length in zip(file_handles, file_infos, line_lengths):
+            file_handle.seek(file_info["file_map_dict"][""][0] + start_row_index * line_length)
+
+        interleave_rows(file_handles, line_lengths, data_file_path, start_row_index, end_row_index)
+    finally:
+        for file_handle in file_handles:
+            file_handle.close()
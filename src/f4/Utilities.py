@@ -1,25 +1,42 @@
+from bisect import bisect_right
+from collections import OrderedDict
 from contextlib import contextmanager
 from copy import deepcopy
 import csv
 from datetime import datetime
 from glob import glob
 import gzip
+import heapq
 from fastnumbers import isint, isfloat, fast_int, fast_float
 from inspect import stack
 from itertools import chain
 from math import ceil, log
 from mmap import mmap, PROT_READ, PROT_WRITE
 from msgspec import msgpack
+import numpy as np
 from operator import eq, ge, gt, le, lt, ne, itemgetter
-from os import makedirs, path, remove, rename
+from os import ftruncate, makedirs, path, pread, pwrite, remove, rename, stat
+from random import Random
 from re import compile
 # import shelve
 from shutil import copy, rmtree
 import sqlite3
 import sys
 from tempfile import mkdtemp
+from threading import Lock
 from uuid import uuid4
-from zstandard import ZstdCompressor, ZstdDecompressor
+from zstandard import train_dictionary, ZstdCompressionDict, ZstdCompressor, ZstdDecompressor, ZstdError
+
+# These functions are not available on all operating systems.
+try:
+    from os import copy_file_range
+except ImportError:
+    copy_file_range = None
+
+try:
+    from os import posix_fallocate
+except ImportError:
+    posix_fallocate = None
 
 def get_current_version():
     return "1.1.0"
@@ -35,15 +52,15 @@ def read_from_file(file_handle, start_position, end_position, use_memory_mapping
     if use_memory_mapping:
         return file_handle[start_position:end_position]
     else:
-        file_handle.seek(start_position)
-        return file_handle.read(end_position - start_position)
+        # The position is passed with each read, so the file handle can be shared by multiple threads.
+        return pread(file_handle.fileno(), end_position - start_position, start_position)
 
-def read_str_from_file(file_path, file_extension=""):
-    with open_temp_file_compressed(file_path + file_extension) as the_file:
+def read_str_from_file(file_path, file_extension="", tmp_codec="zstd"):
+    with open_temp_file_compressed(file_path + file_extension, tmp_codec) as the_file:
         return the_file.read()
 
-def write_str_to_file(file_path, the_string, save_original_size=True):
-    with open_temp_file_to_compress(file_path) as the_file:
+def write_str_to_file(file_path, the_string, save_original_size=True, tmp_codec="zstd"):
+    with open_temp_file_to_compress(file_path, tmp_codec=tmp_codec) as the_file:
         the_file.write(the_string)
 
     if save_original_size:
@@ -118,12 +135,28 @@ def get_temp_file_original_size(file_path):
 def get_temp_file_original_size_path(file_path):
     return f"{file_path}__original_size"
 
-def open_temp_file_to_compress(file_path, mode="wb"):
+# Temporary files are compressed with zstd by default. The "raw" codec skips compression,
+# which uses more disk space but avoids compression costs and supports real seeks.
+# The combined data file and the final index data are always written raw, regardless of the codec
+# (see combine_into_single_file), but the per-chunk data files and index runs use the codec.
+def validate_tmp_codec(tmp_codec):
+    if tmp_codec not in ("zstd", "raw"):
+        raise Exception("Invalid tmp_codec value. Must be zstd or raw.")
+
+def open_temp_file_to_compress(file_path, mode="wb", tmp_codec="zstd"):
     fh = open(file_path, mode)
+
+    if tmp_codec == "raw":
+        return fh
+
     return ZstdCompressor(level=1, write_content_size=True).stream_writer(fh)
 
-def open_temp_file_compressed(file_path):
+def open_temp_file_compressed(file_path, tmp_codec="zstd"):
     fh = open(file_path, "rb")
+
+    if tmp_codec == "raw":
+        return fh
+
     return ZstdDecompressor().stream_reader(fh)
 
 def read_compressed_file_line_by_line(compressed_file_path):
@@ -234,6 +267,51 @@ def remove_tmp_dir(tmp_dir_path, verbose):
             print_message(f"Warning: {tmp_dir_path} directory could not be removed", verbose)
             pass
 
+def preallocate_file(file_descriptor, num_bytes):
+    if posix_fallocate:
+        try:
+            posix_fallocate(file_descriptor, 0, num_bytes)
+            return
+        except OSError:
+            # Some file systems do not support allocating space this way.
+            pass
+
+    ftruncate(file_descriptor, num_bytes)
+
+def write_to_position(file_descriptor, data, position):
+    num_written = 0
+
+    while num_written < len(data):
+        num_written += pwrite(file_descriptor, data[num_written:], position + num_written)
+
+def copy_file_to_position(src_file_path, dst_file_descriptor, dst_position, num_bytes, read_chunk_size, src_position=0):
+    with open(src_file_path, "rb") as src_file:
+        src_file_descriptor = src_file.fileno()
+        num_copied = 0
+
+        # When possible, the kernel copies the data without passing it through user space.
+        if copy_file_range:
+            try:
+                while num_copied < num_bytes:
+                    num_copied_this_time = copy_file_range(src_file_descriptor, dst_file_descriptor, num_bytes - num_copied, src_position + num_copied, dst_position + num_copied)
+
+                    if num_copied_this_time == 0:
+                        break
+
+                    num_copied += num_copied_this_time
+            except OSError:
+                # Some file systems do not support copy_file_range, so we copy the rest ourselves.
+                pass
+
+        while num_copied < num_bytes:
+            chunk = pread(src_file_descriptor, min(read_chunk_size, num_bytes - num_copied), src_position + num_copied)
+
+            if not chunk:
+                break
+
+            write_to_position(dst_file_descriptor, chunk, dst_position + num_copied)
+            num_copied += len(chunk)
+
 def remove_tmp_file(file_path):
     if path.exists(file_path):
         remove(file_path)
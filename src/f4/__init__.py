@@ -1,3 +1,3 @@
-from .Builder import convert_delimited_file
-from .Parser import query, head, tail, get_column_type_from_name, get_version, get_num_rows, get_num_cols, get_indexes, NoFilter, StringFilter, FloatFilter, IntFilter, StartsWithFilter, EndsWithFilter, HeadFilter, TailFilter, AndFilter, OrFilter, FloatRangeFilter, IntRangeFilter, StringRangeFilter
-from .Transformer import transpose, inner_join
+from .Builder import convert_delimited_file, append_delimited_file, build_index, drop_index
+from .Parser import F4Reader, query, iter_query, query_to_numpy, query_to_pandas, head, tail, get_column_type_from_name, get_version, get_num_rows, get_num_cols, get_indexes, set_file_pool_size, get_file_pool_stats, clear_file_pool, NoFilter, StringFilter, FloatFilter, IntFilter, StartsWithFilter, EndsWithFilter, HeadFilter, TailFilter, AndFilter, OrFilter, FloatRangeFilter, IntRangeFilter, StringRangeFilter
+from .Transformer import transpose, inner_join, concat, cbind
@@ -1,6 +1,7 @@
 import sys
 sys.path.append('/')
 
+from concurrent.futures import ThreadPoolExecutor
 import f4
 import glob
 import gzip
@@ -71,7 +72,7 @@ def fail_test(message):
     print(f"FAIL: {message}")
     sys.exit(1)
 
-def run_small_tests(in_file_path, f4_file_path, out_file_path, num_parallel=1, compression_type=None, index_columns=[], use_memory_mapping=True):
+def run_small_tests(in_file_path, f4_file_path, out_file_path, num_parallel=1, compression_type=None, index_columns=[], use_memory_mapping=True, parallelize_by="columns", single_pass=False, num_sample_rows=None, tmp_codec="zstd"):
     print("-------------------------------------------------------")
     print(f"Input file path: {in_file_path}")
     print(f"Output file path: {f4_file_path}")
@@ -79,13 +80,16 @@ def run_small_tests(in_file_path, f4_file_path, out_file_path, num_parallel=1, c
     print(f"compression_type: {compression_type}")
     print(f"index_columns: {index_columns}")
     print(f"use_memory_mapping: {use_memory_mapping}")
+    print(f"parallelize_by: {parallelize_by}")
+    print(f"single_pass: {single_pass}")
+    print(f"num_sample_rows: {num_sample_rows}")
     print("-------------------------------------------------------")
 
     # Clean up data files if they already exist
     for file_path in glob.glob(f"{f4_file_path}*"):
         os.unlink(file_path)
 
-    f4.convert_delimited_file(in_file_path, f4_file_path, compression_type=compression_type, num_parallel=num_parallel, index_columns=index_columns, tmp_dir_path="/tmp/f4_small_tests")
+    f4.convert_delimited_file(in_file_path, f4_file_path, compression_type=compression_type, num_parallel=num_parallel, index_columns=index_columns, parallelize_by=parallelize_by, single_pass=single_pass, num_sample_rows=num_sample_rows, tmp_dir_path="/tmp/f4_small_tests", tmp_codec=tmp_codec)
 
     try:
         f4.query("bogus_file_path")
@@ -632,6 +636,490 @@ def test_inner_join(num_parallel, compression_type, use_memory_mapping):
     check_results("Filter by ID - right", read_file_into_lists(out_file_path_2), [[b"IntA_right"], [b"5_right"], [b"5_right_Z"]])
     os.unlink(out_file_path_2)
 
+def test_wide_file(num_parallel, compression_type, use_memory_mapping):
+    # Create a file that is wide enough to be compressed in multiple groups of columns.
+    random.seed(0)
+    header_row = [f"C{i}".encode() for i in range(3000)]
+    data = [[random.choice([b"A", b"BB", b"123", b"4.5"]) for i in range(3000)] for j in range(20)]
+
+    with open("/tmp/wide.tsv", "wb") as wide_file:
+        wide_file.write(b"\t".join(header_row) + b"\n")
+
+        for row in data:
+            wide_file.write(b"\t".join(row) + b"\n")
+
+    f4_file_path = "/tmp/wide.f4"
+    out_file_path = "/tmp/wide_out.tsv"
+    f4.convert_delimited_file("/tmp/wide.tsv", f4_file_path, num_parallel=num_parallel, compression_type=compression_type)
+
+    f4.query(f4_file_path, f4.NoFilter(), [], out_file_path, num_parallel=num_parallel, use_memory_mapping=use_memory_mapping)
+    check_results(f"Wide file - all columns (cmpr: {compression_type})", read_file_into_lists(out_file_path), [header_row] + data)
+
+    f4.query(f4_file_path, f4.StringFilter("C2999", operator.eq, "A"), ["C0", "C1500", "C2999"], out_file_path, num_parallel=num_parallel, use_memory_mapping=use_memory_mapping)
+    check_results(f"Wide file - filter and select columns (cmpr: {compression_type})", read_file_into_lists(out_file_path), [[b"C0", b"C1500", b"C2999"]] + [[row[0], row[1500], row[2999]] for row in data if row[2999] == b"A"])
+
+    # The last column has no values, so it starts where the last group of columns ends.
+    with open("/tmp/wide.tsv", "wb") as wide_file:
+        wide_file.write(b"A\tB\tC\n1\tx\t\n2\ty\t\n")
+
+    f4.convert_delimited_file("/tmp/wide.tsv", f4_file_path, num_parallel=num_parallel, compression_type=compression_type)
+
+    f4.query(f4_file_path, f4.NoFilter(), [], out_file_path, num_parallel=num_parallel, use_memory_mapping=use_memory_mapping)
+    check_results(f"Wide file - empty last column (cmpr: {compression_type})", read_file_into_lists(out_file_path), [[b"A", b"B", b"C"], [b"1", b"x", b""], [b"2", b"y", b""]])
+
+    f4.query(f4_file_path, f4.StringFilter("B", operator.eq, "y"), ["C", "A"], out_file_path, num_parallel=num_parallel, use_memory_mapping=use_memory_mapping)
+    check_results(f"Wide file - select empty last column (cmpr: {compression_type})", read_file_into_lists(out_file_path), [[b"C", b"A"], [b"", b"2"]])
+
+    os.unlink("/tmp/wide.tsv")
+    os.unlink(out_file_path)
+    os.unlink(f4_file_path)
+
+def test_append(num_parallel, num_existing_rows, index_columns, tmp_codec):
+    # Split the small file into existing rows and rows to append.
+    rows = read_file_into_lists("data/small.tsv")
+    header_row = rows[0]
+
+    for file_path, file_rows in [("/tmp/append_existing.tsv", rows[1:(num_existing_rows + 1)]), ("/tmp/append_new.tsv", rows[(num_existing_rows + 1):])]:
+        with open(file_path, "wb") as append_file:
+            for row in [header_row] + file_rows:
+                append_file.write(b"\t".join(row) + b"\n")
+
+    f4_file_path = "/tmp/append.f4"
+    full_f4_file_path = "/tmp/append_full.f4"
+    out_file_path = "/tmp/append_out.tsv"
+
+    f4.convert_delimited_file("/tmp/append_existing.tsv", f4_file_path, index_columns=index_columns)
+    f4.append_delimited_file(f4_file_path, "/tmp/append_new.tsv", num_parallel=num_parallel, tmp_codec=tmp_codec)
+
+    f4.query(f4_file_path, f4.NoFilter(), [], out_file_path, num_parallel=num_parallel)
+    check_results(f"Append - all rows ({num_existing_rows} existing rows)", read_file_into_lists(out_file_path), rows)
+
+    f4.query(f4_file_path, f4.IntRangeFilter("IntA", 5, 7), ["ID"], out_file_path, num_parallel=num_parallel)
+    check_results(f"Append - int range filter ({num_existing_rows} existing rows)", read_file_into_lists(out_file_path), [[b"ID"], [b"E"], [b"A"], [b"C"], [b"D"]])
+
+    f4.query(f4_file_path, f4.EndsWithFilter("CategoricalB", "ow"), ["ID"], out_file_path, num_parallel=num_parallel)
+    check_results(f"Append - ends with filter ({num_existing_rows} existing rows)", read_file_into_lists(out_file_path), [[b"ID"], [b"A"], [b"B"]])
+
+    # Appending should produce the same file as converting all the rows at once.
+    f4.convert_delimited_file("data/small.tsv", full_f4_file_path, index_columns=index_columns)
+
+    with open(f4_file_path, "rb") as f4_file:
+        with open(full_f4_file_path, "rb") as full_f4_file:
+            check_result("Append", f"Same as converting all rows ({num_existing_rows} existing rows)", f4_file.read(), full_f4_file.read())
+
+    try:
+        f4.convert_delimited_file("/tmp/append_existing.tsv", f4_file_path, compression_type="zstd")
+        f4.append_delimited_file(f4_file_path, "/tmp/append_new.tsv")
+        fail_test("Appending to a compressed file.")
+    except:
+        pass_test("Appending to a compressed file.")
+
+    for file_path in ["/tmp/append_existing.tsv", "/tmp/append_new.tsv", f4_file_path, full_f4_file_path, out_file_path]:
+        os.unlink(file_path)
+
+def test_build_and_drop_index(index_columns):
+    f4_file_path = "/tmp/build_index.f4"
+    indexed_f4_file_path = "/tmp/build_index_indexed.f4"
+    out_file_path = "/tmp/build_index_out.tsv"
+
+    f4.convert_delimited_file("data/small.tsv", f4_file_path)
+    f4.convert_delimited_file("data/small.tsv", indexed_f4_file_path, index_columns=index_columns)
+
+    for index_column in index_columns:
+        f4.build_index(f4_file_path, index_column)
+
+    check_result("Build index", "Indexes", f4.get_indexes(f4_file_path), index_columns)
+
+    filters = [f4.StringFilter("CategoricalB", operator.eq, "Yellow"), f4.EndsWithFilter("CategoricalB", "ow"), f4.FloatFilter("FloatA", operator.gt, 2.0), f4.IntRangeFilter("IntA", 5, 7), f4.AndFilter(f4.StringFilter("CategoricalB", operator.eq, "Brown"), f4.IntFilter("IntB", operator.ge, 50))]
+
+    def check_filters(description):
+        for fltr in filters:
+            f4.query(indexed_f4_file_path, fltr, ["ID"], out_file_path)
+            expected = read_file_into_lists(out_file_path)
+
+            f4.query(f4_file_path, fltr, ["ID"], out_file_path)
+            check_results(f"{description} - {type(fltr).__name__}", read_file_into_lists(out_file_path), expected)
+
+    check_filters("Build index")
+
+    try:
+        f4.build_index(f4_file_path, index_columns[0])
+        fail_test("Building an index that already exists.")
+    except:
+        pass_test("Building an index that already exists.")
+
+    f4.drop_index(f4_file_path, index_columns[1])
+    check_result("Drop index", "Indexes", f4.get_indexes(f4_file_path), index_columns[:1] + index_columns[2:])
+    check_filters("Drop index")
+
+    # The file does not become smaller, so a reader that is already open can still use the index that was built last.
+    file_size = os.path.getsize(f4_file_path)
+
+    with f4.F4Reader(f4_file_path) as reader:
+        reader.query(f4.NoFilter(), ["ID"], out_file_path)
+        f4.drop_index(f4_file_path, index_columns[-1])
+
+        reader.query(f4.AndFilter(f4.FloatFilter("FloatA", operator.eq, 2.2), f4.StringFilter("OrdinalA", operator.eq, "High"), f4.IntRangeFilter("IntA", 0, 10)), ["ID"], out_file_path)
+        check_results("Drop index - open reader", read_file_into_lists(out_file_path), [[b"ID"], [b"B"]])
+
+    check_result("Drop index", "File size", os.path.getsize(f4_file_path) >= file_size, True)
+
+    for index_column in index_columns[:1] + index_columns[2:-1]:
+        f4.drop_index(f4_file_path, index_column)
+
+    check_result("Drop all indexes", "Indexes", f4.get_indexes(f4_file_path), [])
+    check_filters("Drop all indexes")
+
+    f4.query(f4_file_path, f4.NoFilter(), [], out_file_path)
+    check_results("Drop all indexes - all rows", read_file_into_lists(out_file_path), read_file_into_lists("data/small.tsv"))
+
+    try:
+        f4.drop_index(f4_file_path, index_columns[0])
+        fail_test("Dropping an index that does not exist.")
+    except:
+        pass_test("Dropping an index that does not exist.")
+
+    for file_path in [f4_file_path, indexed_f4_file_path, out_file_path]:
+        os.unlink(file_path)
+
+def test_concat(num_parallel, shard_row_counts, index_columns, tmp_codec):
+    # Split the small file into shards with the specified numbers of rows.
+    rows = read_file_into_lists("data/small.tsv")
+    header_row = rows[0]
+
+    shard_f4_file_paths = []
+    start_row_index = 1
+
+    for shard_number, num_shard_rows in enumerate(shard_row_counts):
+        shard_file_path = f"/tmp/concat_{shard_number}.tsv"
+
+        with open(shard_file_path, "wb") as shard_file:
+            for row in [header_row] + rows[start_row_index:(start_row_index + num_shard_rows)]:
+                shard_file.write(b"\t".join(row) + b"\n")
+
+        f4.convert_delimited_file(shard_file_path, f"{shard_file_path}.f4", index_columns=index_columns)
+        shard_f4_file_paths.append(f"{shard_file_path}.f4")
+        os.unlink(shard_file_path)
+
+        start_row_index += num_shard_rows
+
+    f4_file_path = "/tmp/concat.f4"
+    full_f4_file_path = "/tmp/concat_full.f4"
+    out_file_path = "/tmp/concat_out.tsv"
+
+    f4.concat(shard_f4_file_paths, f4_file_path, num_parallel=num_parallel, tmp_codec=tmp_codec)
+
+    f4.query(f4_file_path, f4.NoFilter(), [], out_file_path, num_parallel=num_parallel)
+    check_results(f"Concat - all rows ({shard_row_counts})", read_file_into_lists(out_file_path), rows)
+
+    f4.query(f4_file_path, f4.IntRangeFilter("IntA", 5, 7), ["ID"], out_file_path, num_parallel=num_parallel)
+    check_results(f"Concat - int range filter ({shard_row_counts})", read_file_into_lists(out_file_path), [[b"ID"], [b"E"], [b"A"], [b"C"], [b"D"]])
+
+    f4.query(f4_file_path, f4.EndsWithFilter("CategoricalB", "ow"), ["ID"], out_file_path, num_parallel=num_parallel)
+    check_results(f"Concat - ends with filter ({shard_row_counts})", read_file_into_lists(out_file_path), [[b"ID"], [b"A"], [b"B"]])
+
+    # Concatenating should produce the same file as converting all the rows at once.
+    f4.convert_delimited_file("data/small.tsv", full_f4_file_path, index_columns=index_columns)
+
+    with open(f4_file_path, "rb") as f4_file:
+        with open(full_f4_file_path, "rb") as full_f4_file:
+            check_result("Concat", f"Same as converting all rows ({shard_row_counts})", f4_file.read(), full_f4_file.read())
+
+    try:
+        f4.convert_delimited_file("data/small.tsv", full_f4_file_path, compression_type="zstd")
+        f4.concat([shard_f4_file_paths[0], full_f4_file_path], f4_file_path)
+        fail_test("Concatenating a compressed file.")
+    except:
+        pass_test("Concatenating a compressed file.")
+
+    try:
+        f4.transpose(shard_f4_file_paths[0], full_f4_file_path, "ID")
+        f4.concat([shard_f4_file_paths[0], full_f4_file_path], f4_file_path)
+        fail_test("Concatenating files with different columns.")
+    except:
+        pass_test("Concatenating files with different columns.")
+
+    for file_path in shard_f4_file_paths + [f4_file_path, full_f4_file_path, out_file_path]:
+        os.unlink(file_path)
+
+def test_cbind(num_parallel, column_groups, index_columns, tmp_codec):
+    # Split the small file into groups of columns.
+    rows = read_file_into_lists("data/small.tsv")
+    column_names = [column_name.decode() for column_name in rows[0]]
+
+    group_f4_file_paths = []
+
+    for group_number, group_column_names in enumerate(column_groups):
+        group_file_path = f"/tmp/cbind_{group_number}.tsv"
+        group_column_indices = [column_names.index(column_name) for column_name in group_column_names]
+
+        with open(group_file_path, "wb") as group_file:
+            for row in rows:
+                group_file.write(b"\t".join([row[column_index] for column_index in group_column_indices]) + b"\n")
+
+        group_index_columns = [index_column for index_column in index_columns if index_column.replace("_endswith", "") in group_column_names]
+        f4.convert_delimited_file(group_file_path, f"{group_file_path}.f4", index_columns=group_index_columns)
+        group_f4_file_paths.append(f"{group_file_path}.f4")
+        os.unlink(group_file_path)
+
+    f4_file_path = "/tmp/cbind.f4"
+    full_file_path = "/tmp/cbind_full.tsv"
+    full_f4_file_path = "/tmp/cbind_full.f4"
+    out_file_path = "/tmp/cbind_out.tsv"
+
+    f4.cbind(group_f4_file_paths, f4_file_path, num_parallel=num_parallel, tmp_codec=tmp_codec)
+
+    f4.query(f4_file_path, f4.NoFilter(), [], out_file_path, num_parallel=num_parallel)
+    expected_rows = [[row[column_names.index(column_name)] for group_column_names in column_groups for column_name in group_column_names] for row in rows]
+    check_results(f"Cbind - all rows ({len(column_groups)} groups)", read_file_into_lists(out_file_path), expected_rows)
+
+    f4.query(f4_file_path, f4.EndsWithFilter("CategoricalB", "ow"), ["ID"], out_file_path, num_parallel=num_parallel)
+    check_results(f"Cbind - ends with filter ({len(column_groups)} groups)", read_file_into_lists(out_file_path), [[b"ID"], [b"A"], [b"B"]])
+
+    # Binding columns should produce the same file as converting all the columns at once.
+    with open(full_file_path, "wb") as full_file:
+        for row in expected_rows:
+            full_file.write(b"\t".join(row) + b"\n")
+
+    f4.convert_delimited_file(full_file_path, full_f4_file_path, index_columns=[index_column for group_column_names in column_groups for index_column in index_columns if index_column.replace("_endswith", "") in group_column_names])
+
+    with open(f4_file_path, "rb") as f4_file:
+        with open(full_f4_file_path, "rb") as full_f4_file:
+            check_result("Cbind", f"Same as converting all columns ({len(column_groups)} groups)", f4_file.read(), full_f4_file.read())
+
+    try:
+        f4.cbind([group_f4_file_paths[0], group_f4_file_paths[0]], f4_file_path)
+        fail_test("Binding files with repeated column names.")
+    except:
+        pass_test("Binding files with repeated column names.")
+
+    try:
+        f4.convert_delimited_file("data/small.tsv", full_f4_file_path, compression_type="zstd")
+        f4.cbind([full_f4_file_path], f4_file_path)
+        fail_test("Binding a compressed file.")
+    except:
+        pass_test("Binding a compressed file.")
+
+    for file_path in group_f4_file_paths + [f4_file_path, full_file_path, full_f4_file_path, out_file_path]:
+        os.unlink(file_path)
+
+def test_reader(compression_type, index_columns, use_memory_mapping):
+    f4_file_path = "/tmp/reader.f4"
+    out_file_path = "/tmp/reader_out.tsv"
+    reader_out_file_path = "/tmp/reader_out2.tsv"
+
+    f4.convert_delimited_file("data/small.tsv", f4_file_path, compression_type=compression_type, index_columns=index_columns)
+
+    filters = [f4.NoFilter(), f4.StringFilter("CategoricalB", operator.eq, "Yellow"), f4.EndsWithFilter("CategoricalB", "ow"), f4.FloatFilter("FloatA", operator.gt, 2.0), f4.IntRangeFilter("IntA", 5, 7), f4.HeadFilter(2), f4.TailFilter(2), f4.OrFilter(f4.StringFilter("ID", operator.eq, "A"), f4.IntFilter("IntB", operator.lt, 50))]
+
+    with f4.F4Reader(f4_file_path, use_memory_mapping) as reader:
+        check_result("Reader", "Number of rows", reader.get_num_rows(), f4.get_num_rows(f4_file_path))
+        check_result("Reader", "Number of columns", reader.get_num_cols(), f4.get_num_cols(f4_file_path))
+        check_result("Reader", "Version", reader.get_version(), f4.get_version(f4_file_path))
+        check_result("Reader", "Indexes", reader.get_indexes(), f4.get_indexes(f4_file_path))
+        check_result("Reader", "Column type", reader.get_column_type_from_name("FloatA"), "f")
+
+        # The same reader is used for many queries.
+        for select_columns in [[], ["ID", "IntA"]]:
+            for num_parallel in [1, 2]:
+                for fltr in filters:
+                    f4.query(f4_file_path, fltr, select_columns, out_file_path, num_parallel=num_parallel)
+                    reader.query(fltr, select_columns, reader_out_file_path, num_parallel=num_parallel)
+                    check_results(f"Reader - {type(fltr).__name__} ({select_columns}, {num_parallel})", read_file_into_lists(reader_out_file_path), read_file_into_lists(out_file_path))
+
+                    # Rows from a scan match the rows that were written to the file.
+                    check_result("Reader", f"Scan - {type(fltr).__name__} ({select_columns}, {num_parallel})", [list(row) for row in reader.scan(fltr, select_columns, num_parallel=num_parallel)], read_file_into_lists(out_file_path)[1:])
+
+        check_result("Reader", "Scan - typed", list(reader.scan(f4.HeadFilter(2), ["ID", "FloatA", "IntA"], typed=True)), [("E", 9.9, 6), ("A", 1.1, 5)])
+        check_result("Reader", "Scan - stop early", next(reader.scan(f4.FloatFilter("FloatA", operator.gt, 2.0), ["ID"])), (b"E", ))
+        check_result("Reader", "Iterate query", list(f4.iter_query(f4_file_path, f4.TailFilter(2), ["ID"], use_memory_mapping=use_memory_mapping)), [(b"C", ), (b"D", )])
+
+        # Typed arrays hold the same values as a typed scan.
+        for fltr in filters:
+            rows = reader.query_to_numpy(fltr)
+            check_result("Reader", f"NumPy - {type(fltr).__name__}", [tuple([x.decode() if isinstance(x, bytes) else x for x in row]) for row in rows.tolist()], list(reader.scan(fltr, typed=True)))
+
+        rows = f4.query_to_numpy(f4_file_path, f4.HeadFilter(2), ["ID", "FloatA", "IntA"], use_memory_mapping=use_memory_mapping)
+        check_result("Reader", "NumPy - types", [rows.dtype[i].str for i in range(3)], ["|S1", "<f8", "<i8"])
+        check_result("Reader", "NumPy - no matches", len(reader.query_to_numpy(f4.StringFilter("ID", operator.eq, "Z"))), 0)
+
+        try:
+            import pandas
+
+            data_frame = reader.query_to_pandas(f4.HeadFilter(2), ["ID", "FloatA", "IntA"])
+            check_result("Reader", "pandas", data_frame.values.tolist(), [["E", 9.9, 6], ["A", 1.1, 5]])
+        except ImportError:
+            pass
+
+        try:
+            reader.query_to_numpy(f4.NoFilter(), ["ID", "FloatA", "ID"])
+            fail_test("Selecting a column more than once for an array.")
+        except Exception as e:
+            check_result("Reader", "NumPy - repeated column", "selected more than once: ID" in str(e), True)
+
+        reader.head(3, ["ID"], out_file_path=reader_out_file_path)
+        check_results("Reader - head", read_file_into_lists(reader_out_file_path), [[b"ID"], [b"E"], [b"A"], [b"B"]])
+
+        reader.tail(2, ["ID"], out_file_path=reader_out_file_path)
+        check_results("Reader - tail", read_file_into_lists(reader_out_file_path), [[b"ID"], [b"C"], [b"D"]])
+
+    # Integers that do not fit in int64 are stored as Python int objects.
+    with open("/tmp/reader_big_int.tsv", "w") as tsv_file:
+        tsv_file.write("ID\tBig\n1\t99999999999999999999\n2\t-3\n")
+
+    f4.convert_delimited_file("/tmp/reader_big_int.tsv", f4_file_path, compression_type=compression_type)
+    rows = f4.query_to_numpy(f4_file_path, use_memory_mapping=use_memory_mapping)
+    check_result("Reader", "NumPy - large integers", rows.tolist(), [(1, 99999999999999999999), (2, -3)])
+    check_result("Reader", "NumPy - large integer type", [rows.dtype[0].str, rows.dtype[1].str], ["<i8", "|O"])
+    os.unlink("/tmp/reader_big_int.tsv")
+
+    try:
+        reader.query(f4.NoFilter(), [], reader_out_file_path)
+        fail_test("Querying with a closed reader.")
+    except:
+        pass_test("Querying with a closed reader.")
+
+    for file_path in [f4_file_path, out_file_path, reader_out_file_path]:
+        os.unlink(file_path)
+
+def test_vectorized_scan(use_memory_mapping, compression_type=None):
+    tsv_file_path = "/tmp/scan.tsv"
+    f4_file_path = "/tmp/scan.f4"
+    out_file_path = "/tmp/scan_out.tsv"
+
+    # The values have different lengths.
+    with open(tsv_file_path, "wb") as tsv_file:
+        tsv_file.write(b"ID\tName\tCount\tScore\n")
+        tsv_file.write(b"A\tab\t1\t0.5\n")
+        tsv_file.write(b"B\tabcdef\t0\t-1.5\n")
+        tsv_file.write(b"C\tb\t300\t2.25\n")
+        tsv_file.write(b"D\tabc\t-4\t10.0\n")
+
+    f4.convert_delimited_file(tsv_file_path, f4_file_path, compression_type=compression_type)
+
+    with f4.F4Reader(f4_file_path, use_memory_mapping) as reader:
+        for description, fltr, expected_ids in [
+                ("StringFilter eq", f4.StringFilter("Name", operator.eq, "ab"), [b"A"]),
+                ("StringFilter ne", f4.StringFilter("Name", operator.ne, "ab"), [b"B", b"C", b"D"]),
+                ("StringFilter lt", f4.StringFilter("Name", operator.lt, "abc"), [b"A"]),
+                ("StringRangeFilter", f4.StringRangeFilter("Name", "abc", "b"), [b"B", b"C", b"D"]),
+                ("StartsWithFilter", f4.StartsWithFilter("Name", "abc"), [b"B", b"D"]),
+                ("EndsWithFilter", f4.EndsWithFilter("Name", "c"), [b"D"]),
+                ("FloatFilter", f4.FloatFilter("Score", operator.ge, 2.25), [b"C", b"D"]),
+                ("FloatRangeFilter", f4.FloatRangeFilter("Score", -1.5, 0.5), [b"A", b"B"]),
+                ("IntFilter", f4.IntFilter("Count", operator.gt, 0), [b"A", b"C"]),
+                ("OrFilter", f4.OrFilter(f4.StringFilter("Name", operator.eq, "b"), f4.FloatFilter("Score", operator.lt, 0.0)), [b"B", b"C"]),
+                ("AndFilter", f4.AndFilter(f4.HeadFilter(3), f4.StartsWithFilter("Name", "ab")), [b"A", b"B"]),
+                ("OrFilter with NoFilter", f4.OrFilter(f4.NoFilter(), f4.StringFilter("Name", operator.eq, "b")), [b"A", b"B", b"C", b"D"]),
+                ("AndFilter with OrFilter and NoFilter", f4.AndFilter(f4.TailFilter(2), f4.OrFilter(f4.StringFilter("Name", operator.eq, "b"), f4.NoFilter())), [b"C", b"D"])]:
+            reader.query(fltr, ["ID"], out_file_path)
+            check_results(f"Vectorized scan - {description} - {use_memory_mapping} - {compression_type}", read_file_into_lists(out_file_path), [[b"ID"]] + [[x] for x in expected_ids])
+
+def test_row_set():
+    num_rows = 100
+    random.seed(0)
+    bitmap_row_indices = set(random.sample(range(num_rows), 70))
+
+    row_sets = {
+        "range": (f4.Parser.RowSet(num_rows, range(10, 60)), set(range(10, 60))),
+        "sparse": (f4.Parser.RowSet.from_indices(num_rows, [95, 3, 42, 3]), {3, 42, 95}),
+        "dense": (f4.Parser.RowSet.from_indices(num_rows, range(0, num_rows, 2)), set(range(0, num_rows, 2))),
+        "bitmap": (f4.Parser.RowSet.from_indices(num_rows, bitmap_row_indices), bitmap_row_indices),
+        "empty": (f4.Parser.RowSet(num_rows), set())
+    }
+
+    for name1, (row_set1, expected1) in row_sets.items():
+        check_result("Row set", f"Iterate {name1}", list(row_set1), sorted(expected1))
+        check_result("Row set", f"Length {name1}", len(row_set1), len(expected1))
+
+        for name2, (row_set2, expected2) in row_sets.items():
+            check_result("Row set", f"{name1} & {name2}", list(row_set1 & row_set2), sorted(expected1 & expected2))
+            check_result("Row set", f"{name1} | {name2}", list(row_set1 | row_set2), sorted(expected1 | expected2))
+
+    check_result("Row set", "Contiguous rows", f4.Parser.RowSet.from_indices(num_rows, [4, 2, 3]).rows, range(2, 5))
+    check_result("Row set", "Split", [list(chunk) for chunk in row_sets["sparse"][0].split(2)], [[3, 42], [95]])
+    check_result("Row set", "Split bitmap", [list(chunk) for chunk in row_sets["bitmap"][0].split(30)], [sorted(bitmap_row_indices)[i:(i + 30)] for i in range(0, 70, 30)])
+
+def test_file_pool_threads(compression_type):
+    tsv_file_path = "/tmp/pool_threads.tsv"
+    f4_file_path = "/tmp/pool_threads.f4"
+
+    with open(tsv_file_path, "w") as tsv_file:
+        tsv_file.write("ID\tValue\n")
+
+        for i in range(3000):
+            tsv_file.write(f"{i}\t{i * 7}\n")
+
+    f4.convert_delimited_file(tsv_file_path, f4_file_path, compression_type=compression_type)
+
+    # Threads share the pooled file, so reads must not depend on the position of the file handle.
+    def query_rows(thread_number):
+        mismatches = []
+
+        for i in range(thread_number, 3000, 37):
+            rows = list(f4.iter_query(f4_file_path, f4.IntFilter("ID", operator.eq, i), ["ID", "Value"], use_memory_mapping=False))
+
+            if rows != [(str(i).encode(), str(i * 7).encode())]:
+                mismatches.append(i)
+
+        return mismatches
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        mismatches = sum(executor.map(query_rows, range(8)), [])
+
+    check_result("File pool", f"Threads without memory mapping ({compression_type})", mismatches, [])
+
+    for file_path in [tsv_file_path, f4_file_path]:
+        os.unlink(file_path)
+
+def test_file_pool():
+    f4_file_paths = ["/tmp/pool_a.f4", "/tmp/pool_b.f4", "/tmp/pool_c.f4"]
+    out_file_path = "/tmp/pool_out.tsv"
+
+    for f4_file_path in f4_file_paths:
+        f4.convert_delimited_file("data/small.tsv", f4_file_path)
+
+    f4.clear_file_pool()
+    f4.set_file_pool_size(2)
+
+    f4.get_num_rows(f4_file_paths[0])
+    f4.query(f4_file_paths[0], f4.IntRangeFilter("IntA", 5, 7), ["ID"], out_file_path)
+    check_results("File pool - query", read_file_into_lists(out_file_path), [[b"ID"], [b"E"], [b"A"], [b"C"], [b"D"]])
+    check_result("File pool", "Hits and misses", [f4.get_file_pool_stats()["hits"], f4.get_file_pool_stats()["misses"]], [1, 1])
+
+    # A reader keeps working after its file has been evicted from the pool.
+    with f4.F4Reader(f4_file_paths[0]) as reader:
+        f4.get_num_rows(f4_file_paths[1])
+        f4.get_num_rows(f4_file_paths[2])
+        check_result("File pool", "Number of files", f4.get_file_pool_stats()["num_files"], 2)
+
+        reader.query(f4.IntRangeFilter("IntA", 5, 7), ["ID"], out_file_path)
+        check_results("File pool - evicted reader", read_file_into_lists(out_file_path), [[b"ID"], [b"E"], [b"A"], [b"C"], [b"D"]])
+
+    # A file that has been modified is opened again.
+    with open("data/small.tsv", "rb") as small_file:
+        with open("/tmp/pool.tsv", "wb") as pool_file:
+            pool_file.write(b"".join(small_file.readlines()[:5]))
+
+    f4.convert_delimited_file("/tmp/pool.tsv", f4_file_paths[2])
+    check_result("File pool", "Modified file", f4.get_num_rows(f4_file_paths[2]), 2)
+
+    f4.set_file_pool_size(0)
+    check_result("File pool", "Disabled", f4.get_file_pool_stats()["num_files"], 0)
+    check_result("File pool", "Disabled rows", f4.get_num_rows(f4_file_paths[0]), 5)
+
+    try:
+        f4.set_file_pool_size(-1)
+        fail_test("Invalid file pool size.")
+    except:
+        pass_test("Invalid file pool size.")
+
+    f4.set_file_pool_size(16)
+    f4.clear_file_pool()
+
+    for file_path in f4_file_paths + ["/tmp/pool.tsv", out_file_path]:
+        os.unlink(file_path)
+
 def run_larger_tests(num_parallel, size, extension, discrete1_index, numeric1_index, build_outputs, compression_type, check_outputs, verbose, tmp_dir_path, use_memory_mapping, do_test_with_indexing):
     in_file_path = f"data/{size}.tsv{extension}"
     f4_file_path = f"data/{size}.f4"
@@ -766,6 +1254,27 @@ def run_all_small_tests():
     run_small_tests("data/small.tsv.gz", f4_file_path, out_file_path, num_parallel = 1)
     run_small_tests("data/small.tsv.gz", f4_file_path, out_file_path, num_parallel = 2)
 
+    # Basic small tests (tokenizing the input file a single time)
+    run_small_tests("data/small.tsv", f4_file_path, out_file_path, num_parallel = 1, single_pass = True)
+    run_small_tests("data/small.tsv", f4_file_path, out_file_path, num_parallel = 2, single_pass = True)
+    run_small_tests("data/small.tsv.gz", f4_file_path, out_file_path, num_parallel = 2, single_pass = True)
+
+    # Basic small tests (parallelizing by row ranges rather than column chunks)
+    run_small_tests("data/small.tsv", f4_file_path, out_file_path, num_parallel = 1, parallelize_by = "rows")
+    run_small_tests("data/small.tsv", f4_file_path, out_file_path, num_parallel = 2, parallelize_by = "rows")
+    run_small_tests("data/small.tsv", f4_file_path, out_file_path, num_parallel = 4, parallelize_by = "rows", compression_type = "zstd")
+
+    try:
+        f4.convert_delimited_file("data/small.tsv.gz", f4_file_path, num_parallel = 2, parallelize_by = "rows")
+        fail_test("Parallelizing by rows with a compressed input file.")
+    except:
+        pass_test("Parallelizing by rows with a compressed input file.")
+
+    # Basic small tests (inferring column info from sampled rows, some of which are too narrow)
+    run_small_tests("data/small.tsv", f4_file_path, out_file_path, num_parallel = 1, num_sample_rows = 1)
+    run_small_tests("data/small.tsv", f4_file_path, out_file_path, num_parallel = 2, num_sample_rows = 2)
+    run_small_tests("data/small.tsv.gz", f4_file_path, out_file_path, num_parallel = 2, num_sample_rows = 100)
+
     # Make sure we print to standard out properly (this code does not work inside a function).
     f4.convert_delimited_file("data/small.tsv", f4_file_path)
     old_stdout = sys.stdout
@@ -791,6 +1300,31 @@ def run_all_small_tests():
     run_small_tests("data/small.tsv", f4_file_path, out_file_path, num_parallel = 1, compression_type = "zstd", index_columns = index_columns)
     run_small_tests("data/small.tsv", f4_file_path, out_file_path, num_parallel = 2, compression_type = "zstd", index_columns = index_columns)
 
+    # Small tests with z-standard compression of row blocks
+    run_small_tests("data/small.tsv", f4_file_path, out_file_path, num_parallel = 1, compression_type = "zstd_block")
+    run_small_tests("data/small.tsv", f4_file_path, out_file_path, num_parallel = 2, compression_type = "zstd_block", index_columns = index_columns)
+
+    # Small tests with z-standard compression using a trained dictionary (too few rows, so it uses zstd instead)
+    run_small_tests("data/small.tsv", f4_file_path, out_file_path, num_parallel = 2, compression_type = "zstd_dict")
+
+    try:
+        f4.convert_delimited_file("data/small.tsv", f4_file_path, compression_type = "gzip")
+        fail_test("Invalid compression type.")
+    except:
+        pass_test("Invalid compression type.")
+
+    # Small tests with uncompressed temporary files
+    run_small_tests("data/small.tsv", f4_file_path, out_file_path, num_parallel = 1, tmp_codec = "raw")
+    run_small_tests("data/small.tsv", f4_file_path, out_file_path, num_parallel = 3, tmp_codec = "raw")
+    run_small_tests("data/small.tsv", f4_file_path, out_file_path, num_parallel = 2, parallelize_by = "rows", tmp_codec = "raw", index_columns = index_columns)
+    run_small_tests("data/small.tsv", f4_file_path, out_file_path, num_parallel = 2, compression_type = "zstd_block", single_pass = True, tmp_codec = "raw", index_columns = index_columns)
+
+    try:
+        f4.convert_delimited_file("data/small.tsv", f4_file_path, tmp_codec = "lz4")
+        fail_test("Invalid temp file codec.")
+    except:
+        pass_test("Invalid temp file codec.")
+
     # Transpose without compression
     f4_transposed_file_path = "/tmp/small_transposed.f4"
     test_transpose("data/small.tsv", f4_file_path, f4_transposed_file_path, num_parallel = 1, compression_type = None, use_memory_mapping=True)
@@ -806,6 +1340,47 @@ def run_all_small_tests():
 
     # Inner join with compression
     test_inner_join(num_parallel = 1, compression_type = "zstd", use_memory_mapping=True)
+    test_inner_join(num_parallel = 1, compression_type = "zstd_block", use_memory_mapping=True)
+
+    # Wide file with compression of column groups
+    test_wide_file(num_parallel = 1, compression_type = None, use_memory_mapping=True)
+    test_wide_file(num_parallel = 2, compression_type = "zstd_column_groups", use_memory_mapping=True)
+    test_wide_file(num_parallel = 2, compression_type = "zstd_column_groups", use_memory_mapping=False)
+
+    # Append rows to an existing file
+    test_append(num_parallel = 1, num_existing_rows = 1, index_columns = [], tmp_codec = "zstd")
+    test_append(num_parallel = 2, num_existing_rows = 3, index_columns = index_columns, tmp_codec = "zstd")
+    test_append(num_parallel = 2, num_existing_rows = 4, index_columns = index_columns, tmp_codec = "raw")
+
+    # Concatenate files with the same columns
+    test_concat(num_parallel = 1, shard_row_counts = [5], index_columns = [], tmp_codec = "zstd")
+    test_concat(num_parallel = 2, shard_row_counts = [1, 2, 2], index_columns = index_columns, tmp_codec = "zstd")
+    test_concat(num_parallel = 2, shard_row_counts = [3, 2], index_columns = index_columns, tmp_codec = "raw")
+
+    # Bind the columns of files with the same rows
+    test_cbind(num_parallel = 1, column_groups = [["ID", "FloatA", "FloatB"], ["OrdinalA", "OrdinalB", "IntA", "IntB"], ["CategoricalA", "CategoricalB"]], index_columns = [], tmp_codec = "zstd")
+    test_cbind(num_parallel = 2, column_groups = [["CategoricalB", "ID"], ["IntA", "FloatA", "OrdinalA", "IntB", "FloatB", "OrdinalB", "CategoricalA"]], index_columns = ["ID", "CategoricalB_endswith", "IntA", "FloatB"], tmp_codec = "raw")
+
+    # Build and drop indexes in an existing file
+    test_build_and_drop_index(["ID", "CategoricalB", "CategoricalB_endswith", "FloatA", "IntA", ["CategoricalB", "IntB"], ["FloatA", "OrdinalA", "IntA"]])
+
+    # Query many times with the same reader
+    test_reader(compression_type = None, index_columns = [], use_memory_mapping = True)
+    test_reader(compression_type = None, index_columns = index_columns, use_memory_mapping = False)
+    test_reader(compression_type = "zstd_block", index_columns = index_columns, use_memory_mapping = True)
+
+    # Filter without indexes using vectorized scans
+    test_vectorized_scan(use_memory_mapping = True)
+    test_vectorized_scan(use_memory_mapping = False)
+    test_vectorized_scan(use_memory_mapping = True, compression_type = "zstd")
+
+    # Combine and split sets of matching rows
+    test_row_set()
+
+    # Keep recently used files open
+    test_file_pool()
+    test_file_pool_threads(compression_type = None)
+    test_file_pool_threads(compression_type = "zstd")
 
     # No memory mapping
     for num_parallel in [1, 2]:
@@ -878,7 +1453,7 @@ run_all_small_tests()
 
 #for compression_type in [None]:
 #for compression_type in ["zstd"]:
-for compression_type in [None, "zstd"]:
+for compression_type in [None, "zstd", "zstd_block", "zstd_dict", "zstd_column_groups"]:
 #    num_parallel = 1
     num_parallel = 4
 #    num_parallel = 16